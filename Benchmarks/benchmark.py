@@ -0,0 +1,286 @@
+import os, sys, json, time, array, random, shutil, argparse, platform, tempfile, subprocess, zipfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "Scripts"))
+
+import Prism_Compression_Core as Core
+
+# Compresses and decompresses scene files with every codec and level the plugin supports and reports
+# throughput, ratio, peak memory and wall time. Every compression and decompression runs in a process
+# of its own so the peak memory of one case does not carry into the next.
+#   python Benchmarks/benchmark.py --size 64 --levels quick --workers 1 4
+#   python Benchmarks/benchmark.py --input /project/.../sh010_v0012.ma --codec Zstd --output zstd.json
+
+MB = 1024 * 1024
+
+# Generated scenes are kept here and reused by the next run with the same size and seed
+DEFAULT_DATA_DIR = os.path.join(tempfile.gettempdir(), "PrismCompressionBenchmark")
+
+def _asciiNode(rng:random.Random, node:int) -> str:
+    # A transform and a mesh the way Maya ASCII writes them, vertex positions rounded like a saved scene
+    name = f"pCube{node}"
+    lines = [
+        f'createNode transform -n "{name}" -p "group{node // 50}";',
+        f'\trename -uid "{rng.getrandbits(128):032X}";',
+        f'\tsetAttr ".t" -type "double3" {rng.uniform(-100, 100):.6g} {rng.uniform(0, 50):.6g} {rng.uniform(-100, 100):.6g} ;',
+        f'createNode mesh -n "{name}Shape" -p "{name}";',
+        '\tsetAttr -k off ".v";',
+        '\tsetAttr ".vir" yes;',
+        '\tsetAttr ".uvst[0].uvsn" -type "string" "map1";',
+    ]
+    count = rng.randint(64, 512)
+    lines.append(f'\tsetAttr -s {count} ".vt";')
+    lines.append(f'\tsetAttr ".vt[0:{count - 1}]"')
+    for i in range(0, count, 3):
+        points = (f"{rng.uniform(-1, 1):.4f} {i / count:.4f} {rng.uniform(-1, 1):.4f}" for _ in range(min(3, count - i)))
+        lines.append("\t\t " + " ".join(points))
+    lines[-1] += ";"
+    return "\n".join(lines) + "\n"
+
+def generateAscii(path:str, size:int, seed:int = 0):
+    rng = random.Random(seed)
+    with open(path, "w", newline="\n") as f:
+        written = f.write('//Maya ASCII 2024 scene\n//Name: benchmark.ma\nrequires maya "2024";\ncurrentUnit -l centimeter -a degree -t film;\n')
+        node = 0
+        while written < size:
+            written += f.write(_asciiNode(rng, node))
+            node += 1
+
+def _iffChunk(tag:bytes, data:bytes) -> bytes:
+    # Maya binary is an IFF file, 4 byte tag, big endian size and the data padded to 4 bytes
+    return tag + len(data).to_bytes(4, "big") + data + b"\0" * (-len(data) % 4)
+
+def generateBinary(path:str, size:int, seed:int = 0):
+    # Meshes as float arrays plus a share of texture like noise that does not compress
+    rng = random.Random(seed)
+    with open(path, "wb") as f:
+        written = f.write(_iffChunk(b"FOR4", b"Maya" + _iffChunk(b"VERS", b"2024")))
+        node = 0
+        while written < size:
+            count = rng.randint(1024, 16384)
+            vertices = array.array("f", (round(rng.uniform(-1, 1), 3) for _ in range(count * 3)))
+            mesh = _iffChunk(b"CREA", f"mesh\0pCube{node}Shape\0pCube{node}\0".encode()) + _iffChunk(b"VRTS", vertices.tobytes())
+            if node % 8 == 0:
+                mesh += _iffChunk(b"TEX ", rng.randbytes(count * 4))
+            written += f.write(_iffChunk(b"FOR4", b"MESH" + mesh))
+            node += 1
+
+GENERATORS = {
+    "ascii": (generateAscii, ".ma"),
+    "binary": (generateBinary, ".mb")
+}
+
+def prepareData(args) -> list:
+    # (name, path) of every scene the cases run on
+    datasets = [(os.path.basename(path), os.path.abspath(path)) for path in args.input or []]
+    if args.input and not args.size:
+        return datasets
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    for kind in args.kind:
+        generator, ext = GENERATORS[kind]
+        for size in args.size or [64]:
+            path = os.path.join(args.data_dir, f"{kind}_{size}MB_seed{args.seed}{ext}")
+            if not os.path.exists(path):
+                print(f"Generating {path}", file=sys.stderr)
+                generator(path + ".part", size * MB, args.seed)
+                os.replace(path + ".part", path)
+            datasets.append((f"{kind}-{size}MB", path))
+    return datasets
+
+def codecs(names:list = None) -> list:
+    # (label, options) of every codec compressFile supports, zip once per method
+    variants = []
+    for compressionType in Core.availableCompressionTypes():
+        if compressionType == "Zip":
+            for method, value in Core.CompressionZipType.items():
+                variants.append((f"Zip {method.removeprefix('ZIP_').lower()}", {"type": "Zip", "zipMethod": value}))
+        else:
+            variants.append((compressionType, {"type": compressionType}))
+        if compressionType == "Zstd":
+            variants.append(("Zstd seekable", {"type": "Zstd", "seekable": True}))
+    if names:
+        variants = [(label, options) for label, options in variants if label in names or options["type"] in names]
+    return variants
+
+def levels(options:dict, mode:str) -> list:
+    # None is the default level of the codec
+    levelRange = Core.getLevelRange(options["type"], options.get("zipMethod", zipfile.ZIP_DEFLATED))
+    if levelRange is None:
+        return [None]
+    if mode == "all":
+        return list(range(levelRange[0], levelRange[1] + 1))
+    if mode == "quick":
+        return list(dict.fromkeys([levelRange[0], None, levelRange[1]]))
+    return [None]
+
+def buildCases(args, datasets:list) -> list:
+    cases = []
+    for name, path in datasets:
+        for label, options in codecs(args.codec):
+            for level in levels(options, args.levels):
+                for verify in args.verify:
+                    for workers in args.workers:
+                        cases.append({
+                            "data": name,
+                            "source": path,
+                            "codec": label,
+                            "level": level,
+                            "verify": verify,
+                            "workers": workers,
+                            "copies": max(args.copies or workers, 1),
+                            "options": dict(options, level=level, verify=verify, threads=args.threads, deleteOld=True)
+                        })
+    return cases
+
+def peakRss():
+    # Peak resident memory in bytes of this process and the pool workers it waited for, None without the resource module
+    try:
+        import resource
+    except ImportError:
+        return None
+    # bytes on macOS, kilobytes everywhere else
+    scale = 1 if sys.platform == "darwin" else 1024
+    return max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) * scale
+
+def runPhase(phase:dict) -> dict:
+    # Runs inside the benchmark subprocess, compresses or decompresses the copies of one case
+    options = phase["options"]
+    function = Core.decompressFile if phase["phase"] == "decompress" else None
+    jobs = Core.bulkJobs(phase["files"], options, function)
+    start = time.perf_counter()
+    results = Core.flattenResults(Core.runJobs(jobs, options, phase["workers"]))
+    wall = time.perf_counter() - start
+    return {
+        "wall": wall,
+        "peakRss": peakRss(),
+        # Auto picks the archive type per scene, the archives are taken from the results. Solid versions share one.
+        "archives": list(dict.fromkeys(r["archive"] for r in results if r["status"] == "done" and r["archive"])),
+        "errors": [r["error"] or f"{r['status']}: {r['archive'] or r['file']}" for r in results if r["status"] != "done"]
+    }
+
+def _subprocess(phase:dict) -> dict:
+    process = subprocess.run([sys.executable, os.path.abspath(__file__), "--run-phase"], input=json.dumps(phase), capture_output=True, text=True)
+    if process.returncode:
+        return {"wall": None, "peakRss": None, "errors": [process.stderr.strip() or f"exit code {process.returncode}"]}
+    return json.loads(process.stdout.splitlines()[-1])
+
+def _folderSize(folder:str) -> int:
+    return sum(os.path.getsize(os.path.join(root, f)) for root, dirs, files in os.walk(folder) for f in files)
+
+def _digest(path:str) -> str:
+    with open(path, "rb") as f:
+        return Core.readDigest(f).hex()
+
+def runCase(case:dict, workDir:str, sourceDigest:str) -> dict:
+    # Copies the scene, compresses the copies and decompresses them again, copying is not timed
+    work = tempfile.mkdtemp(dir=workDir)
+    try:
+        name, ext = os.path.splitext(os.path.basename(case["source"]))
+        files = [os.path.join(work, f"{name}_v{i + 1:04d}{ext}") for i in range(case["copies"])]
+        for file in files:
+            shutil.copyfile(case["source"], file)
+        size = sum(os.path.getsize(file) for file in files)
+        # Every case starts with an empty content store
+        options = dict(case["options"], storeDir=os.path.join(work, "Store"))
+
+        result = dict(case, bytes=size)
+        del result["options"]
+        compress = _subprocess({"phase": "compress", "files": files, "options": options, "workers": case["workers"]})
+        result.update(compressWall=compress["wall"], compressRss=compress["peakRss"], errors=compress["errors"])
+        if compress["errors"]:
+            return result
+
+        archives = compress["archives"]
+        compressed = sum(os.path.getsize(archive) for archive in archives) + _folderSize(options["storeDir"])
+        decompress = _subprocess({"phase": "decompress", "files": archives, "options": options, "workers": case["workers"]})
+        result.update(
+            compressedBytes=compressed,
+            ratio=size / compressed if compressed else None,
+            compressMBs=size / MB / compress["wall"] if compress["wall"] else None,
+            decompressWall=decompress["wall"],
+            decompressRss=decompress["peakRss"],
+            decompressMBs=size / MB / decompress["wall"] if decompress["wall"] else None,
+            errors=decompress["errors"]
+        )
+        # The round trip has to give back the scene byte for byte
+        if not decompress["errors"]:
+            result["errors"] = [f"{os.path.basename(file)} differs after decompression" for file in files if not os.path.exists(file) or _digest(file) != sourceDigest]
+        return result
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+def _format(value, spec:str) -> str:
+    return "-" if value is None else format(value, spec)
+
+def printTable(results:list):
+    columns = ["data", "codec", "level", "verify", "workers", "ratio", "comp MB/s", "decomp MB/s", "comp RSS MB", "decomp RSS MB", "comp s", "decomp s", ""]
+    rows = []
+    for r in results:
+        rows.append([
+            r["data"], r["codec"], "default" if r["level"] is None else str(r["level"]), r["verify"], str(r["workers"]),
+            _format(r.get("ratio"), ".2f"), _format(r.get("compressMBs"), ".1f"), _format(r.get("decompressMBs"), ".1f"),
+            _format(r.get("compressRss") and r["compressRss"] / MB, ".0f"), _format(r.get("decompressRss") and r["decompressRss"] / MB, ".0f"),
+            _format(r.get("compressWall"), ".2f"), _format(r.get("decompressWall"), ".2f"),
+            "FAILED" if r["errors"] else ""
+        ])
+    widths = [max(len(row[i]) for row in rows + [columns]) for i in range(len(columns))]
+    for row in [columns] + rows:
+        print("  ".join(cell.ljust(width) if i < 4 else cell.rjust(width) for i, (cell, width) in enumerate(zip(row, widths))).rstrip())
+
+def environment() -> dict:
+    # Recorded with the results so runs on different machines and versions can be told apart
+    versions = {}
+    if Core.zstandard is not None:
+        versions["zstandard"] = Core.zstandard.__version__
+    if Core.lz4 is not None:
+        versions["lz4"] = Core.lz4.__version__
+    return {
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpus": os.cpu_count(),
+        "modules": versions
+    }
+
+def buildParser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="benchmark", description="Benchmark the compression codecs of the plugin on scene files")
+    parser.add_argument("--input", action="append", help="scene file to benchmark, repeatable, nothing is generated unless --size is given too")
+    parser.add_argument("--size", type=int, action="append", help="size in MB of the generated scenes, repeatable, default 64")
+    parser.add_argument("--kind", choices=list(GENERATORS), nargs="+", default=list(GENERATORS), help="generated scene formats")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR, help="folder of the generated scenes")
+    parser.add_argument("--work-dir", help="folder the cases run in, default the system temp folder")
+    parser.add_argument("--codec", action="append", help="only this codec, e.g. Zstd or 'Zip lzma', repeatable")
+    parser.add_argument("--levels", choices=["all", "quick", "default"], default="all", help="every level, lowest/default/highest or the default level")
+    parser.add_argument("--verify", choices=Core.VerifyModes, nargs="+", default=["None", "Fast"])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1], help="worker process counts")
+    parser.add_argument("--copies", type=int, help="copies of the scene per case, default the worker count")
+    parser.add_argument("--threads", type=int, default=-1, help="zstd threads of a single worker, -1 every core")
+    parser.add_argument("--output", default="benchmark.json", help="json file the results are written to")
+    parser.add_argument("--run-phase", action="store_true", help=argparse.SUPPRESS)
+    return parser
+
+def main(argv:list = None) -> int:
+    args = buildParser().parse_args(argv)
+    if args.run_phase:
+        print(json.dumps(runPhase(json.loads(sys.stdin.read()))))
+        return 0
+
+    datasets = prepareData(args)
+    cases = buildCases(args, datasets)
+    digests = {path: _digest(path) for _, path in datasets}
+    results = []
+    for i, case in enumerate(cases):
+        level = "default" if case["level"] is None else case["level"]
+        print(f"[{i + 1}/{len(cases)}] {case['data']} {case['codec']} level {level} verify {case['verify']} x{case['workers']}", file=sys.stderr)
+        results.append(runCase(case, args.work_dir, digests[case["source"]]))
+
+    printTable(results)
+    with open(args.output, "w") as f:
+        json.dump({"environment": environment(), "arguments": {k: v for k, v in vars(args).items() if k != "run_phase"}, "results": results}, f, indent=2)
+    print(f"Results written to {args.output}", file=sys.stderr)
+    return 1 if any(r["errors"] for r in results) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+import os, sys, json, time, argparse, platform, statistics, subprocess, tempfile
+
+SCRIPTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "Scripts")
+
+# Measures what the plugin adds to a Prism launch, importing it, creating it and the onPluginsLoaded callback.
+# Every run is a fresh interpreter, Qt and Prism's own modules are imported before the clock starts since
+# Prism has them loaded anyway. Modules the plugin should only load on first use are listed when a run loaded them.
+#   python Benchmarks/startup.py --prism-scripts "C:/Program Files/Prism2/Scripts" --runs 20
+#   python Benchmarks/startup.py --prism-scripts /opt/Prism2/Scripts --importtime
+
+# Codecs, archive formats and job machinery, none of them is needed before a compression feature is used
+DEFERRED_MODULES = ["zipfile", "tarfile", "gzip", "bz2", "lzma", "mmap", "zstandard", "lz4", "cProfile", "multiprocessing", "concurrent.futures"]
+
+# Modules of the plugin loaded by Prism_Compression_init
+STARTUP_MODULES = ["Prism_Compression_init", "Prism_Compression_Variables", "Prism_Compression_Functions"]
+
+class StartupCore(object):
+    # The parts of PrismCore the plugin touches while Prism starts
+    uiAvailable = True
+
+    def __init__(self, userini:str):
+        self.userini = userini
+        self.callbacks = {}
+
+    def registerCallback(self, name:str, function, plugin=None):
+        self.callbacks.setdefault(name, []).append(function)
+
+    def getPluginSceneFormats(self) -> list:
+        return [".ma", ".mb", ".hip", ".blend", ".nk"]
+
+def runOnce(prismScripts:list) -> dict:
+    sys.path[:0] = [os.path.abspath(SCRIPTS)] + prismScripts
+    from qtpy.QtCore import QCoreApplication
+    from qtpy import QtGui, QtWidgets
+    import PrismCore
+    from ProjectScripts import SceneBrowser
+    app = QCoreApplication.instance() or QCoreApplication([])
+
+    before = set(sys.modules)
+    start = time.perf_counter()
+    import Prism_Compression_init
+    imported = time.perf_counter()
+    core = StartupCore(os.path.join(tempfile.gettempdir(), "PrismCompressionStartup", "Prism.json"))
+    Prism_Compression_init.Prism_Compression(core)
+    created = time.perf_counter()
+    for callback in core.callbacks.get("onPluginsLoaded", []):
+        callback()
+    loaded = time.perf_counter()
+
+    modules = sorted(set(sys.modules) - before)
+    return {
+        "import": imported - start,
+        "create": created - imported,
+        "pluginsLoaded": loaded - created,
+        "total": loaded - start,
+        "modules": modules,
+        "deferred": [name for name in modules if any(name == deferred or name.startswith(deferred + ".") for deferred in DEFERRED_MODULES)],
+        "plugin": [name for name in modules if name.startswith("Prism_Compression_") and name not in STARTUP_MODULES]
+    }
+
+def _subprocess(args, extra:list = None) -> dict:
+    command = [sys.executable] + (extra or []) + [os.path.abspath(__file__), "--run-once"] + [f"--prism-scripts={path}" for path in args.prism_scripts or []]
+    process = subprocess.run(command, capture_output=True, text=True)
+    if process.returncode:
+        raise RuntimeError(process.stderr.strip() or f"exit code {process.returncode}")
+    result = json.loads(process.stdout.splitlines()[-1])
+    result["stderr"] = process.stderr
+    return result
+
+def importTimes(stderr:str, modules:list, limit:int) -> list:
+    # (cumulative microseconds, module) of the slowest imports of the plugin from -X importtime,
+    # modules Qt and Prism loaded before the plugin are left out
+    modules = set(modules)
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        if name.strip() in modules:
+            rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:limit]
+
+def summarize(runs:list) -> dict:
+    return {key: {"median": statistics.median(run[key] for run in runs), "min": min(run[key] for run in runs)} for key in ("import", "create", "pluginsLoaded", "total")}
+
+def buildParser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="startup", description="Measure the time the plugin adds to a Prism launch")
+    parser.add_argument("--prism-scripts", action="append", help="Prism's Scripts folder with PrismCore and ProjectScripts, repeatable")
+    parser.add_argument("--runs", type=int, default=10, help="fresh interpreters measured")
+    parser.add_argument("--importtime", action="store_true", help="also list the slowest imports of the plugin")
+    parser.add_argument("--output", help="json file the results are written to")
+    parser.add_argument("--run-once", action="store_true", help=argparse.SUPPRESS)
+    return parser
+
+def main(argv:list = None) -> int:
+    args = buildParser().parse_args(argv)
+    if args.run_once:
+        print(json.dumps(runOnce(args.prism_scripts or [])))
+        return 0
+
+    runs = []
+    for i in range(args.runs):
+        print(f"[{i + 1}/{args.runs}]", file=sys.stderr)
+        runs.append(_subprocess(args))
+    summary = summarize(runs)
+    for key, values in summary.items():
+        print(f"{key:<16}{values['median'] * 1000:>8.1f} ms median{values['min'] * 1000:>8.1f} ms min")
+
+    deferred = sorted({name for run in runs for name in run["deferred"] + run["plugin"]})
+    print(f"Modules loaded:   {len(runs[0]['modules'])}")
+    print(f"Loaded too early: {', '.join(deferred) or 'none'}")
+
+    slowest = []
+    if args.importtime:
+        run = _subprocess(args, ["-X", "importtime"])
+        slowest = importTimes(run["stderr"], run["modules"], 15)
+        for cumulative, name in slowest:
+            print(f"{cumulative / 1000:>8.1f} ms  {name}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "environment": {"date": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(), "platform": platform.platform()},
+                "summary": summary,
+                "loadedTooEarly": deferred,
+                "slowestImports": slowest,
+                "runs": [{key: value for key, value in run.items() if key != "stderr"} for run in runs]
+            }, f, indent=2)
+        print(f"Results written to {args.output}", file=sys.stderr)
+    # A startup that loads the codecs again fails the run, e.g. in CI
+    return 1 if deferred else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
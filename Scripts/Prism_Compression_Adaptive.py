@@ -0,0 +1,123 @@
+import os, json, time, zlib, zipfile, threading
+
+import Prism_Compression_Core as Core
+from Prism_Compression_Core import zstandard, lz4
+
+# Adaptive codec selection for the Auto compression type. A sample of the file is compressed with every
+# candidate codec, cheapest first, until the sampling budget is spent. The codec saving the most bytes per
+# CPU second is used, files no codec shrinks by MIN_GAIN are stored uncompressed in a zip. The choice is
+# cached per extension so the next files of the same format are not sampled again.
+
+# Bytes read at the start, middle and end of the file
+SAMPLE_SIZE = 256 * 1024
+SAMPLE_POINTS = 3
+
+# Share of the sample a codec has to save to be worth its CPU time
+MIN_GAIN = 0.05
+
+# Choices are sampled again after this many seconds
+CACHE_TTL = 7 * 24 * 60 * 60
+
+_cache = {}
+_cacheLock = threading.Lock()
+
+def candidates() -> list:
+    # (type, zip method, level) of every codec sampled, cheapest first
+    result = []
+    if lz4 is not None:
+        result.append(("LZ4", None, Core.FrameDefaultLevel["LZ4"]))
+    if zstandard is not None:
+        result.append(("Zstd", None, Core.FrameDefaultLevel["Zstd"]))
+    result.append(("Zip", zipfile.ZIP_DEFLATED, 6))
+    if zstandard is not None:
+        result.append(("Zstd", None, 12))
+    return result
+
+def _compressor(compressionType:str, level):
+    if compressionType == "LZ4":
+        return lambda data: lz4.frame.compress(data, compression_level=level)
+    if compressionType == "Zstd":
+        compressor = zstandard.ZstdCompressor(level=level)
+        return compressor.compress
+    return lambda data: zlib.compress(data, level)
+
+def readSample(file:str) -> bytes:
+    size = os.path.getsize(file)
+    with open(file, "rb") as f:
+        if size <= SAMPLE_SIZE * SAMPLE_POINTS:
+            return f.read()
+        parts = []
+        for point in range(SAMPLE_POINTS):
+            f.seek((size - SAMPLE_SIZE) * point // (SAMPLE_POINTS - 1))
+            parts.append(f.read(SAMPLE_SIZE))
+        return b"".join(parts)
+
+def probe(sample:bytes, budget:float) -> dict:
+    # Compresses the sample with the candidates until budget CPU seconds are spent
+    results = []
+    spent = 0.0
+    for compressionType, zipMethod, level in candidates():
+        if results and spent >= budget:
+            break
+        compress = _compressor(compressionType, level)
+        start = time.thread_time()
+        compressed = len(compress(sample))
+        seconds = max(time.thread_time() - start, 1e-6)
+        spent += seconds
+        results.append({"type": compressionType, "zipMethod": zipMethod, "level": level, "gain": 1 - compressed / max(len(sample), 1), "seconds": seconds})
+
+    worthwhile = [result for result in results if result["gain"] >= MIN_GAIN]
+    if not worthwhile:
+        return {"type": "Zip", "zipMethod": zipfile.ZIP_STORED, "level": None, "gain": 0.0, "date": time.time()}
+    best = max(worthwhile, key=lambda result: result["gain"] * len(sample) / result["seconds"])
+    return {"type": best["type"], "zipMethod": best["zipMethod"], "level": best["level"], "gain": best["gain"], "date": time.time()}
+
+def _loadCache(path:str) -> dict:
+    if path is None or not os.path.isfile(path):
+        return {}
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _saveCache(path:str, ext:str, choice:dict):
+    # Worker processes write their choices at once, whichever is written last is kept
+    try:
+        choices = dict(_loadCache(path), **{ext: choice})
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp, "w") as f:
+            json.dump(choices, f)
+        os.replace(temp, path)
+    except OSError:
+        pass
+
+def chooseCodec(file:str, options:dict) -> dict:
+    # Cached choice of the extension, sampled again once it expired
+    ext = os.path.splitext(file)[1].lower()
+    cachePath = options["adaptiveCache"]
+    with _cacheLock:
+        choice = _cache.get((cachePath, ext))
+    if choice is None:
+        choice = _loadCache(cachePath).get(ext)
+    if choice is not None and time.time() - choice["date"] < CACHE_TTL:
+        with _cacheLock:
+            _cache[(cachePath, ext)] = choice
+        return choice
+
+    choice = probe(readSample(file), options["adaptiveBudget"])
+    with _cacheLock:
+        _cache[(cachePath, ext)] = choice
+    if cachePath is not None:
+        _saveCache(cachePath, ext, choice)
+    return choice
+
+def adaptiveOptions(file:str, options:dict) -> dict:
+    # Options of the codec chosen for file
+    try:
+        choice = chooseCodec(file, options)
+    except OSError:
+        # Unreadable now, compressFile reports the error with the default codec
+        choice = {"type": "Zip", "zipMethod": zipfile.ZIP_DEFLATED, "level": None}
+    return dict(options, type=choice["type"], zipMethod=choice["zipMethod"] if choice["zipMethod"] is not None else options["zipMethod"], level=choice["level"])
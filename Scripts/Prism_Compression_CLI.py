@@ -0,0 +1,246 @@
+import os, sys, glob, json, argparse, threading, signal
+
+import Prism_Compression_Core as Core
+import Prism_Compression_Index as Index
+import Prism_Compression_Retention as Retention
+import Prism_Compression_Metrics as Metrics
+import Prism_Compression_Report as Report
+
+# Headless entry point, runs without Qt or Prism, e.g. on a render node or a cron host:
+#   python Prism_Compression_CLI.py compress /project/.../Scenefiles/Anim/main --type Zstd --level 19 --workers 64
+#   python Prism_Compression_CLI.py sweep /project --keep-latest 3 --keep-days 14 --workers 64
+#   python Prism_Compression_CLI.py report /project --index index.json --estimates estimates.json
+
+# Scene formats of the common DCC plugins, folders are searched for these unless --ext is given
+DEFAULT_EXTS = [".ma", ".mb", ".hip", ".hipnc", ".hiplc", ".blend", ".max", ".c4d", ".nk", ".aep", ".spp", ".ztl", ".psd", ".hrox"]
+
+def expandPaths(paths:list, exts:list, archives:bool) -> list:
+    # Files, globs and task folders to a sorted list of files, folders give their scenes or archives
+    files = []
+    for path in paths:
+        matches = sorted(glob.glob(path)) if any(c in path for c in "*?[") else [path]
+        for match in matches:
+            if os.path.isdir(match):
+                entries = Index.scanFolder(match, exts)
+                files.extend(os.path.join(match, e["name"]) for e in entries if e["compressed"] == archives)
+            elif os.path.isfile(match):
+                files.append(match)
+            else:
+                print(f"Skipping {match}, no such file or folder", file=sys.stderr)
+    return list(dict.fromkeys(files))
+
+def _parseDictionaries(values:list) -> dict:
+    dictionaries = {}
+    for value in values or []:
+        ext, _, dictId = value.partition("=")
+        dictionaries[ext] = int(dictId)
+    return dictionaries
+
+def _options(args) -> dict:
+    options = {
+        "deleteOld": not args.keep,
+        "dictionaryDir": args.dictionary_dir,
+        "profileDir": os.path.abspath(args.profile) if args.profile else None,
+        "journalDir": os.path.abspath(args.journal_dir) if args.journal_dir else None,
+        "fsync": not args.no_fsync,
+        "solidMembers": getattr(args, "member", None)
+    }
+    if hasattr(args, "type"):
+        options.update({
+            "type": args.type,
+            "zipMethod": Core.CompressionZipType[args.zip_method],
+            "level": args.level,
+            "verify": args.verify,
+            "threads": -1,
+            "delta": args.delta,
+            "keyframeInterval": args.keyframe_interval,
+            "dictionaries": _parseDictionaries(args.dictionary),
+            "seekable": args.seekable,
+            "frameSize": args.frame_size,
+            "mmapThreshold": args.mmap_threshold,
+            "chunkSize": args.chunk_size,
+            "readAhead": args.io_depth,
+            "writeBehind": args.io_depth,
+            "writeBuffer": args.write_buffer,
+            "stagingDir": os.path.abspath(args.staging_dir) if args.staging_dir else None,
+            "storeDir": args.store_dir,
+            "solid": args.solid,
+            "adaptiveBudget": args.sample_budget / 1000,
+            "adaptiveCache": os.path.abspath(args.adaptive_cache) if args.adaptive_cache else None,
+            "skipUnchanged": not args.force,
+            "recompressOnSettingsChange": args.recompress_on_settings_change
+        })
+    return options
+
+class _Reporter(object):
+    def __init__(self, quiet:bool):
+        self.quiet = quiet
+
+    def progress(self, name:str, done:int, total:int, throughput:float, eta:float):
+        if not self.quiet and total:
+            print(f"\r{name}: {done * 100 // total}% at {throughput / 1048576:.1f} MB/s", end="", file=sys.stderr, flush=True)
+
+    def result(self, label:str, result, finished:int, total:int):
+        if self.quiet:
+            return
+        for result in Core.flattenResults([result]):
+            print(f"\r[{finished}/{total}] {result['status']}: {result['archive'] or result['file']}", file=sys.stderr)
+            if result["error"]:
+                print(result["error"], file=sys.stderr)
+
+def _run(jobs:list, options:dict, args) -> int:
+    cancel = threading.Event()
+    # First Ctrl+C cancels between chunks, archives being written are removed
+    signal.signal(signal.SIGINT, lambda *_: cancel.set())
+    reporter = _Reporter(args.quiet)
+    if args.metrics:
+        Metrics.addHook(Metrics.MetricsLog(os.path.abspath(args.metrics)))
+    results = Core.flattenResults(Core.runJobs(jobs, options, args.workers, reporter.progress, cancel, reporter.result))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    counts = {status: sum(r["status"] == status for r in results) for status in ("done", "current", "skipped", "cancelled", "error")}
+    summary = ", ".join(f"{count} {status}" for status, count in counts.items())
+    done = [r["metrics"] for r in results if r["status"] == "done" and r["metrics"]]
+    if done:
+        summary += f", {sum(m['bytesIn'] for m in done) / 1048576:.1f} MB to {sum(m['bytesOut'] for m in done) / 1048576:.1f} MB"
+    print(summary, file=sys.stderr)
+    return 1 if counts["error"] or counts["cancelled"] else 0
+
+def compress(args) -> int:
+    options = _options(args)
+    files = expandPaths(args.paths, args.ext or DEFAULT_EXTS, archives=False)
+    return _run(Core.bulkJobs(files, options), options, args)
+
+def decompress(args) -> int:
+    options = _options(args)
+    files = expandPaths(args.paths, args.ext or DEFAULT_EXTS, archives=True)
+    return _run(Core.bulkJobs(files, options, Core.decompressFile), options, args)
+
+def verify(args) -> int:
+    options = _options(args)
+    files = expandPaths(args.paths, args.ext or DEFAULT_EXTS, archives=True)
+    return _run(Core.bulkJobs(files, options, Core.verifyArchive), options, args)
+
+def sweep(args) -> int:
+    # Retention policy over the whole project, without the throttling of the background sweep
+    options = _options(args)
+    policy = {"keepLatest": args.keep_latest, "keepDays": args.keep_days}
+    selected = Retention.evaluateProject(args.project, args.ext or DEFAULT_EXTS, policy)
+
+    jobs, locks = [], []
+    try:
+        for task, files in selected.items():
+            lock = Retention.acquireLock(task)
+            if lock is None:
+                print(f"Skipping {task}, another session is compressing it", file=sys.stderr)
+                continue
+            locks.append(lock)
+            jobs.extend(Core.bulkJobs(files, options))
+        if args.dry_run:
+            for function, files, label in jobs:
+                print(label)
+            return 0
+        return _run(jobs, options, args)
+    finally:
+        for lock in locks:
+            Retention.releaseLock(lock)
+
+def report(args) -> int:
+    # Bytes and estimated savings per department and task, nothing is compressed
+    index = Index.FileIndex(os.path.abspath(args.index) if args.index else None)
+    progress = None if args.quiet else lambda name, done, total, *_: print(f"\rListed {done}/{total} task folders", end="", file=sys.stderr, flush=True)
+    reports = [Report.storageReport(path, args.ext or DEFAULT_EXTS, index, args.workers, os.path.abspath(args.estimates) if args.estimates else None, progress) for path in args.paths]
+    index.save()
+    if not args.quiet:
+        print(file=sys.stderr)
+    if args.json:
+        print(json.dumps(reports, indent=2))
+    else:
+        for each in reports:
+            print(each["path"])
+            print(Report.reportText(each, args.limit))
+    return 0
+
+def _addCommonArguments(parser:argparse.ArgumentParser):
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="number of processes, default every core")
+    parser.add_argument("--ext", action="append", help="scene extension searched in folders, repeatable")
+    parser.add_argument("--keep", action="store_true", help="keep the source after the job")
+    parser.add_argument("--dictionary-dir", help="folder of the trained zstd dictionaries")
+    parser.add_argument("--json", action="store_true", help="print the results as json")
+    parser.add_argument("--quiet", action="store_true", help="only print the summary")
+    parser.add_argument("--metrics", metavar="FILE", help="append the metrics of every job to this json lines file")
+    parser.add_argument("--profile", metavar="FOLDER", help="save the cProfile stats of every job into this folder")
+    parser.add_argument("--journal-dir", metavar="FOLDER", help="journal finished jobs in this folder, running the same command again resumes after them")
+    parser.add_argument("--no-fsync", action="store_true", help="don't sync archives to disk before the sources are deleted")
+
+def _addCompressArguments(parser:argparse.ArgumentParser):
+    parser.add_argument("--type", choices=Core.availableCompressionTypes(), default=Core.DefaultOptions["type"])
+    parser.add_argument("--zip-method", choices=list(Core.CompressionZipType), default="ZIP_DEFLATED")
+    parser.add_argument("--level", type=int, help="compression level, default of the codec when omitted")
+    parser.add_argument("--verify", choices=Core.VerifyModes, default=Core.DefaultOptions["verify"])
+    parser.add_argument("--delta", action="store_true", help="store versions as chains of differences")
+    parser.add_argument("--keyframe-interval", type=int, default=Core.DefaultOptions["keyframeInterval"])
+    parser.add_argument("--dictionary", action="append", metavar="EXT=ID", help="zstd dictionary id of an extension, repeatable")
+    parser.add_argument("--seekable", action="store_true", help="write zstd archives as independent frames with a seek table")
+    parser.add_argument("--frame-size", type=int, default=Core.DefaultOptions["frameSize"], help="bytes per frame of seekable archives")
+    parser.add_argument("--store-dir", help="content store folder of the Store type, e.g. <pipeline>/Compression/Store")
+    parser.add_argument("--sample-budget", type=int, default=int(Core.DefaultOptions["adaptiveBudget"] * 1000), help="milliseconds of CPU the Auto type spends sampling a scene format")
+    parser.add_argument("--adaptive-cache", metavar="FILE", help="json file keeping the codec the Auto type chose for each extension")
+    parser.add_argument("--solid", action="store_true", help="append the versions of each task to its solid task archive (.pcs)")
+    parser.add_argument("--force", action="store_true", help="compress sources again even when their archive is current")
+    parser.add_argument("--recompress-on-settings-change", action="store_true", help="compress sources again when their archive was written with another type or level")
+    parser.add_argument("--mmap-threshold", type=int, default=Core.DefaultOptions["mmapThreshold"], help="memory map sources of at least this many bytes, 0 never maps")
+    parser.add_argument("--chunk-size", type=int, default=Core.DefaultOptions["chunkSize"], help="bytes read from the source at a time")
+    parser.add_argument("--io-depth", type=int, default=Core.DefaultOptions["readAhead"], help="chunks read ahead and writes queued on their own threads, 0 reads and writes in the compressing thread")
+    parser.add_argument("--write-buffer", type=int, default=Core.DefaultOptions["writeBuffer"], help="bytes buffered before the archive is written to disk")
+    parser.add_argument("--staging-dir", metavar="FOLDER", help="write and verify archives in this local folder and copy them next to the source once complete")
+
+def buildParser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="Prism_Compression_CLI", description="Compress, decompress and verify Prism scene files without Prism")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser("compress", help="compress files, globs or task folders")
+    command.add_argument("paths", nargs="+")
+    _addCommonArguments(command)
+    _addCompressArguments(command)
+    command.set_defaults(function=compress)
+
+    command = commands.add_parser("decompress", help="decompress archives, globs or task folders")
+    command.add_argument("paths", nargs="+")
+    command.add_argument("--member", action="append", help="version extracted from solid task archives, repeatable, default every version")
+    _addCommonArguments(command)
+    command.set_defaults(function=decompress)
+
+    command = commands.add_parser("verify", help="check archives against their checksums")
+    command.add_argument("paths", nargs="+")
+    _addCommonArguments(command)
+    command.set_defaults(function=verify)
+
+    command = commands.add_parser("sweep", help="apply the retention policy to a whole project")
+    command.add_argument("project")
+    command.add_argument("--keep-latest", type=int, default=Retention.DefaultPolicy["keepLatest"])
+    command.add_argument("--keep-days", type=int, default=Retention.DefaultPolicy["keepDays"])
+    command.add_argument("--dry-run", action="store_true", help="only list the files the policy would compress")
+    _addCommonArguments(command)
+    _addCompressArguments(command)
+    command.set_defaults(function=sweep)
+
+    command = commands.add_parser("report", help="report the bytes and estimated savings of tasks, assets, shots or projects")
+    command.add_argument("paths", nargs="+")
+    command.add_argument("--ext", action="append", help="scene extension searched in folders, repeatable")
+    command.add_argument("--workers", type=int, help="threads listing folders and sampling scenes, default four per core")
+    command.add_argument("--index", metavar="FILE", help="file index json, folders that did not change are not listed again")
+    command.add_argument("--estimates", metavar="FILE", help="json file keeping the sampled savings of each scene format")
+    command.add_argument("--limit", type=int, default=20, help="tasks listed, largest savings first")
+    command.add_argument("--json", action="store_true", help="print the whole report as json")
+    command.add_argument("--quiet", action="store_true", help="don't print progress")
+    command.set_defaults(function=report)
+    return parser
+
+def main(argv:list = None) -> int:
+    args = buildParser().parse_args(argv)
+    return args.function(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
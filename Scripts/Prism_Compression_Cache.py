@@ -0,0 +1,134 @@
+import os, hashlib, shutil, tempfile, threading, traceback
+
+import Prism_Compression_Core as Core
+
+# Local scratch copies of archived scenes, opening an old version extracts only its scene here
+# and leaves the archive on the share untouched. Every archive gets a folder named after its path,
+# size and mtime so a rewritten archive is extracted again. Least recently opened folders are
+# removed once the cache grows over its size limit.
+
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), "PrismCompressionCache")
+DEFAULT_CACHE_SIZE = 20 * 1024 * 1024 * 1024
+
+# Large reads and writes, the archive usually sits on a network share
+CACHE_BUFFER = 8 * 1024 * 1024
+
+def _preallocate(fileobj, size:int):
+    # Reserves the space up front so the file is not grown chunk by chunk
+    if size <= 0:
+        return
+    if hasattr(os, "posix_fallocate"):
+        try:
+            os.posix_fallocate(fileobj.fileno(), 0, size)
+            return
+        except OSError:
+            pass
+    fileobj.truncate(size)
+    fileobj.seek(0)
+
+class ScratchCache(object):
+    def __init__(self, directory:str = DEFAULT_CACHE_DIR, maxSize:int = DEFAULT_CACHE_SIZE):
+        self.directory = directory
+        self.maxSize = maxSize
+        self.lock = threading.Lock()
+
+    def entryPath(self, archive:str) -> str:
+        stat = os.stat(archive)
+        key = f"{os.path.normcase(os.path.abspath(archive))}|{stat.st_size}|{stat.st_mtime_ns}"
+        return os.path.join(self.directory, hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest())
+
+    def cachedFile(self, archive:str):
+        # Path of the extracted scene, None when the archive is not cached
+        entry = self.entryPath(archive)
+        if not os.path.isdir(entry):
+            return None
+        files = [f for f in os.listdir(entry) if not f.endswith(".part")]
+        return os.path.join(entry, files[0]) if files else None
+
+    def extract(self, archive:str, options:dict = None, progress=None, cancel=None) -> str:
+        # Path of the scene of archive inside the cache, extracted on the first call
+        options = Core.getOptions(options)
+        entry = self.entryPath(archive)
+        cached = self.cachedFile(archive)
+        if cached is None:
+            os.makedirs(entry, exist_ok=True)
+            if Core.archiveType(archive) == "Delta":
+                import Prism_Compression_Delta as Delta
+                scratch = tempfile.mkdtemp(dir=self.directory, suffix=".part")
+                try:
+                    name = Delta.rebuildDelta(archive, scratch, options, sourceDirectory=os.path.dirname(archive))
+                    cached = os.path.join(entry, name)
+                    os.replace(os.path.join(scratch, name), cached)
+                finally:
+                    shutil.rmtree(scratch, ignore_errors=True)
+            else:
+                cached = self._extractMember(archive, entry, options, progress, cancel)
+
+        # Folder mtime is the last time the entry was opened
+        os.utime(entry)
+        self.evict(keep=entry)
+        return cached
+
+    def _extractMember(self, archive:str, entry:str, options:dict, progress, cancel) -> str:
+        with Core.openArchiveMember(archive, options["dictionaryDir"]) as (name, member, size):
+            name = os.path.basename(name)
+            # The archive checks its own crc while it is read, no need to hash the scene again
+            reader = Core.SourceReader(member, name, size, CACHE_BUFFER, progress, cancel, checksums=False)
+            # Written under a temporary name, a cancelled or failed extraction never looks cached
+            part = os.path.join(entry, f"{name}.{threading.get_ident()}.part")
+            try:
+                with open(part, "wb", buffering=0) as out:
+                    _preallocate(out, size)
+                    while chunk := reader.read(CACHE_BUFFER):
+                        out.write(chunk)
+                    out.truncate(reader.size)
+                reader.report(True)
+                if reader.size != size:
+                    raise ValueError(f"{name} is truncated in {os.path.basename(archive)}")
+                os.replace(part, os.path.join(entry, name))
+            except BaseException:
+                Core.removePartial(part)
+                raise
+        return os.path.join(entry, name)
+
+    def size(self) -> int:
+        total = 0
+        for root, dirs, files in os.walk(self.directory):
+            total += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+        return total
+
+    def evict(self, keep:str = None):
+        # Removes the least recently opened entries until the cache fits its size limit
+        with self.lock:
+            if not os.path.isdir(self.directory):
+                return
+            entries = []
+            for name in os.listdir(self.directory):
+                path = os.path.join(self.directory, name)
+                if not os.path.isdir(path) or name.endswith(".part"):
+                    continue
+                size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+                entries.append((os.path.getmtime(path), path, size))
+
+            total = sum(size for _, _, size in entries)
+            for _, path, size in sorted(entries):
+                if total <= self.maxSize:
+                    break
+                if path == keep:
+                    continue
+                shutil.rmtree(path, ignore_errors=True)
+                total -= size
+
+    def clear(self):
+        with self.lock:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+def openCached(archive:str, cache:ScratchCache, options:dict = None, progress=None, cancel=None) -> dict:
+    # Job function, result file is the scene inside the cache
+    try:
+        file = cache.extract(archive, options, progress, cancel)
+    except Core.CompressionCancelled:
+        return Core.jobResult(None, archive, "cancelled")
+    except Exception as e:
+        return Core.jobResult(None, archive, "error", f"Error opening file \n {traceback.format_exception(e)}")
+    return Core.jobResult(file, archive, "done")
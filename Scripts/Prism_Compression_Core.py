@@ -0,0 +1,1067 @@
+import zipfile, tarfile, gzip, io, os, sys, traceback, shutil, lzma, struct, zlib, hashlib, time, json, contextlib, re, tempfile, threading, queue, mmap
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+import Prism_Compression_Dictionary as Dictionary
+import Prism_Compression_Metrics as Metrics
+import Prism_Compression_Journal as Journal
+
+# Plain python compression engine, kept free of qtpy and PrismCore so it can be
+# executed inside worker processes.
+
+CompressionZipType = {
+    "ZIP_STORED" : 0,
+    "ZIP_DEFLATED" : 8,
+    "ZIP_BZIP2" : 12,
+    "ZIP_LZMA" : 14
+}
+
+# Valid compresslevel range of every zip method, None when the method has no levels.
+# LZMA levels are xz presets.
+CompressionLevelRange = {
+    zipfile.ZIP_STORED : None,
+    zipfile.ZIP_DEFLATED : (0, 9),
+    zipfile.ZIP_BZIP2 : (1, 9),
+    zipfile.ZIP_LZMA : (0, 9)
+}
+
+# Zip with zstandard members needs python 3.14
+if hasattr(zipfile, "ZIP_ZSTANDARD"):
+    CompressionZipType["ZIP_ZSTANDARD"] = zipfile.ZIP_ZSTANDARD
+    CompressionLevelRange[zipfile.ZIP_ZSTANDARD] = (1, 22)
+
+# Archive extension written by every compression type
+CompressionTypes = {
+    "Zip" : ".zip",
+    "Tar.gz" : ".tar.gz",
+    "Zstd" : ".zst",
+    "LZ4" : ".lz4",
+    "Delta" : ".delta",
+    "Store" : ".cas",
+    "Solid" : ".pcs"
+}
+
+# Single stream codecs, the archive holds one compressed file behind a metadata frame
+FrameCompressionLevelRange = {
+    "Zstd" : (1, 22),
+    "LZ4" : (0, 16)
+}
+
+FrameDefaultLevel = {
+    "Zstd" : 3,
+    "LZ4" : 0
+}
+
+# Archives written as metadata frame | data | checksum frame, content store manifests included
+ContainerTypes = list(FrameCompressionLevelRange) + ["Store"]
+
+# Zstd and LZ4 archives start with a skippable frame holding the original file name and end with
+# one holding the checksums of the content, every zstd or lz4 decoder skips them
+METADATA_MAGIC = 0x184D2A5A
+CHECKSUM_MAGIC = 0x184D2A5B
+CHECKSUM_STRUCT = struct.Struct("<IIIQ32s")
+
+# Tar.gz levels are gzip levels
+TarCompressionLevelRange = (0, 9)
+
+# None skips verification, Fast compares the checksums taken while the source streamed
+# into the archive against the ones stored in it, Paranoid decompresses the whole archive again
+VerifyModes = ["None", "Fast", "Paranoid"]
+
+DefaultOptions = {
+    "type" : "Zip",
+    "zipMethod" : zipfile.ZIP_DEFLATED,
+    "level" : None,
+    "deleteOld" : True,
+    "verify" : "Fast",
+    "chunkSize" : 1024 * 1024,
+    "threads" : 0,
+    "delta" : False,
+    "keyframeInterval" : 10,
+    "dictionaries" : {},
+    "dictionaryDir" : None,
+    # Zstd archives cut into independent frames of frameSize bytes with a seek table,
+    # tar.gz archives are deflated in independent blocks of frameSize bytes on the codec threads
+    "seekable" : False,
+    "frameSize" : 4 * 1024 * 1024,
+    # Sources of at least this many bytes are memory mapped, 0 disables mapping
+    "mmapThreshold" : 256 * 1024 * 1024,
+    # Project folder of the content store the Store type writes its chunks to
+    "storeDir" : None,
+    # Every job saves its cProfile stats into this folder, None does not profile
+    "profileDir" : None,
+    # Sources unchanged since the archive listed in the manifest of their folder are not compressed again,
+    # with recompressOnSettingsChange only while the archive was written with the current type and level
+    "skipUnchanged" : True,
+    "recompressOnSettingsChange" : False,
+    # Bulk jobs append the versions of each task to its solid task archive instead of one archive per file
+    "solid" : False,
+    # Versions extracted from a solid task archive, None extracts every version
+    "solidMembers" : None,
+    # The Auto type samples each file with the candidate codecs for at most adaptiveBudget CPU seconds,
+    # choices are cached per extension in adaptiveCache, None keeps them in the process
+    "adaptiveBudget" : 0.25,
+    "adaptiveCache" : None,
+    # Archives are synced to disk before they replace the previous archive and before the source is deleted
+    "fsync" : True,
+    # Bulk runs journal their finished jobs in this folder and resume after them when run again, None does not journal
+    "journalDir" : None,
+    # Chunks read ahead of the compressor and writes queued behind it on their own threads, 0 reads and
+    # writes in the compressing thread. Archives are written through a buffer of writeBuffer bytes.
+    "readAhead" : 4,
+    "writeBehind" : 4,
+    "writeBuffer" : 4 * 1024 * 1024,
+    # Archives are written and verified in this local folder and copied to their folder once complete, None writes in place
+    "stagingDir" : None
+}
+
+COPY_BUFFER = 1024 * 1024
+
+# Archives are written through a buffer of whole pages
+WRITE_BUFFER = 4 * 1024 * 1024
+
+# Content digests are 32 byte BLAKE2b
+def newDigest():
+    return hashlib.blake2b(digest_size=32)
+
+# Minimum seconds between two progress reports of the same file
+PROGRESS_INTERVAL = 0.1
+
+# Seconds a spawned interpreter gets to start, the jobs run in the calling thread when it doesn't
+POOL_START_TIMEOUT = 20
+# Interpreters checked by pythonExecutable, the windowless one first so Windows opens no consoles
+PYTHON_NAMES = ["pythonw.exe", "python.exe"] if os.name == "nt" else [f"python{sys.version_info[0]}.{sys.version_info[1]}", f"python{sys.version_info[0]}", "python"]
+
+class CompressionCancelled(Exception):
+    pass
+
+class _LZMAPresetCompressor(zipfile.LZMACompressor):
+    # zipfile always uses the default LZMA preset, this one carries the configured preset
+    def __init__(self, preset:int):
+        super(_LZMAPresetCompressor, self).__init__()
+        self._preset = preset
+
+    def _init(self):
+        lzmaFilter = {'id': lzma.FILTER_LZMA1, 'preset': self._preset}
+        props = lzma._encode_filter_properties(lzmaFilter)
+        self._comp = lzma.LZMACompressor(lzma.FORMAT_RAW, filters=[lzmaFilter])
+        return struct.pack('<BBH', 9, 4, len(props)) + props
+
+class SourceReader(object):
+    # Checksums the source while it is read into the archive, one chunk at a time.
+    # Reports progress and checks the cancel flag between chunks.
+    def __init__(self, fileobj, name:str, total:int, chunkSize:int = COPY_BUFFER, progress=None, cancel=None, checksums:bool = True):
+        self.fileobj = fileobj
+        self.name = name
+        self.total = total
+        self.chunkSize = max(int(chunkSize), 64 * 1024)
+        self.progress = progress
+        self.cancel = cancel
+        self.crc = 0
+        self.size = 0
+        self.digest = newDigest()
+        self.checksums = checksums
+        self.start = time.perf_counter()
+        self.lastReport = 0.0
+        # PhaseTimer of the job, the time spent reading the source is added to it
+        self.timer = None
+        # Writes queued behind the compressor and the buffer of the archive file, see openOutput
+        self.writeBehind = 0
+        self.writeBuffer = WRITE_BUFFER
+
+    def read(self, size=-1):
+        if self.cancel is not None and self.cancel.is_set():
+            raise CompressionCancelled(self.name)
+
+        if self.timer is None:
+            return self.feed(self.fileobj.read(size))
+        start = time.perf_counter()
+        data = self.fileobj.read(size)
+        self.timer.add("read", time.perf_counter() - start)
+        return self.feed(data)
+
+    def feed(self, data:bytes) -> bytes:
+        # Counts data produced somewhere else, e.g. decompressed in parallel
+        if self.cancel is not None and self.cancel.is_set():
+            raise CompressionCancelled(self.name)
+        if self.checksums:
+            self.crc = zlib.crc32(data, self.crc)
+            self.digest.update(data)
+        self.size += len(data)
+        self.report()
+        return data
+
+    def report(self, force:bool = False):
+        if self.progress is None:
+            return
+        now = time.perf_counter()
+        if not force and now - self.lastReport < PROGRESS_INTERVAL:
+            return
+        self.lastReport = now
+        elapsed = max(now - self.start, 1e-6)
+        throughput = self.size / elapsed
+        eta = (self.total - self.size) / throughput if throughput > 0 else 0.0
+        self.progress(self.name, self.size, self.total, throughput, max(eta, 0.0))
+
+class MappedFile(object):
+    # Memory mapped source, read returns memoryview slices of the mapping so the chunks reach
+    # the checksums and the compressor without being copied into bytes first
+    # Pages ahead of the read position the kernel is asked to load
+    READ_AHEAD = 64 * 1024 * 1024
+
+    def __init__(self, fileobj):
+        self.map = mmap.mmap(fileobj.fileno(), 0, access=mmap.ACCESS_READ)
+        self.adviseAhead = hasattr(self.map, "madvise") and hasattr(mmap, "MADV_WILLNEED")
+        if self.adviseAhead and hasattr(mmap, "MADV_SEQUENTIAL"):
+            self.map.madvise(mmap.MADV_SEQUENTIAL)
+        self.view = memoryview(self.map)
+        self.pos = 0
+        self.advised = 0
+
+    def read(self, size=-1):
+        end = len(self.view) if size is None or size < 0 else min(self.pos + size, len(self.view))
+        if self.adviseAhead and end > self.advised and self.advised < len(self.view):
+            # Offsets passed to madvise have to be page aligned, READ_AHEAD is a multiple of every page size
+            length = min(self.READ_AHEAD, len(self.view) - self.advised)
+            self.map.madvise(mmap.MADV_WILLNEED, self.advised, length)
+            self.advised += length
+        data = self.view[self.pos:end]
+        self.pos = end
+        return data
+
+    def close(self):
+        try:
+            self.view.release()
+            self.map.close()
+        except BufferError:
+            # A consumer still holds a slice, the mapping is closed once it is collected
+            pass
+
+@contextlib.contextmanager
+def openSource(file:str, options:dict):
+    # Yields a file object of the source and its size, large sources are memory mapped,
+    # smaller ones are read ahead on a thread while the compressor works
+    with open(file, "rb") as src:
+        size = os.fstat(src.fileno()).st_size
+        if not options["mmapThreshold"] or size < options["mmapThreshold"]:
+            if not options["readAhead"]:
+                yield src, size
+                return
+            import Prism_Compression_Pipeline as Pipeline
+            prefetch = Pipeline.PrefetchReader(src, max(int(options["chunkSize"]), 64 * 1024), options["readAhead"])
+            try:
+                yield prefetch, size
+            finally:
+                prefetch.close()
+            return
+        mapped = MappedFile(src)
+        try:
+            yield mapped, size
+        finally:
+            mapped.close()
+
+class QueueProgress(object):
+    # Picklable progress callback, forwards reports from worker processes through a queue
+    def __init__(self, queue):
+        self.queue = queue
+
+    def __call__(self, *report):
+        self.queue.put(report)
+
+def getOptions(options:dict = None) -> dict:
+    return dict(DefaultOptions, **(options or {}))
+
+def threadWorkers(threads:int) -> int:
+    # Threads of a codec pool with zstd thread semantics, -1 is every core and 0 compresses in the calling thread
+    if threads is None or threads < 0:
+        return os.cpu_count() or 1
+    return max(1, threads)
+
+def clampCompressLevel(levelRange, level):
+    if levelRange is None or level is None:
+        return None
+    return min(max(int(level), levelRange[0]), levelRange[1])
+
+def availableCompressionTypes() -> list:
+    compressionTypes = ["Zip", "Tar.gz"]
+    if zstandard is not None:
+        compressionTypes.append("Zstd")
+    if lz4 is not None:
+        compressionTypes.append("LZ4")
+    compressionTypes.append("Store")
+    compressionTypes.append("Auto")
+    return compressionTypes
+
+def getLevelRange(compressionType:str, zipMethod:int = zipfile.ZIP_DEFLATED):
+    if compressionType == "Auto":
+        # Every codec sampled brings its own level
+        return None
+    if compressionType == "Zip":
+        return CompressionLevelRange.get(zipMethod)
+    if compressionType in FrameCompressionLevelRange:
+        return FrameCompressionLevelRange[compressionType]
+    if compressionType == "Store" and zstandard is not None:
+        # Store chunks are zstd frames, zlib streams without the zstandard module
+        return FrameCompressionLevelRange["Zstd"]
+    return TarCompressionLevelRange
+
+def archiveType(path:str):
+    for compressionType, ext in CompressionTypes.items():
+        if path.endswith(ext):
+            return compressionType
+    return None
+
+def isArchive(path:str) -> bool:
+    return archiveType(path) is not None
+
+def parseVersion(path:str):
+    match = re.search(r"[vV](\d+)", os.path.basename(path))
+    return int(match.group(1)) if match else None
+
+def archivePath(file:str, compressionType:str) -> str:
+    return file.removesuffix(os.path.splitext(file)[1]) + CompressionTypes.get(compressionType, ".zip")
+
+def jobResult(file:str, archive:str, status:str, error:str = None, metrics:dict = None, manifest:dict = None) -> dict:
+    # manifest is the entry runJobs records in the manifest of the folder
+    return {"file": file, "archive": archive, "status": status, "error": error, "metrics": metrics, "manifest": manifest}
+
+def currentResult(file:str, compressionType:str, options:dict):
+    # Result of a source whose archive is still current, None when it has to be compressed
+    if not options["skipUnchanged"]:
+        return None
+    import Prism_Compression_Manifest as Manifest
+    archive = Manifest.currentArchive(file, options, compressionType)
+    if archive is None:
+        return None
+    if options["deleteOld"]:
+        os.remove(file)
+    return jobResult(file, archive, "current")
+
+def openOutput(archive:str, reader:SourceReader = None):
+    # Archive file written through a buffer of whole pages, writes are timed when the reader has a timer.
+    # With writeBehind the writes go to a writer thread and the timer only sees the time the queue was full.
+    out = open(archive, "wb", buffering=reader.writeBuffer if reader is not None else WRITE_BUFFER)
+    if reader is not None and reader.writeBehind:
+        import Prism_Compression_Pipeline as Pipeline
+        out = Pipeline.WriteBehind(out, reader.writeBehind)
+    if reader is not None and reader.timer is not None:
+        return Metrics.TimedWriter(out, reader.timer)
+    return out
+
+def partialPath(archive:str) -> str:
+    # Archives are written next to their final path and renamed once complete, a crash never leaves a truncated archive
+    return f"{archive}.partial"
+
+def stagingPath(archive:str, compressionType:str, options:dict) -> str:
+    # Where the archive is written and verified, Store archives reference the store relative to their folder
+    if not options["stagingDir"] or compressionType == "Store":
+        return partialPath(archive)
+    import Prism_Compression_Pipeline as Pipeline
+    return Pipeline.stagedPath(archive, options["stagingDir"])
+
+def setOutputOptions(reader:SourceReader, options:dict):
+    reader.writeBehind = options["writeBehind"]
+    reader.writeBuffer = max(int(options["writeBuffer"]), io.DEFAULT_BUFFER_SIZE)
+
+def syncFile(path:str):
+    with open(path, "rb+") as f:
+        os.fsync(f.fileno())
+
+def syncFolder(folder:str):
+    # Makes a rename durable, folders can't be opened on Windows where the rename is already
+    try:
+        fd = os.open(folder or ".", os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def commitArchive(partial:str, archive:str, options:dict):
+    # The archive is on disk before it replaces the previous one, the rename before the source is deleted
+    if os.path.dirname(os.path.abspath(partial)) != os.path.dirname(os.path.abspath(archive)):
+        # Staged on local scratch, copied next to the archive in one sequential pass
+        staged, partial = partial, partialPath(archive)
+        try:
+            shutil.copyfile(staged, partial)
+        except BaseException:
+            removePartial(partial)
+            raise
+        os.remove(staged)
+    if options["fsync"]:
+        syncFile(partial)
+    os.replace(partial, archive)
+    if options["fsync"]:
+        syncFolder(os.path.dirname(archive))
+
+def acquireFileLock(lock:str, timeout:float) -> str:
+    # Created exclusively so only one writer holds it, a lock older than timeout was left by a crash
+    try:
+        if time.time() - os.path.getmtime(lock) > timeout:
+            os.remove(lock)
+    except OSError:
+        pass
+    try:
+        os.close(os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+    except OSError:
+        return None
+    return lock
+
+def releaseFileLock(lock:str):
+    try:
+        os.remove(lock)
+    except OSError:
+        pass
+
+def removePartial(archive:str):
+    try:
+        if os.path.exists(archive):
+            os.remove(archive)
+    except OSError:
+        pass
+
+def _writeZip(file:str, archive:str, method:int, level, reader:SourceReader):
+    level = clampCompressLevel(CompressionLevelRange.get(method), level)
+    zinfo = zipfile.ZipInfo.from_file(file, os.path.basename(file))
+    zinfo.compress_type = method
+    zinfo._compresslevel = level
+
+    with openOutput(archive, reader) as out, zipfile.ZipFile(out, "w", method, compresslevel=level) as zip_ref:
+        with zip_ref.open(zinfo, "w") as dest:
+            if method == zipfile.ZIP_LZMA and level is not None:
+                dest._compressor = _LZMAPresetCompressor(level)
+            shutil.copyfileobj(reader, dest, reader.chunkSize)
+
+def metadataFrame(metadata:dict) -> bytes:
+    payload = json.dumps(metadata, separators=(",", ":")).encode("utf-8")
+    return struct.pack("<II", METADATA_MAGIC, len(payload)) + payload
+
+def checksumFrame(reader:SourceReader) -> bytes:
+    return CHECKSUM_STRUCT.pack(CHECKSUM_MAGIC, CHECKSUM_STRUCT.size - 8, reader.crc, reader.size, reader.digest.digest())
+
+def readMetadata(fileobj) -> dict:
+    # Metadata merged with the checksums, leaves fileobj at the start of the compressed stream.
+    # dataEnd is the offset where the compressed stream ends.
+    header = fileobj.read(8)
+    if len(header) < 8 or struct.unpack("<I", header[:4])[0] != METADATA_MAGIC:
+        raise ValueError("Archive has no compression metadata")
+    metadata = json.loads(fileobj.read(struct.unpack("<I", header[4:])[0]))
+    start = fileobj.tell()
+
+    # Seekable archives end with their seek table, the checksums are right before it
+    end = 0
+    if metadata.get("seekable"):
+        import Prism_Compression_Seekable as Seekable
+        end = Seekable.seekTableSize(fileobj)
+    fileobj.seek(-CHECKSUM_STRUCT.size - end, os.SEEK_END)
+    metadata["dataEnd"] = fileobj.tell()
+    magic, _, crc, size, digest = CHECKSUM_STRUCT.unpack(fileobj.read(CHECKSUM_STRUCT.size))
+    if magic != CHECKSUM_MAGIC or metadata["dataEnd"] < start:
+        raise ValueError("Archive is truncated")
+    metadata.update({"crc32": crc, "size": size, "blake2b": digest.hex()})
+
+    fileobj.seek(start)
+    return metadata
+
+class BoundedReader(object):
+    # Reads fileobj up to an absolute offset
+    def __init__(self, fileobj, end:int):
+        self.fileobj = fileobj
+        self.end = end
+
+    def read(self, size=-1):
+        remaining = self.end - self.fileobj.tell()
+        if remaining <= 0:
+            return b""
+        if size is None or size < 0 or size > remaining:
+            size = remaining
+        return self.fileobj.read(size)
+
+def requireCodec(compressionType:str):
+    if compressionType == "Zstd" and zstandard is None:
+        raise RuntimeError("The zstandard python module is not installed")
+    if compressionType == "LZ4" and lz4 is None:
+        raise RuntimeError("The lz4 python module is not installed")
+
+def _frameDictionary(file:str, compressionType:str, options:dict):
+    # Trained zstd dictionary of the file's extension, if the project has one
+    dictId = options["dictionaries"].get(os.path.splitext(file)[1])
+    if compressionType == "Store" and zstandard is not None:
+        compressionType = "Zstd"
+    if compressionType != "Zstd" or not dictId or not options["dictionaryDir"]:
+        return None
+    return Dictionary.loadDictionary(options["dictionaryDir"], dictId)
+
+def _writeFrameArchive(archive:str, compressionType:str, level, threads:int, reader:SourceReader, dictionary = None):
+    requireCodec(compressionType)
+    if level is None:
+        level = FrameDefaultLevel[compressionType]
+    level = clampCompressLevel(FrameCompressionLevelRange[compressionType], level)
+
+    with openOutput(archive, reader) as out:
+        out.write(metadataFrame({
+            "name": reader.name,
+            "codec": compressionType,
+            "dictionary": dictionary.dict_id() if dictionary is not None else None
+        }))
+        if compressionType == "Zstd":
+            compressor = zstandard.ZstdCompressor(level=level, threads=threads, write_checksum=True, dict_data=dictionary).compressobj(size=reader.total)
+        else:
+            compressor = lz4.frame.LZ4FrameCompressor(compression_level=level, content_checksum=True)
+            out.write(compressor.begin(reader.total))
+
+        while chunk := reader.read(reader.chunkSize):
+            out.write(compressor.compress(chunk))
+        out.write(compressor.flush())
+        out.write(checksumFrame(reader))
+
+@contextlib.contextmanager
+def _openFrameArchive(archive:str, dictionaryDir:str = None):
+    # Yields the metadata and a file object of the decompressed content
+    with open(archive, "rb") as f:
+        metadata = readMetadata(f)
+        requireCodec(metadata["codec"])
+        data = BoundedReader(f, metadata["dataEnd"])
+        if metadata["codec"] == "Store":
+            import Prism_Compression_Store as Store
+            stream = Store.StoreReader(archive, metadata, data, dictionaryDir)
+        elif metadata["codec"] == "Zstd":
+            # The frame header names the dictionary the archive was compressed with
+            start = f.tell()
+            dictId = zstandard.get_frame_parameters(f.read(18)).dict_id
+            f.seek(start)
+            if dictId and not dictionaryDir:
+                raise RuntimeError(f"Archive needs compression dictionary {dictId}, no dictionary folder is configured")
+            dictionary = Dictionary.loadDictionary(dictionaryDir, dictId) if dictId else None
+            stream = zstandard.ZstdDecompressor(dict_data=dictionary).stream_reader(data, read_across_frames=True, closefd=False)
+        else:
+            stream = lz4.frame.LZ4FrameFile(data, "rb")
+        try:
+            yield metadata, stream
+        finally:
+            stream.close()
+
+@contextlib.contextmanager
+def openArchiveMember(archive:str, dictionaryDir:str = None):
+    # Yields the name, a file object and the size of the scene stored in a single file archive.
+    # Only the scene is decompressed, a tar.gz stream is read up to the end of its first member.
+    compressionType = archiveType(archive)
+    if compressionType == 'Zip':
+        with zipfile.ZipFile(archive, 'r') as zip_ref:
+            zinfo = zip_ref.infolist()[0]
+            with zip_ref.open(zinfo) as member:
+                yield zinfo.filename, member, zinfo.file_size
+
+    elif compressionType == 'Tar.gz':
+        with tarfile.open(archive, 'r:gz') as tar_ref:
+            tarinfo = tar_ref.next()
+            yield tarinfo.name, tar_ref.extractfile(tarinfo), tarinfo.size
+
+    elif compressionType in ContainerTypes:
+        with _openFrameArchive(archive, dictionaryDir) as (metadata, stream):
+            yield os.path.basename(metadata["name"]), stream, metadata["size"]
+
+    elif compressionType == "Solid":
+        # The latest version of the task
+        import Prism_Compression_Solid as Solid
+        with Solid.openMember(archive) as member:
+            yield member
+
+    else:
+        raise ValueError(f"Unsupported archive {os.path.basename(archive)}")
+
+def isSeekable(archive:str) -> bool:
+    try:
+        with open(archive, "rb") as f:
+            return bool(readMetadata(f).get("seekable"))
+    except (OSError, ValueError):
+        return False
+
+def isIndexedTar(archive:str) -> bool:
+    # tar.gz written in blocks with a block index, older archives are one deflate stream
+    import Prism_Compression_ParallelGzip as ParallelGzip
+    return ParallelGzip.isIndexed(archive)
+
+def readHeader(archive:str, size:int = 64 * 1024, dictionaryDir:str = None) -> bytes:
+    # First bytes of the scene, e.g. to probe its version info without decompressing everything.
+    # Seekable archives only decompress the frames holding them, other archives stop reading after them.
+    if archiveType(archive) == "Zstd" and isSeekable(archive):
+        import Prism_Compression_Seekable as Seekable
+        return Seekable.readRange(archive, 0, size, dictionaryDir)
+    with openArchiveMember(archive, dictionaryDir) as (name, member, memberSize):
+        return member.read(size)
+
+def deltaDependents(archive:str) -> list:
+    # Delta archives of the same folder that need this archive to be rebuilt
+    directory = os.path.dirname(archive) or os.curdir
+    dependents = []
+    for f in os.listdir(directory):
+        if not f.endswith(CompressionTypes["Delta"]):
+            continue
+        try:
+            with open(os.path.join(directory, f), "rb") as delta:
+                if readMetadata(delta).get("base") == os.path.basename(archive):
+                    dependents.append(os.path.join(directory, f))
+        except (OSError, ValueError):
+            continue
+    return dependents
+
+def readDigest(fileobj) -> bytes:
+    digest = newDigest()
+    while chunk := fileobj.read(COPY_BUFFER):
+        digest.update(chunk)
+    return digest.digest()
+
+def _verifyZip(archive:str, name:str, reader:SourceReader, mode:str) -> bool:
+    with zipfile.ZipFile(archive, 'r') as zip_ref:
+        zinfo = zip_ref.getinfo(name)
+        if zinfo.CRC != reader.crc or zinfo.file_size != reader.size:
+            return False
+        if mode == "Paranoid":
+            with zip_ref.open(zinfo) as member:
+                return readDigest(member) == reader.digest.digest()
+    return True
+
+def _verifyTar(archive:str, name:str, reader:SourceReader, gzTrailer:tuple, mode:str) -> bool:
+    import Prism_Compression_ParallelGzip as ParallelGzip
+    try:
+        if ParallelGzip.gzipTrailer(archive) != gzTrailer:
+            return False
+    except ValueError:
+        return False
+    if mode == "Paranoid":
+        with tarfile.open(archive, 'r:gz') as tar_ref:
+            member = tar_ref.extractfile(name)
+            if member is None:
+                return False
+            return readDigest(member) == reader.digest.digest()
+    return True
+
+def _verifyFrameArchive(archive:str, reader:SourceReader, mode:str, dictionaryDir:str = None) -> bool:
+    with _openFrameArchive(archive, dictionaryDir) as (metadata, stream):
+        if metadata["size"] != reader.size or metadata["crc32"] != reader.crc:
+            return False
+        if mode == "Paranoid":
+            return readDigest(stream) == reader.digest.digest()
+    return True
+
+def compressFile(file:str, options:dict = None, progress=None, cancel=None) -> dict:
+    # Streams the file into its archive chunk by chunk, memory use is bounded by the chunk size.
+    # progress is called with (name, bytesDone, bytesTotal, bytesPerSecond, etaSeconds),
+    # cancel is an Event checked between chunks.
+    options = getOptions(options)
+    if options["type"] == "Auto" and os.path.exists(file):
+        import Prism_Compression_Adaptive as Adaptive
+        options = Adaptive.adaptiveOptions(file, options)
+    compressionType = options["type"]
+
+    archive = archivePath(file, compressionType)
+    if not os.path.exists(file):
+        return jobResult(file, archive, "skipped")
+
+    partial = stagingPath(archive, compressionType, options)
+    name = os.path.basename(file)
+    timer = Metrics.PhaseTimer()
+    stored = 0
+    try:
+        current = currentResult(file, compressionType, options)
+        if current is not None:
+            return current
+        sourceStat = os.stat(file)
+        with openSource(file, options) as (src, size):
+            reader = SourceReader(src, name, size, options["chunkSize"], progress, cancel)
+            reader.timer = timer
+            setOutputOptions(reader, options)
+
+            if compressionType == 'Zip':
+                _writeZip(file, partial, options["zipMethod"], options["level"], reader)
+
+            if compressionType == 'Tar.gz':
+                import Prism_Compression_ParallelGzip as ParallelGzip
+                gzTrailer = ParallelGzip.writeParallelTar(file, partial, options["level"], options["threads"], reader, options["frameSize"])
+
+            if compressionType == "Zstd" and options["seekable"]:
+                import Prism_Compression_Seekable as Seekable
+                Seekable.writeSeekableArchive(partial, options["level"], options["threads"], reader, _frameDictionary(file, compressionType, options), options["frameSize"])
+
+            elif compressionType in FrameCompressionLevelRange:
+                _writeFrameArchive(partial, compressionType, options["level"], options["threads"], reader, _frameDictionary(file, compressionType, options))
+
+            if compressionType == "Store":
+                import Prism_Compression_Store as Store
+                stored = Store.writeStoreArchive(partial, file, reader, options, _frameDictionary(file, compressionType, options))
+
+            reader.report(True)
+        # Reads and writes are timed on their own, the rest of the streaming is the codec
+        timer.add("compress", timer.elapsed() - timer.get("read") - timer.get("write"))
+
+    except CompressionCancelled:
+        removePartial(partial)
+        return jobResult(file, archive, "cancelled")
+    except Exception as e:
+        removePartial(partial)
+        return jobResult(file, archive, "error", f"Error compressing file \n {traceback.format_exception(e)}")
+    try:
+        # validate the archive before it replaces the previous one
+        verifyStart = time.perf_counter()
+        if options["verify"] != "None":
+            if compressionType == 'Zip':
+                valid = _verifyZip(partial, name, reader, options["verify"])
+            if compressionType == 'Tar.gz':
+                valid = _verifyTar(partial, name, reader, gzTrailer, options["verify"])
+
+                #TODO: Prism does not fully support multi extension files, figure out a way to rename/copy versioninfo.json file
+
+            if compressionType in ContainerTypes:
+                valid = _verifyFrameArchive(partial, reader, options["verify"], options["dictionaryDir"])
+
+            if not valid:
+                removePartial(partial)
+                return jobResult(file, archive, "error", "Error compressing file")
+        timer.add("verify", time.perf_counter() - verifyStart)
+
+        with timer.phase("write"):
+            commitArchive(partial, archive, options)
+
+        import Prism_Compression_Manifest as Manifest
+        manifest = Manifest.manifestEntry(file, archive, sourceStat, reader.digest.hexdigest(), options, compressionType)
+        if options["deleteOld"]:
+            with timer.phase("delete"):
+                os.remove(file)
+    except Exception as e:
+        removePartial(partial)
+        return jobResult(file, archive, "error", f"Error compressing file \n {traceback.format_exception(e)}")
+    metrics = Metrics.jobMetrics("compress", timer, reader.size, os.path.getsize(archive) + stored, type=compressionType, level=options["level"])
+    return jobResult(file, archive, "done", metrics=metrics, manifest=manifest)
+
+def decompressFile(archive:str, options:dict = None, progress=None, cancel=None) -> dict:
+    # Extracts the archive next to itself, result file is the first extracted file
+    options = getOptions(options)
+    compressionType = archiveType(archive)
+    directory = os.path.dirname(archive)
+    unzipped_files = []
+    timer = Metrics.PhaseTimer()
+    try:
+        archiveSize = os.path.getsize(archive)
+        if compressionType == 'Zip':
+            with zipfile.ZipFile(archive, 'r') as zip_ref:
+                unzipped_files = zip_ref.namelist()
+                zip_ref.extractall(directory)
+
+        elif compressionType == 'Tar.gz' and isIndexedTar(archive):
+            import Prism_Compression_ParallelGzip as ParallelGzip
+            unzipped_files = ParallelGzip.extractArchive(archive, directory, options, progress, cancel)
+
+        elif compressionType == 'Tar.gz':
+            with tarfile.open(archive, 'r:gz') as tar_ref:
+                unzipped_files = tar_ref.getnames()
+                tar_ref.extractall(directory)
+
+        elif compressionType == "Zstd" and isSeekable(archive):
+            import Prism_Compression_Seekable as Seekable
+            with open(archive, "rb") as f:
+                name = os.path.basename(readMetadata(f)["name"])
+            unzipped_files = [Seekable.decompressArchive(archive, os.path.join(directory, name), options, progress, cancel)]
+
+        elif compressionType in ContainerTypes:
+            with _openFrameArchive(archive, options["dictionaryDir"]) as (metadata, stream):
+                name = os.path.basename(metadata["name"])
+                reader = SourceReader(stream, name, metadata["size"], options["chunkSize"], progress, cancel)
+                with open(os.path.join(directory, name), "wb") as out:
+                    shutil.copyfileobj(reader, out, reader.chunkSize)
+                reader.report(True)
+                unzipped_files = [name]
+
+        elif compressionType == 'Delta':
+            import Prism_Compression_Delta as Delta
+            unzipped_files = [Delta.rebuildDelta(archive, directory, options)]
+
+        elif compressionType == "Solid":
+            import Prism_Compression_Solid as Solid
+            unzipped_files = Solid.extractMembers(archive, directory, options["solidMembers"], options, progress, cancel)
+            # The latest version extracted is the one opened, like openMember and verifyArchive
+            if unzipped_files:
+                index = Solid.loadIndex(archive)
+                latest = Solid.latestMember(dict(index, members=[member for member in index["members"] if member["name"] in unzipped_files]))["name"]
+                unzipped_files = [latest] + [name for name in unzipped_files if name != latest]
+
+        else:
+            return jobResult(None, archive, "error", f"Unsupported archive {os.path.basename(archive)}")
+
+        for unzipped_file in unzipped_files:
+            if not os.path.exists(os.path.join(directory, unzipped_file)):
+                return jobResult(None, archive, "error", "Error decompressing file, uncompressed file not found")
+        timer.add("decompress", timer.elapsed())
+        size = sum(os.path.getsize(os.path.join(directory, unzipped_file)) for unzipped_file in unzipped_files)
+
+        # Keep archives other versions are delta compressed against and solid archives only partly extracted
+        if options["deleteOld"] and not deltaDependents(archive) and not (compressionType == "Solid" and options["solidMembers"] is not None):
+            with timer.phase("delete"):
+                # The scenes are on disk before their only other copy is removed
+                if options["fsync"]:
+                    for unzipped_file in unzipped_files:
+                        syncFile(os.path.join(directory, unzipped_file))
+                    syncFolder(directory)
+                os.remove(archive)
+
+    except CompressionCancelled:
+        return jobResult(None, archive, "cancelled")
+    except Exception as e:
+        return jobResult(None, archive, "error", f"Error decompressing file \n {traceback.format_exception(e)}")
+
+    file = os.path.join(directory, unzipped_files[0]) if unzipped_files else None
+    return jobResult(file, archive, "done", metrics=Metrics.jobMetrics("decompress", timer, archiveSize, size, type=compressionType))
+
+def verifyArchive(archive:str, options:dict = None, progress=None, cancel=None) -> dict:
+    # Decompresses the whole archive without writing it and checks it against its stored checksums
+    options = getOptions(options)
+    compressionType = archiveType(archive)
+    directory = os.path.dirname(archive)
+    timer = Metrics.PhaseTimer()
+    try:
+        archiveSize = os.path.getsize(archive)
+        if compressionType == 'Zip':
+            # zipfile raises when the crc of a member does not match
+            with zipfile.ZipFile(archive, 'r') as zip_ref:
+                for zinfo in zip_ref.infolist():
+                    with zip_ref.open(zinfo) as member:
+                        reader = SourceReader(member, zinfo.filename, zinfo.file_size, options["chunkSize"], progress, cancel)
+                        while reader.read(reader.chunkSize):
+                            pass
+                name = zip_ref.namelist()[0]
+                size = sum(zinfo.file_size for zinfo in zip_ref.infolist())
+
+        elif compressionType == 'Tar.gz' and isIndexedTar(archive):
+            import Prism_Compression_ParallelGzip as ParallelGzip
+            name, size = ParallelGzip.verifyArchive(archive, options, progress, cancel)
+
+        elif compressionType == 'Tar.gz':
+            # Reading the gzip stream to its end checks its crc trailer
+            with tarfile.open(archive, 'r:gz') as tar_ref:
+                name = tar_ref.getnames()[0]
+            with gzip.open(archive, 'rb') as stream:
+                reader = SourceReader(stream, os.path.basename(archive), 0, options["chunkSize"], progress, cancel)
+                while reader.read(reader.chunkSize):
+                    pass
+            size = reader.size
+
+        elif compressionType in ContainerTypes:
+            with _openFrameArchive(archive, options["dictionaryDir"]) as (metadata, stream):
+                name = os.path.basename(metadata["name"])
+                reader = SourceReader(stream, name, metadata["size"], options["chunkSize"], progress, cancel)
+                while reader.read(reader.chunkSize):
+                    pass
+            if (reader.size, reader.crc, reader.digest.hexdigest()) != (metadata["size"], metadata["crc32"], metadata["blake2b"]):
+                return jobResult(None, archive, "error", f"{os.path.basename(archive)} does not match its checksums")
+            size = reader.size
+
+        elif compressionType == 'Delta':
+            import Prism_Compression_Delta as Delta
+            # Rebuilding checks the version against its digest
+            with tempfile.TemporaryDirectory() as scratch:
+                name = Delta.rebuildDelta(archive, scratch, options, sourceDirectory=directory)
+                size = os.path.getsize(os.path.join(scratch, name))
+
+        elif compressionType == "Solid":
+            import Prism_Compression_Solid as Solid
+            size = Solid.verifySolid(archive, progress, cancel)
+            name = Solid.latestMember(Solid.loadIndex(archive))["name"]
+
+        else:
+            return jobResult(None, archive, "error", f"Unsupported archive {os.path.basename(archive)}")
+
+    except CompressionCancelled:
+        return jobResult(None, archive, "cancelled")
+    except Exception as e:
+        return jobResult(None, archive, "error", f"Error verifying file \n {traceback.format_exception(e)}")
+    timer.add("verify", timer.elapsed())
+    metrics = Metrics.jobMetrics("verify", timer, archiveSize, size, type=compressionType)
+    return jobResult(os.path.join(directory, os.path.basename(name)), archive, "done", metrics=metrics)
+
+def bulkJobs(files:list, options:dict = None, function = None) -> list:
+    # (function, files, label) of every job, with delta enabled a chain of versions is compressed as one job,
+    # solid appends the versions of a task to its solid archive in one job
+    options = getOptions(options)
+    if function is None and options["solid"]:
+        # One job per solid task archive, the versions of a task are appended together
+        import Prism_Compression_Solid as Solid
+        groups = {}
+        for file in files:
+            groups.setdefault(Solid.solidArchivePath(file), []).append(file)
+        return [(Solid.addToArchive, group, os.path.basename(archive)) for archive, group in groups.items()]
+    if function is None and options["delta"]:
+        import Prism_Compression_Delta as Delta
+        chains = Delta.deltaChains(files, options["keyframeInterval"])
+        return [(Delta.compressDeltaChain, chain, f"{os.path.basename(chain[0])} - {os.path.basename(chain[-1])}") for chain in chains]
+    return [(function or compressFile, file, os.path.basename(file)) for file in files]
+
+def _drainProgress(progressQueue, progress):
+    while True:
+        try:
+            report = progressQueue.get_nowait()
+        except queue.Empty:
+            return
+        if progress is not None:
+            progress(*report)
+
+def _jobFinished(job:tuple, result, results:list, total:int, onResult, journal = None):
+    function, files, label = job
+    if journal is not None:
+        journal.record(Journal.jobKey(function, files), result)
+    results.append(result)
+    for each in flattenResults([result]):
+        Metrics.emit(Metrics.resultRecord(each))
+    if onResult is not None:
+        onResult(label, result, len(results), total)
+
+def _runSerial(jobs:list, options:dict, progress, cancel, onResult, results:list, total:int, journal = None):
+    for job in jobs:
+        if cancel is not None and cancel.is_set():
+            return
+        function, files, label = job
+        _jobFinished(job, function(files, options, progress, cancel), results, total, onResult, journal)
+
+def runJobs(jobs:list, options:dict = None, workers:int = 1, progress=None, cancel=None, onResult=None) -> list:
+    # Runs (function, files, label) jobs, function(files, options, progress, cancel) returns a result or a list of them.
+    # More than one worker spreads the jobs over a process pool so every core compresses outside the GIL.
+    # progress, onResult(label, result, finished, total) and the metrics hooks are called in the calling thread,
+    # the archives written are recorded in the manifests of their folders once every job finished.
+    # With a journalDir the jobs an interrupted run of the same jobs finished are not run again.
+    options = getOptions(options)
+    cancel = cancel if cancel is not None else threading.Event()
+    total = len(jobs)
+    results = []
+    start = time.perf_counter()
+    journal = None
+    if options["journalDir"]:
+        journal = Journal.openJournal(options["journalDir"], jobs)
+        remaining = []
+        for job in jobs:
+            function, files, label = job
+            result = journal.finished.get(Journal.jobKey(function, files))
+            if result is None:
+                remaining.append(job)
+                continue
+            # Finished by the interrupted run, its metrics were recorded then
+            results.append(result)
+            if onResult is not None:
+                onResult(label, result, len(results), total)
+        jobs = remaining
+    workers = min(max(1, workers), max(1, len(jobs)))
+    if options["profileDir"]:
+        jobs = [(Metrics.ProfiledJob(function, options["profileDir"]), files, label) for function, files, label in jobs]
+
+    try:
+        if workers <= 1:
+            _runSerial(jobs, options, progress, cancel, onResult, results, total, journal)
+        else:
+            _runPool(jobs, options, workers, progress, cancel, onResult, results, total, journal)
+    finally:
+        # Written here once for the whole batch, worker processes never write a manifest
+        entries = [result["manifest"] for result in flattenResults(results) if result.get("manifest")]
+        if entries:
+            import Prism_Compression_Manifest as Manifest
+            Manifest.record(entries)
+        if journal is not None:
+            journal.close()
+
+    if total > 1:
+        records = [Metrics.resultRecord(result) for result in flattenResults(results)]
+        Metrics.emit(Metrics.batchRecord(records, workers, time.perf_counter() - start))
+    return results
+
+def pythonExecutable() -> str:
+    # Interpreter the pool spawns. Inside a DCC sys.executable is the DCC itself (maya.exe, houdini), which
+    # doesn't fail on the spawn command line but starts the application. None when no interpreter is found.
+    if re.fullmatch(r"python(w|\d+(\.\d+)?)?", os.path.splitext(os.path.basename(sys.executable or ""))[0].lower()):
+        return sys.executable
+    for folder in (sys.exec_prefix, os.path.join(sys.exec_prefix, "bin"), os.path.dirname(sys.executable or "")):
+        for name in PYTHON_NAMES:
+            path = os.path.join(folder, name)
+            if os.path.isfile(path) and os.access(path, os.X_OK):
+                return path
+    return None
+
+def _poolProbe():
+    pass
+
+# {executable: whether a spawned process started with it in time}
+_poolStarts = {}
+
+def _poolContext():
+    # Spawn context on a checked interpreter, None when the jobs have to run in this thread
+    executable = pythonExecutable()
+    if executable is None:
+        return None
+    context = multiprocessing.get_context("spawn")
+    context.set_executable(executable)
+    if executable not in _poolStarts:
+        # A manager or pool on an interpreter that never starts would wait forever, a probe process has a timeout
+        process = context.Process(target=_poolProbe, daemon=True)
+        try:
+            process.start()
+            process.join(POOL_START_TIMEOUT)
+        except OSError:
+            pass
+        if process.is_alive():
+            process.kill()
+            process.join()
+        _poolStarts[executable] = process.exitcode == 0
+    return context if _poolStarts[executable] else None
+
+def _runPool(jobs:list, options:dict, workers:int, progress, cancel, onResult, results:list, total:int, journal = None):
+    remaining = list(jobs)
+    # Share the remaining cores between the zstd threads of each process
+    poolOptions = dict(options, threads=max(0, (os.cpu_count() or 1) // workers - 1))
+    context = _poolContext()
+    if context is None:
+        _runSerial(remaining, options, progress, cancel, onResult, results, total, journal)
+        return
+    try:
+        with context.Manager() as manager, ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            # Workers report chunk progress through the queue and watch the shared cancel flag
+            progressQueue = manager.Queue()
+            poolCancel = manager.Event()
+            queueProgress = QueueProgress(progressQueue)
+
+            futures = {executor.submit(function, files, poolOptions, queueProgress, poolCancel): (function, files, label) for function, files, label in remaining}
+            pending = set(futures)
+            while pending:
+                finished, pending = wait(pending, timeout=PROGRESS_INTERVAL, return_when=FIRST_COMPLETED)
+                _drainProgress(progressQueue, progress)
+                if cancel.is_set() and not poolCancel.is_set():
+                    poolCancel.set()
+                    for future in pending:
+                        future.cancel()
+
+                for future in finished:
+                    job = futures[future]
+                    remaining.remove(job)
+                    if future.cancelled():
+                        continue
+                    _jobFinished(job, future.result(), results, total, onResult, journal)
+            _drainProgress(progressQueue, progress)
+    except (BrokenProcessPool, OSError, EOFError):
+        # Host application can't spawn python processes (e.g. embedded in a DCC), finish in this thread
+        _runSerial(remaining, options, progress, cancel, onResult, results, total, journal)
+
+def flattenResults(results:list) -> list:
+    # Delta chains return one result per version
+    flat = []
+    for result in results:
+        flat.extend(result if isinstance(result, list) else [result])
+    return flat
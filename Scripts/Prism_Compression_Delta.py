@@ -0,0 +1,319 @@
+import os, re, struct, hashlib, collections, zlib, mmap, tempfile, contextlib, shutil, traceback, time
+
+import Prism_Compression_Core as Core
+import Prism_Compression_Metrics as Metrics
+import Prism_Compression_Manifest as Manifest
+from Prism_Compression_Core import zstandard
+
+# Delta archives store a version as copies from the previous version plus the bytes that changed.
+# Both versions are cut into content defined chunks so an insertion only changes the chunks around it.
+
+CHUNK_MIN = 1024
+CHUNK_AVERAGE = 4096
+CHUNK_MAX = 64 * 1024
+
+# Bytes of the base version sampled to pick the chunk anchors
+ANCHOR_SAMPLE = 512 * 1024
+ANCHOR_LENGTHS = range(2, 7)
+ANCHOR_MIN_COUNT = 4
+
+OP_COPY = b"C"
+OP_LITERAL = b"L"
+COPY_STRUCT = struct.Struct("<QI")
+LITERAL_STRUCT = struct.Struct("<I")
+
+def trainAnchors(sample:bytes, average:int = CHUNK_AVERAGE) -> list:
+    # Byte strings that appear about once every `average` bytes of the sample, chunks end after one of them.
+    # Picked from the data itself so text and binary scenes both get content defined boundaries.
+    counts = collections.Counter()
+    for length in ANCHOR_LENGTHS:
+        counts.update(sample[i:i + length] for i in range(len(sample) - length + 1))
+
+    target = 1.0 / average
+    candidates = sorted(
+        (hashlib.blake2b(anchor, digest_size=8).digest(), anchor, count / len(sample))
+        for anchor, count in counts.items()
+        if count >= ANCHOR_MIN_COUNT and count / len(sample) <= target / 8
+    )
+
+    anchors = []
+    frequency = 0.0
+    for _, anchor, anchorFrequency in candidates:
+        if frequency >= target:
+            break
+        anchors.append(anchor)
+        frequency += anchorFrequency
+    return anchors
+
+def anchorPattern(anchors:list):
+    if not anchors:
+        return None
+    return re.compile(b"|".join(re.escape(anchor) for anchor in sorted(anchors, key=len, reverse=True)))
+
+def sampleFile(path:str, size:int = ANCHOR_SAMPLE) -> bytes:
+    # Slices from the start, middle and end of the file
+    fileSize = os.path.getsize(path)
+    if fileSize <= size:
+        with open(path, "rb") as f:
+            return f.read()
+
+    pieces = 4
+    with open(path, "rb") as f:
+        sample = b""
+        for i in range(pieces):
+            f.seek((fileSize - size // pieces) * i // (pieces - 1))
+            sample += f.read(size // pieces)
+    return sample
+
+def iterChunks(fileobj, pattern, blockSize:int = 8 * 1024 * 1024, minimum:int = CHUNK_MIN, maximum:int = CHUNK_MAX):
+    buffer = b""
+    while True:
+        block = fileobj.read(blockSize)
+        buffer = buffer + block
+        pos = 0
+        # Only cut where the next chunk is fully buffered, unless the stream ended
+        while pos < len(buffer) and (not block or len(buffer) - pos >= maximum):
+            end = min(pos + maximum, len(buffer))
+            if pattern is not None:
+                match = pattern.search(buffer, pos + minimum, end)
+                if match:
+                    end = match.end()
+            yield buffer[pos:end]
+            pos = end
+        buffer = buffer[pos:]
+        if not block:
+            return
+
+def chunkKey(chunk:bytes) -> bytes:
+    return hashlib.blake2b(chunk, digest_size=16).digest()
+
+def _opCompressor(level):
+    if zstandard is not None:
+        level = Core.clampCompressLevel(Core.FrameCompressionLevelRange["Zstd"], Core.FrameDefaultLevel["Zstd"] if level is None else level)
+        return "Zstd", zstandard.ZstdCompressor(level=level).compressobj()
+    level = Core.clampCompressLevel(Core.TarCompressionLevelRange, 6 if level is None else level)
+    return "Zlib", zlib.compressobj(level)
+
+class _OpReader(object):
+    # Decompressed op stream with exact reads
+    def __init__(self, fileobj, codec:str):
+        self.fileobj = fileobj
+        if codec == "Zstd":
+            Core.requireCodec("Zstd")
+            self.decompressor = zstandard.ZstdDecompressor().decompressobj()
+        else:
+            self.decompressor = zlib.decompressobj()
+        self.buffer = bytearray()
+
+    def read(self, size:int) -> bytes:
+        while len(self.buffer) < size:
+            data = self.fileobj.read(Core.COPY_BUFFER)
+            if not data:
+                break
+            self.buffer += self.decompressor.decompress(data)
+        if len(self.buffer) < size:
+            raise ValueError("Delta archive is truncated")
+        data = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        return data
+
+    def eof(self) -> bool:
+        while not self.buffer:
+            data = self.fileobj.read(Core.COPY_BUFFER)
+            if not data:
+                return True
+            self.buffer += self.decompressor.decompress(data)
+        return False
+
+def deltaArchivePath(file:str) -> str:
+    return Core.archivePath(file, "Delta")
+
+def compressDelta(file:str, baseFile:str, baseArchive:str, options:dict = None, progress=None, cancel=None, anchors:list = None) -> dict:
+    # Writes file as a delta against baseFile, baseArchive is the archive baseFile is stored in.
+    # anchors are trained on baseFile when not given, a chain trains them once for all its versions.
+    options = Core.getOptions(options)
+    archive = deltaArchivePath(file)
+    if not os.path.exists(file):
+        return Core.jobResult(file, archive, "skipped")
+
+    partial = Core.stagingPath(archive, "Delta", options)
+    timer = Metrics.PhaseTimer()
+    try:
+        current = Core.currentResult(file, "Delta", options)
+        if current is not None:
+            return current
+        sourceStat = os.stat(file)
+        pattern = anchorPattern(trainAnchors(sampleFile(baseFile)) if anchors is None else anchors)
+
+        index = {}
+        baseSize = 0
+        baseDigest = Core.newDigest()
+        with open(baseFile, "rb") as base:
+            for chunk in iterChunks(base, pattern):
+                index.setdefault(chunkKey(chunk), (baseSize, len(chunk)))
+                baseSize += len(chunk)
+                baseDigest.update(chunk)
+
+        with Core.openSource(file, options) as (src, size):
+            reader = Core.SourceReader(src, os.path.basename(file), size, options["chunkSize"], progress, cancel)
+            reader.timer = timer
+            Core.setOutputOptions(reader, options)
+            with Core.openOutput(partial, reader) as out:
+                codec, compressor = _opCompressor(options["level"])
+                out.write(Core.metadataFrame({
+                    "name": reader.name,
+                    "codec": "Delta",
+                    "ops": codec,
+                    "base": os.path.basename(baseArchive),
+                    "baseName": os.path.basename(baseFile),
+                    "baseSize": baseSize,
+                    "baseBlake2b": baseDigest.hexdigest()
+                }))
+
+                # Consecutive copies of consecutive base bytes are merged into one op
+                copyOffset, copyLength = 0, 0
+                for chunk in iterChunks(reader, pattern):
+                    match = index.get(chunkKey(chunk))
+                    if match is not None and copyLength and copyOffset + copyLength == match[0]:
+                        copyLength += match[1]
+                        continue
+                    if copyLength:
+                        out.write(compressor.compress(OP_COPY + COPY_STRUCT.pack(copyOffset, copyLength)))
+                        copyOffset, copyLength = 0, 0
+                    if match is not None:
+                        copyOffset, copyLength = match
+                    else:
+                        out.write(compressor.compress(OP_LITERAL + LITERAL_STRUCT.pack(len(chunk)) + chunk))
+                if copyLength:
+                    out.write(compressor.compress(OP_COPY + COPY_STRUCT.pack(copyOffset, copyLength)))
+                out.write(compressor.flush())
+                out.write(Core.checksumFrame(reader))
+                reader.report(True)
+
+    except Core.CompressionCancelled:
+        Core.removePartial(partial)
+        return Core.jobResult(file, archive, "cancelled")
+    except Exception as e:
+        Core.removePartial(partial)
+        return Core.jobResult(file, archive, "error", f"Error compressing file \n {traceback.format_exception(e)}")
+    timer.add("compress", timer.elapsed() - timer.get("read") - timer.get("write"))
+
+    try:
+        verifyStart = time.perf_counter()
+        if options["verify"] != "None":
+            with open(partial, "rb") as f:
+                metadata = Core.readMetadata(f)
+            valid = metadata["size"] == reader.size and metadata["crc32"] == reader.crc
+            if valid and options["verify"] == "Paranoid":
+                with tempfile.TemporaryDirectory() as directory:
+                    with open(os.path.join(directory, rebuildDelta(partial, directory, options, sourceDirectory=os.path.dirname(archive))), "rb") as rebuilt:
+                        valid = Core.readDigest(rebuilt) == reader.digest.digest()
+            if not valid:
+                Core.removePartial(partial)
+                return Core.jobResult(file, archive, "error", "Error compressing file")
+        timer.add("verify", time.perf_counter() - verifyStart)
+        with timer.phase("write"):
+            Core.commitArchive(partial, archive, options)
+        manifest = Manifest.manifestEntry(file, archive, sourceStat, reader.digest.hexdigest(), options, "Delta")
+    except Exception as e:
+        Core.removePartial(partial)
+        return Core.jobResult(file, archive, "error", f"Error compressing file \n {traceback.format_exception(e)}")
+    metrics = Metrics.jobMetrics("compress", timer, reader.size, os.path.getsize(archive), type="Delta", level=options["level"])
+    return Core.jobResult(file, archive, "done", metrics=metrics, manifest=manifest)
+
+def _hexDigest(fileobj) -> str:
+    digest = Core.newDigest()
+    while chunk := fileobj.read(Core.COPY_BUFFER):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+@contextlib.contextmanager
+def _resolveBase(directory:str, metadata:dict, options:dict):
+    # Yields the path of the base version, rebuilt into a temporary file when only its archive is left
+    baseFile = os.path.join(directory, metadata["baseName"])
+    if os.path.isfile(baseFile) and os.path.getsize(baseFile) == metadata["baseSize"]:
+        with open(baseFile, "rb") as f:
+            if _hexDigest(f) == metadata["baseBlake2b"]:
+                yield baseFile
+                return
+
+    baseArchive = os.path.join(directory, metadata["base"])
+    if not os.path.isfile(baseArchive):
+        raise FileNotFoundError(f"Base version {metadata['base']} of the delta archive is missing")
+
+    with tempfile.TemporaryDirectory() as scratch:
+        if Core.archiveType(baseArchive) == "Delta":
+            rebuilt = os.path.join(scratch, rebuildDelta(baseArchive, scratch, options, sourceDirectory=directory))
+        else:
+            with Core.openArchiveMember(baseArchive, options["dictionaryDir"]) as (name, member, size):
+                rebuilt = os.path.join(scratch, os.path.basename(name))
+                with open(rebuilt, "wb") as out:
+                    shutil.copyfileobj(member, out, Core.COPY_BUFFER)
+        yield rebuilt
+
+def rebuildDelta(archive:str, directory:str, options:dict = None, sourceDirectory:str = None) -> str:
+    # Applies the delta chain of archive and writes the version into directory, returns its file name
+    options = Core.getOptions(options)
+    sourceDirectory = sourceDirectory or os.path.dirname(archive)
+    with open(archive, "rb") as f:
+        metadata = Core.readMetadata(f)
+        name = os.path.basename(metadata["name"])
+        with _resolveBase(sourceDirectory, metadata, options) as basePath, open(basePath, "rb") as baseFile:
+            base = mmap.mmap(baseFile.fileno(), 0, access=mmap.ACCESS_READ) if metadata["baseSize"] else b""
+            try:
+                ops = _OpReader(Core.BoundedReader(f, metadata["dataEnd"]), metadata["ops"])
+                digest = Core.newDigest()
+                with open(os.path.join(directory, name), "wb") as out:
+                    while not ops.eof():
+                        op = ops.read(1)
+                        if op == OP_COPY:
+                            offset, length = COPY_STRUCT.unpack(ops.read(COPY_STRUCT.size))
+                            data = base[offset:offset + length]
+                        elif op == OP_LITERAL:
+                            data = ops.read(LITERAL_STRUCT.unpack(ops.read(LITERAL_STRUCT.size))[0])
+                        else:
+                            raise ValueError("Delta archive is corrupted")
+                        digest.update(data)
+                        out.write(data)
+            finally:
+                if metadata["baseSize"]:
+                    base.close()
+
+    if digest.hexdigest() != metadata["blake2b"]:
+        raise ValueError(f"Rebuilt {name} does not match the compressed version")
+    return name
+
+def deltaChains(files:list, interval:int) -> list:
+    # Sorted by version, every chain starts with a keyframe stored in full
+    files = sorted(files, key=lambda f: (Core.parseVersion(f) is None, Core.parseVersion(f) or 0, f))
+    interval = max(1, int(interval))
+    return [files[i:i + interval] for i in range(0, len(files), interval)]
+
+def compressDeltaChain(files:list, options:dict = None, progress=None, cancel=None) -> list:
+    # Sources are only deleted once the whole chain is written, later versions read them as their base
+    options = Core.getOptions(options)
+    chainOptions = dict(options, deleteOld=False)
+    results = []
+    base, baseArchive = None, None
+    anchors = None
+    for file in files:
+        # An archive that is still current is as good a base as a new one
+        if results and results[-1]["status"] not in ("done", "current"):
+            results.append(Core.jobResult(file, None, "skipped"))
+            continue
+
+        if base is None:
+            result = Core.compressFile(file, chainOptions, progress, cancel)
+        else:
+            # Versions of a chain are alike, the anchors of the keyframe cut all of them
+            if anchors is None:
+                anchors = trainAnchors(sampleFile(files[0]))
+            result = compressDelta(file, base, baseArchive, chainOptions, progress, cancel, anchors)
+        results.append(result)
+        base, baseArchive = file, result["archive"]
+
+    if options["deleteOld"]:
+        for result in results:
+            if result["status"] in ("done", "current"):
+                os.remove(result["file"])
+    return results
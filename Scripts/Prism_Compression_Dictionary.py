@@ -0,0 +1,77 @@
+import os, random
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Zstd dictionaries trained on a sample of the project's scenes, one per scene extension.
+# Every dictionary is saved as <dictId>.zdict and never removed, zstd frames record the id of the
+# dictionary they were compressed with so archives written before a retrain still open.
+
+DICTIONARY_EXT = ".zdict"
+DICTIONARY_SIZE = 112 * 1024
+
+# Training input per extension, files are cut into samples of SAMPLE_SIZE
+SAMPLE_FILES = 500
+SAMPLE_BYTES_PER_FILE = 256 * 1024
+SAMPLE_SIZE = 8 * 1024
+MIN_SAMPLES = 16
+
+_cache = {}
+
+def dictionaryPath(dictionaryDir:str, dictId:int) -> str:
+    return os.path.join(dictionaryDir, f"{dictId}{DICTIONARY_EXT}")
+
+def loadDictionary(dictionaryDir:str, dictId:int):
+    path = dictionaryPath(dictionaryDir, dictId)
+    if path not in _cache:
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"Compression dictionary {dictId} not found in {dictionaryDir}")
+        with open(path, "rb") as f:
+            _cache[path] = zstandard.ZstdCompressionDict(f.read())
+    return _cache[path]
+
+def findScenes(projectPath:str, ext:str) -> list:
+    # Scene files of the extension inside the Scenefiles folders of the project
+    scenes = []
+    for root, dirs, files in os.walk(projectPath):
+        if "Scenefiles" not in root.replace("\\", "/").split("/"):
+            continue
+        scenes.extend(os.path.join(root, f) for f in files if f.endswith(ext))
+    return scenes
+
+def _samples(files:list) -> list:
+    samples = []
+    for file in random.sample(files, min(len(files), SAMPLE_FILES)):
+        try:
+            with open(file, "rb") as f:
+                data = f.read(SAMPLE_BYTES_PER_FILE)
+        except OSError:
+            continue
+        samples.extend(data[i:i + SAMPLE_SIZE] for i in range(0, len(data), SAMPLE_SIZE))
+    return samples
+
+def trainDictionary(files:list, dictionaryDir:str, size:int = DICTIONARY_SIZE):
+    # Returns the id of the new dictionary, None when there is too little data to train on
+    if zstandard is None:
+        raise RuntimeError("The zstandard python module is not installed")
+
+    samples = _samples(files)
+    if len(samples) < MIN_SAMPLES:
+        return None
+
+    dictionary = zstandard.train_dictionary(size, samples, threads=-1)
+    os.makedirs(dictionaryDir, exist_ok=True)
+    with open(dictionaryPath(dictionaryDir, dictionary.dict_id()), "wb") as f:
+        f.write(dictionary.as_bytes())
+    return dictionary.dict_id()
+
+def trainProjectDictionaries(projectPath:str, exts:list, dictionaryDir:str) -> dict:
+    # Returns {ext: dictId} of every extension with enough scenes to train on
+    dictionaries = {}
+    for ext in exts:
+        dictId = trainDictionary(findScenes(projectPath, ext), dictionaryDir)
+        if dictId is not None:
+            dictionaries[ext] = dictId
+    return dictionaries
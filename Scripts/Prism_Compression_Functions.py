@@ -1,43 +1,69 @@
+from __future__ import annotations
+
 from qtpy.QtCore import *
 from qtpy.QtGui import *
 from qtpy.QtWidgets import *
 
-import zipfile,tarfile, os, traceback, re
+import os, traceback, threading, logging, time, importlib
 
 from PrismCore import PrismCore
 from ProjectScripts import SceneBrowser
 
-CompressionZipType = {
-    "ZIP_STORED" : 0,
-    "ZIP_DEFLATED" : 8,
-    "ZIP_BZIP2" : 12,
-    "ZIP_LZMA" : 14
-}
+logger = logging.getLogger(__name__)
+
+class lazyModule(object):
+    # Imports the module on first attribute access. Prism loads the plugin on every launch, the codecs,
+    # archive formats and their tables are only loaded once a compression feature is used.
+    def __init__(self, name:str):
+        self._name = name
+        self._module = None
+        
+    def __getattr__(self, attr:str):
+        if self._module is None:
+            # The import lock makes a first access from several threads import the module once
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+Core = lazyModule("Prism_Compression_Core")
+Dictionary = lazyModule("Prism_Compression_Dictionary")
+Index = lazyModule("Prism_Compression_Index")
+Retention = lazyModule("Prism_Compression_Retention")
+Queue = lazyModule("Prism_Compression_Queue")
+Cache = lazyModule("Prism_Compression_Cache")
+Pipeline = lazyModule("Prism_Compression_Pipeline")
+Metrics = lazyModule("Prism_Compression_Metrics")
+Manifest = lazyModule("Prism_Compression_Manifest")
+Report = lazyModule("Prism_Compression_Report")
 
 class pluginSignals(QObject):
     updateUI = Signal()
     taskFinished = Signal()
     updateProgress = Signal(str)
+    fileProgress = Signal(str, object, object, float, float)
     errorPopup = Signal(str)   
     openFile = Signal(str)
 
 class CompressionTaskSignals(QObject):
-    doAll = Signal(str)
-    doAllButLatest = Signal(str)
-    doCustom = Signal(str,int, int)
+    doAll = Signal(str, bool)
+    doAllButLatest = Signal(str, bool)
+    doCustom = Signal(str,int, int, bool)
 
 class workerThread(QThread):
     signals = None
     filePath = None
     fileList = None
     
-    def __init__(self, signals:pluginSignals, compressionType = 'Zip', deleteOld= True, zipCompressionLevel = 8, filePath:str=None, fileList = None, openFile=False):        
+    def __init__(self, signals:pluginSignals, options:dict = None, filePath:str=None, fileList = None, openFile=False, workers = 1, cancelEvent = None, cache = None):        
         super(workerThread, self).__init__()
         
-        self.compressionType = compressionType
-        self.zipCompressionLevel = zipCompressionLevel
-        self.deleteOld = deleteOld
+        self.options = Core.getOptions(options)
+        self.compressionType = self.options["type"]
+        self.deleteOld = self.options["deleteOld"]
         self.openFile = openFile
+        self.workers = workers
+        self.cache = cache
+        self.cancelEvent = cancelEvent if cancelEvent is not None else threading.Event()
+        self.status = "done"
         
         if filePath is None and fileList is None:
                 self.signals.errorPopup.emit("Both filePath and fileList cannot be None")
@@ -53,117 +79,229 @@ class workerThread(QThread):
         
         self.signals = signals
         
-        if compressionType != 'Zip' and compressionType != 'Tar.gz':
+        if self.compressionType not in Core.CompressionTypes and self.compressionType != "Auto":
             self.signals.errorPopup.emit("Invalid compression type")
             return
         
+    def cancel(self):
+        self.cancelEvent.set()
+
+    def _emitProgress(self, name:str, done:int, total:int, throughput:float, eta:float):
+        self.signals.fileProgress.emit(name, done, total, throughput, eta)
+
+    def _handleResult(self, result):
+        for result in Core.flattenResults([result]):
+            if result["status"] == "error":
+                self.status = "error"
+                self.signals.errorPopup.emit(result["error"])
+
+    def _jobFinished(self, label:str, result, finished:int, total:int):
+        self._handleResult(result)
+        self.signals.updateProgress.emit(f"Compressed {label} ({finished}/{total})")
+        self.signals.updateUI.emit()
+
+    def _runJob(self, function, file:str) -> dict:
+        # A single job through runJobs so its metrics reach the hooks like the bulk jobs
+        results = Core.runJobs([(function, file, os.path.basename(file))], self.options, 1, self._emitProgress, self.cancelEvent)
+        return results[0] if results else Core.jobResult(None, file, "cancelled")
+
     def compressFile(self, file:str):
-        
-        if os.path.exists(file):
-            try:
-                if self.compressionType == 'Zip':
-                    with zipfile.ZipFile(file.removesuffix(os.path.splitext(file)[1]) + ".zip", "w", zipfile.ZIP_DEFLATED) as zip_ref:
-                        zip_ref.write(file, os.path.basename(file))
-                        
-                if self.compressionType == 'Tar.gz':
-                    with tarfile.open(file.removesuffix(os.path.splitext(file)[1]) + ".tar.gz", "w:gz") as tar_ref:
-                        tar_ref.add(file, os.path.basename(file))
-                
-            except Exception as e:
-                self.signals.errorPopup.emit(f"Error decompressing file \n {traceback.format_exception(e)}")
-                return
-            try:
-                # validate the zip file
-                if self.compressionType == 'Zip':
-                    with zipfile.ZipFile(file.removesuffix(os.path.splitext(file)[1]) + ".zip", 'r') as zip_ref:
-                        if zip_ref.testzip() is None:
-                            if self.deleteOld:
-                                os.remove(file)
-                            self.signals.updateUI.emit()
-                            return
-                        else:
-                            self.signals.errorPopup.emit("Error compressing file")
-                            return
-                if self.compressionType == 'Tar.gz':
-                    with tarfile.open(file.removesuffix(os.path.splitext(file)[1]) + ".tar.gz", 'r:gz') as tar_ref:
-                        if tar_ref.getnames() is not None:
-                            if self.deleteOld:
-                                os.remove(file)
-                            
-                            #TODO: Prism does not fully support multi extension files, figure out a way to rename/copy versioninfo.json file
-                            
-                            self.signals.updateUI.emit()
-                            return
-                        else:
-                            self.signals.errorPopup.emit("Error compressing file")
-                            return
-            except Exception as e:
-                self.signals.errorPopup.emit(f"Error decompressing file \n {traceback.format_exception(e)}")
-        return
+        result = self._runJob(Core.compressFile, file)
+        self._handleResult(result)
+        if result["status"] == "done":
+            self.signals.updateUI.emit()
+
+    def compressBulk(self):
+        jobs = Core.bulkJobs(self.fileList, self.options)
+        Core.runJobs(jobs, self.options, self.workers, self._emitProgress, self.cancelEvent, self._jobFinished)
 
     def decompressFile(self, file:str):
-        unzipped_file = None
-        try:
-            if self.path.endswith(".zip"):
-                # decompress filepath
-                with zipfile.ZipFile(file, 'r') as zip_ref:
-                    unzipped_files = zip_ref.namelist()
-                    zip_ref.extractall(os.path.dirname(file))
-
-            elif self.path.endswith(".tar.gz"):
-                # decompress filepath
-                with tarfile.open(file, 'r:gz') as tar_ref:
-                    unzipped_files = tar_ref.getnames()
-                    tar_ref.extractall(os.path.dirname(file))
-
-            allFilesExtracted = True
-
-            for unzipped_file in unzipped_files:
-                if os.path.exists(os.path.join(os.path.dirname(file), unzipped_file)):
-                    continue
-                else:
-                    allFilesExtracted = False
-                    break
-            
-            if allFilesExtracted:
-                if self.deleteOld:
-                    os.remove(self.path)
-            else:
-                self.signals.errorPopup.emit("Error decompressing file, uncompressed file not found")
-                         
-        except Exception as e:
-            self.signals.errorPopup.emit(f"Error decompressing file \n {traceback.format_exception(e)}")
+        result = self._runJob(Core.decompressFile, file)
+        self._handleResult(result)
+
+        if self.openFile and result["file"] is not None:
+          self.signals.openFile.emit(result["file"])  
+
+    def openCached(self, file:str):
+        # Extracts only the scene to the local cache and opens it from there, the archive stays as it is
+        result = self._runJob(lambda archive, options, progress, cancel: Cache.openCached(archive, self.cache, options, progress, cancel), file)
+        self._handleResult(result)
 
-        if self.openFile:
-          self.signals.openFile.emit(unzipped_file)  
+        if result["status"] == "done":
+            self.signals.openFile.emit(result["file"])
 
     def run(self):
         #TODO: separate logic for compressing and decompressing
         if os.path.exists(self.path):
             if os.path.isfile(self.path):
-                if not self.path.endswith(".zip") and not self.path.endswith(".tar.gz"):
+                if not Core.isArchive(self.path):
                     self.compressFile(self.path)
+                elif self.cache is not None:
+                    self.openCached(self.path)
                 else:
                     self.decompressFile(self.path)
                 
         elif self.fileList is not None and len(self.fileList) > 0:
-            for file in self.fileList:
-                self.signals.updateProgress.emit(f"Compressing {os.path.basename(file)}... Will close when completed.")
-                self.compressFile(file)
-                    
+            self.compressBulk()
+        
+        if self.cancelEvent.is_set() and self.status == "done":
+            self.status = "cancelled"
         self.signals.taskFinished.emit()
         self.signals.updateUI.emit()
 
-class CompressingPopup(QDialog):
+class dictionaryThread(QThread):
+    trainingFinished = Signal(object)
+    errorPopup = Signal(str)
+    
+    def __init__(self, projectPath:str, exts:list, dictionaryDir:str):
+        super(dictionaryThread, self).__init__()
+        self.projectPath = projectPath
+        self.exts = exts
+        self.dictionaryDir = dictionaryDir
+        
+    def run(self):
+        try:
+            self.trainingFinished.emit(Dictionary.trainProjectDictionaries(self.projectPath, self.exts, self.dictionaryDir))
+        except Exception as e:
+            self.errorPopup.emit(f"Error training dictionaries \n {traceback.format_exception(e)}")
+
+class retentionThread(QThread):
+    retentionFinished = Signal(object)
+    errorPopup = Signal(str)
+    
+    def __init__(self, projectPath:str, exts:list, policy:dict, options:dict, index):
+        super(retentionThread, self).__init__()
+        self.projectPath = projectPath
+        self.exts = exts
+        self.policy = policy
+        self.options = options
+        self.index = index
+        self.cancelEvent = threading.Event()
+        
+    def cancel(self):
+        self.cancelEvent.set()
+        
+    def run(self):
+        try:
+            results = Retention.runRetention(self.projectPath, self.exts, self.policy, self.options, self.index, cancel=self.cancelEvent)
+            self.index.save()
+            self.retentionFinished.emit(results)
+        except Exception as e:
+            self.errorPopup.emit(f"Error running the retention policy \n {traceback.format_exception(e)}")
+
+class reportThread(QThread):
+    reportFinished = Signal(object)
+    errorPopup = Signal(str)
+    
+    def __init__(self, path:str, exts:list, index, cachePath:str):
+        super(reportThread, self).__init__()
+        self.path = path
+        self.exts = exts
+        self.index = index
+        self.cachePath = cachePath
+        
+    def run(self):
+        try:
+            report = Report.storageReport(self.path, self.exts, self.index, cachePath=self.cachePath)
+            self.index.save()
+            self.reportFinished.emit(report)
+        except Exception as e:
+            self.errorPopup.emit(f"Error creating the storage report \n {traceback.format_exception(e)}")
+
+class ReportPanel(QWidget):
+    # Bytes per task and the savings every codec would have, tasks with the largest savings first
+    columns = ["Task", "Department", "Scenes", "Archives"]
+    
+    def __init__(self, report:dict, parent=None):
+        super(ReportPanel, self).__init__(parent)
+        self.setWindowTitle(f"Storage report - {os.path.basename(report['path'])}")
+        self.setWindowFlags(Qt.Tool)
+        self.resize(900, 400)
+        self.mainLayout = QVBoxLayout()
+        self.setLayout(self.mainLayout)
+        
+        total = report["total"]
+        summary = f"{total['versions']} scenes {Report.formatSize(total['uncompressed'])}, {total['archives']} archives {Report.formatSize(total['compressed'])}"
+        if total["savings"]:
+            codec, saved = max(total["savings"].items(), key=lambda item: item[1])
+            summary += f", {codec} would save about {Report.formatSize(saved)}"
+        self.summaryLabel = QLabel(summary)
+        self.summaryLabel.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        self.mainLayout.addWidget(self.summaryLabel)
+        
+        columns = self.columns + [f"{codec} saves" for codec in report["codecs"]]
+        rows = [("Total", "", total)] + [(department, department, totals) for department, totals in report["departments"].items()]
+        rows += [(os.path.join(os.path.basename(task["entity"]), task["name"]), task["department"], task) for task in report["tasks"]]
+        
+        self.table = QTableWidget(len(rows), len(columns))
+        self.table.setHorizontalHeaderLabels(columns)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.verticalHeader().setVisible(False)
+        for row, (name, department, totals) in enumerate(rows):
+            values = [name, department, Report.formatSize(totals["uncompressed"]), Report.formatSize(totals["compressed"])]
+            values += [Report.formatSize(totals["savings"].get(codec, 0)) for codec in report["codecs"]]
+            for column, value in enumerate(values):
+                self.table.setItem(row, column, QTableWidgetItem(value))
+        self.mainLayout.addWidget(self.table)
+
+class JobPanel(QWidget):
+    # Non modal list of the queued, running and finished jobs
+    columns = ["Job", "Status", "Progress", "Throughput", "ETA"]
+    
     def __init__(self, parent=None):
-        super(CompressingPopup, self).__init__(parent)
-        self.setWindowTitle("Compressing file")
-        self.setWindowFlags(Qt.WindowStaysOnTopHint)
-        self.setWindowModality(Qt.ApplicationModal)
+        super(JobPanel, self).__init__(parent)
+        self.setWindowTitle("Compression jobs")
+        self.setWindowFlags(Qt.Tool | Qt.WindowStaysOnTopHint)
+        self.resize(700, 300)
         self.mainLayout = QVBoxLayout()
         self.setLayout(self.mainLayout)
-        self.label = QLabel("Compressing file... Will close when completed.")
-        self.mainLayout.addWidget(self.label)
+        
+        self.table = QTableWidget(0, len(self.columns))
+        self.table.setHorizontalHeaderLabels(self.columns)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.verticalHeader().setVisible(False)
+        self.mainLayout.addWidget(self.table)
+        
+        self.buttonLayout = QHBoxLayout()
+        self.mainLayout.addLayout(self.buttonLayout)
+        
+        self.cancelBtn = QPushButton("Cancel selected")
+        self.buttonLayout.addWidget(self.cancelBtn)
+        
+        self.clearBtn = QPushButton("Clear finished")
+        self.buttonLayout.addWidget(self.clearBtn)
+        
+        self.rows = {}
+        
+    def selectedJobIds(self) -> list:
+        return [self.table.item(index.row(), 0).data(Qt.UserRole) for index in self.table.selectionModel().selectedRows()]
+        
+    def setJobs(self, jobs:list):
+        self.table.setRowCount(len(jobs))
+        self.rows = {}
+        for row, job in enumerate(jobs):
+            self.rows[job.jobId] = row
+            item = QTableWidgetItem(job.label)
+            item.setData(Qt.UserRole, job.jobId)
+            self.table.setItem(row, 0, item)
+            for column in range(1, len(self.columns)):
+                self.table.setItem(row, column, QTableWidgetItem(""))
+            self.updateJob(job)
+            
+    def updateJob(self, job):
+        row = self.rows.get(job.jobId)
+        if row is None:
+            return
+        name, done, total, throughput, eta = job.progress
+        running = job.status == "running"
+        
+        self.table.item(row, 1).setText(job.message if running and job.message else job.status)
+        self.table.item(row, 2).setText(f"{name}: {done * 100 // total}%" if running and name and total else "")
+        self.table.item(row, 3).setText(f"{throughput / 1048576:.1f} MB/s" if running and throughput else "")
+        self.table.item(row, 4).setText(f"{eta:.0f}s" if running and name else "")
 
 class CompressionTask(QDialog):
 
@@ -220,17 +358,22 @@ class CompressionTask(QDialog):
         self.endNr.setDisabled(True)
         self.rangeLayout.addWidget(self.endNr)
         
+        self.solidCheckbox = QCheckBox("Solid task archive")
+        self.solidCheckbox.setToolTip("Pack the versions into one archive of the task, compressed together so versions share their redundancy. Versions compressed later are appended to it, single versions can still be opened or extracted.")
+        self.mainLayout.addWidget(self.solidCheckbox)
+        
         self.startBtn = QPushButton("Start")
         self.startBtn.clicked.connect(self._startBtnClicked)
         self.mainLayout.addWidget(self.startBtn)
         
     def _startBtnClicked(self):
+        solid = self.solidCheckbox.isChecked()
         if self.allRadioBtn.isChecked():
-            self.signals.doAll.emit(self.TaskPath)
+            self.signals.doAll.emit(self.TaskPath, solid)
         elif self.allButLatestRadioBtn.isChecked():
-            self.signals.doAllButLatest.emit(self.TaskPath)
+            self.signals.doAllButLatest.emit(self.TaskPath, solid)
         elif self.customRadioBtn.isChecked():
-            self.signals.doCustom.emit(self.TaskPath, self.startNr.value(), self.endNr.value())
+            self.signals.doCustom.emit(self.TaskPath, self.startNr.value(), self.endNr.value(), solid)
         
     def _checkBoxSwitch(self):
         if self.customRadioBtn.isChecked():
@@ -241,33 +384,33 @@ class CompressionTask(QDialog):
             self.endNr.setDisabled(True)
         
 class Prism_Compression_Functions(object):
-    programExts = []
-    default = {"type":"Zip","zipLevel":"ZIP_DEFLATED","deleteOld":True,"openFile":False}
+    index = None
+    retentionWorker = None
+    reportWorker = None
+    cache = None
+    metricsLog = None
+    jobQueue = None
+    taskCompressionSignals = None
+    retentionTimer = None
+    _programExts = None
+    default = {"type":"Zip","zipLevel":"ZIP_DEFLATED","compressLevel":6,"verify":"Fast","deleteOld":True,"openFile":False,"workers":os.cpu_count() or 1,"delta":False,"keyframeInterval":10,"useDictionaries":True,"autoCompress":False,"keepLatest":3,"keepDays":14,"retentionInterval":60,"retentionBandwidth":20,"jobConcurrency":2,"fastOpen":False,"cacheSize":20,"seekable":False,"profileJobs":False,"skipUnchanged":True,"recompressOnSettingsChange":False,"adaptiveBudget":250,"ioDepth":4,"stageLocally":False}
     
     def __init__(self, core, plugin):
         self.core:PrismCore = core
         self.plugin = plugin
         self.icon = os.path.join(os.path.abspath(os.path.dirname(os.path.dirname(__file__))), "Resources", "Compression.png")
         
-        self.popup = CompressingPopup()
-        self.signals = pluginSignals()
-        self.taskCompressionSignals = CompressionTaskSignals()
-
-        # Signals for work thread
-        self.signals.taskFinished.connect(self.popup.hide)
-        self.signals.errorPopup.connect(self._errorPopup)
-        self.signals.updateUI.connect(self._updateUI)
-        self.signals.updateProgress.connect(self._updateProgressBar)
-        self.signals.openFile.connect(self._openFile)
-        
-        # Signals for task popup
-        self.taskCompressionSignals.doAll.connect(self._taskCompressAll)
-        self.taskCompressionSignals.doAllButLatest.connect(self._taskCompressAllButLatest)
-        self.taskCompressionSignals.doCustom.connect(self._taskCompressCustom)
+        # Every running job has its own worker thread. The queue, the panels and the task dialog are
+        # created on first use, the plugin only registers its callbacks while Prism starts
+        self.workers = {}
+        self.jobPanel = None
+        self.reportPanel = None
+        self.lastRetention = None
         
 
         # On plugin loads to properly get the scene formats
         self.core.registerCallback("onPluginsLoaded", self._loadExts, plugin=self)
+        self.core.registerCallback("onProjectChanged", self._projectChanged, plugin=self)
         
         # Right click callbacks in Prism UI
         self.core.registerCallback('openPBFileContextMenu', self.openPBFileContextMenu, plugin=self)
@@ -283,54 +426,213 @@ class Prism_Compression_Functions(object):
     def isActive(self):
         return True
 
+    @property
+    def programExts(self) -> list:
+        # Scene formats of the other plugins without the compression formats, a copy so Prism's list is left as it is
+        if self._programExts is None:
+            self._programExts = [ext for ext in self.core.getPluginSceneFormats() if ext not in self.sceneFormats]
+        return self._programExts
+
     def _loadExts(self):
-        self.programExts = self.core.getPluginSceneFormats()
+        # Plugins loaded or reloaded, the scene formats are read again on next use
+        self._programExts = None
+        
+        # Retention policy, checked on a timer so the interval can change without a restart
+        if getattr(self.core, "uiAvailable", True) and self.retentionTimer is None:
+            self.retentionTimer = QTimer()
+            self.retentionTimer.setInterval(60 * 1000)
+            self.retentionTimer.timeout.connect(self._retentionTick)
+            self.retentionTimer.start()
+
+    def _projectChanged(self, *args):
+        # The next tick evaluates the new project
+        if self.retentionWorker is not None and self.retentionWorker.isRunning():
+            self.retentionWorker.cancel()
+        self.lastRetention = None
+
+    ### Functions for retention policy
+    def _retentionTick(self):
+        if not self.getAutoCompress() or getattr(self.core, "projectPath", None) is None:
+            return
+        if self.lastRetention is not None and time.monotonic() - self.lastRetention < self.getRetentionInterval() * 60:
+            return
+        self.runRetention()
+
+    def runRetention(self, manual:bool = False):
+        if self.retentionWorker is not None and self.retentionWorker.isRunning():
+            return
+        if manual:
+            self.core.popup("Compressing the versions the retention policy no longer keeps in the background", "Compression")
         
-        # Remove zip specific formats
-        self.programExts.remove(".gz")
-        self.programExts.remove(".zip")
+        self.lastRetention = time.monotonic()
+        # Registers the metrics hook before the first job
+        self._getMetricsLog()
+        policy = {
+            "keepLatest": self.getKeepLatest(),
+            "keepDays": self.getKeepDays(),
+            "bandwidth": self.getRetentionBandwidth() * 1024 * 1024
+        }
+        self.retentionWorker = retentionThread(self.core.projectPath, self.programExts, policy, self._jobOptions(bulk=True), self._getIndex())
+        self.retentionWorker.retentionFinished.connect(lambda results: self._retentionFinished(results, manual))
+        self.retentionWorker.errorPopup.connect(self._errorPopup)
+        self.retentionWorker.start()
+
+    def _retentionFinished(self, results:list, manual:bool):
+        errors = [result for result in results if result["status"] == "error"]
+        for result in errors:
+            logger.warning(result["error"])
+        
+        message = f"Retention policy compressed {sum(result['status'] == 'done' for result in results)} files, {len(errors)} failed"
+        logger.info(message)
+        if manual:
+            self.core.popup(message, "Compression")
+        if results:
+            self._updateUI()
 
     ### Functions for worker threads
     def _errorPopup(self, message:str):
         self.core.popup(message,"Compression Error")
 
     def _updateUI(self):
-        self.core.pb.refreshUI()
-        
-    def _updateProgressBar(self, message:str):
-        self.popup.label.setText(message)
+        if getattr(self.core, "pb", None) is not None:
+            self.core.pb.refreshUI()
         
     def _openFile(self, file:str):
         self.core.openFile(file)
 
+    ### Functions for job queue
+    def _getJobQueue(self) -> Queue.JobQueue:
+        # Jobs wait in the queue until a slot is free
+        if self.jobQueue is None:
+            self.jobQueue = Queue.JobQueue(self.getJobConcurrency())
+        return self.jobQueue
+        
+    def _getJobPanel(self) -> JobPanel:
+        if self.jobPanel is None:
+            self.jobPanel = JobPanel()
+            self.jobPanel.cancelBtn.clicked.connect(self._cancelSelectedJobs)
+            self.jobPanel.clearBtn.clicked.connect(self._clearFinishedJobs)
+        return self.jobPanel
+        
+    def _refreshJobPanel(self):
+        if self.jobPanel is not None:
+            self.jobPanel.setJobs(self.jobQueue.jobs)
+        
+    def _updateJob(self, job:Queue.Job):
+        if self.jobPanel is not None:
+            self.jobPanel.updateJob(job)
+        
+    def _jobProgress(self, job:Queue.Job, *report):
+        job.progress = report
+        self._updateJob(job)
+        
+    def _jobMessage(self, job:Queue.Job, message:str):
+        job.message = message
+        self._updateJob(job)
+        
+    def _jobFinished(self, job:Queue.Job):
+        self.jobQueue.finish(job, self.workers[job.jobId].status)
+        self._refreshJobPanel()
+        self._startJobs()
+        
+    def _startJobs(self):
+        # The metrics log registers its hook when it is created, before the first job
+        self._getMetricsLog()
+        while (job := self._getJobQueue().next()) is not None:
+            signals = pluginSignals()
+            signals.errorPopup.connect(self._errorPopup)
+            signals.updateUI.connect(self._updateUI)
+            signals.openFile.connect(self._openFile)
+            signals.fileProgress.connect(lambda *report, job=job: self._jobProgress(job, *report))
+            signals.updateProgress.connect(lambda message, job=job: self._jobMessage(job, message))
+            signals.taskFinished.connect(lambda job=job: self._jobFinished(job))
+            
+            worker = workerThread(signals, job.options, filePath=job.filePath, fileList=job.fileList, openFile=job.openFile, workers=job.workers, cancelEvent=job.cancelEvent, cache=job.cache)
+            # The worker keeps its signals alive, it is dropped once its thread has stopped
+            worker.jobSignals = signals
+            worker.finished.connect(lambda jobId=job.jobId: self.workers.pop(jobId, None))
+            self.workers[job.jobId] = worker
+            worker.start()
+        self._refreshJobPanel()
+        
+    def _cancelSelectedJobs(self):
+        selected = self.jobPanel.selectedJobIds()
+        for job in self.jobQueue.jobs:
+            if job.jobId in selected:
+                self.jobQueue.cancel(job)
+        self._refreshJobPanel()
+        
+    def _clearFinishedJobs(self):
+        self.jobQueue.clearFinished()
+        self._refreshJobPanel()
+
     ### Functions for task popup
     
-    def _getAllFiles(self, path:str) -> list:
-        files = [os.path.join(path, f) for f in os.listdir(path) if os.path.isfile(os.path.join(path, f)) and f.endswith(tuple(self.programExts))]
+    def _getMetricsLog(self) -> Metrics.MetricsLog:
+        if self.metricsLog is None:
+            self.metricsLog = Metrics.MetricsLog(os.path.join(os.path.dirname(self.core.userini), "Compression", "metrics.jsonl"))
+            # Metrics of every job are appended to the log from here on
+            Metrics.addHook(self.metricsLog)
+        return self.metricsLog
+
+    def _getAdaptiveCache(self) -> str:
+        return os.path.join(os.path.dirname(self.core.userini), "Compression", "adaptiveCodecs.json")
+
+    def _getProfileDir(self) -> str:
+        return os.path.join(os.path.dirname(self.core.userini), "Compression", "Profiles")
+
+    def _getJournalDir(self) -> str:
+        return os.path.join(os.path.dirname(self.core.userini), "Compression", "Journals")
+
+    def _statisticsText(self, days:int = None) -> str:
+        since = time.time() - days * 24 * 60 * 60 if days else None
+        summary = Metrics.summarize(self._getMetricsLog().read(since))
+        if not summary["compressed"] and not summary["decompressed"]:
+            return "No compression jobs recorded yet"
+        
+        lines = [f"Compressed {summary['compressed']} files, {summary['reclaimed'] / 1024 ** 3:.2f} GB reclaimed"]
+        if summary["ratio"]:
+            lines[0] += f" (ratio {summary['ratio']:.2f})"
+        lines.append(f"Decompressed {summary['decompressed']} files, {summary['errors']} jobs failed")
+        if summary["throughput"]:
+            line = f"Compression throughput {summary['throughput'] / 1048576:.1f} MB/s"
+            if summary["utilization"] is not None:
+                line += f", worker utilization {summary['utilization'] * 100:.0f}%"
+            lines.append(line)
+        total = sum(summary["phases"].values())
+        if total > 0:
+            lines.append("Time spent: " + ", ".join(f"{phase} {seconds * 100 / total:.0f}%" for phase, seconds in summary["phases"].items()))
+        return "\n".join(lines)
+
+    def _getIndex(self) -> Index.FileIndex:
+        # Shared by every project, kept next to the user preferences so it survives restarts
+        if self.index is None:
+            self.index = Index.FileIndex(os.path.join(os.path.dirname(self.core.userini), "Compression", "fileIndex.json"))
+        return self.index
+
+    def _getAllFiles(self, path:str, **kwargs) -> list:
+        # Uncompressed scenes of the task sorted by version
+        index = self._getIndex()
+        files = index.select(path, self.programExts, **kwargs)
+        index.save()
         return files
     
-    def _taskCompressAll(self, path:str):
+    def _taskCompressAll(self, path:str, solid:bool = False):
         files = self._getAllFiles(path)
-        self.doJob(filelist=files, bulk=True)
+        self.doJob(filelist=files, bulk=True, solid=solid)
     
-    def _taskCompressAllButLatest(self, path:str):
-        files = self._getAllFiles(path)
-        files.remove(files[-1])
-        self.doJob(filelist=files, bulk=True)
+    def _taskCompressAllButLatest(self, path:str, solid:bool = False):
+        files = self._getAllFiles(path, excludeLatest=True)
+        self.doJob(filelist=files, bulk=True, solid=solid)
     
-    def _taskCompressCustom(self, path:str, start:int, end:int):
-        files = self._getAllFiles(path)
-        regex = r".*[vV](" + "|".join([f"{i:04d}" for i in range(start, end+1)]) + ").*"
-        filteredFiles = []
-        for f in files:
-            if re.search(regex, f):
-                filteredFiles.append(f)
+    def _taskCompressCustom(self, path:str, start:int, end:int, solid:bool = False):
+        filteredFiles = self._getAllFiles(path, start=start, end=end)
         
         if len(filteredFiles) == 0:
             self.core.popup("No files found for the given range","Error")
             return
         
-        self.doJob(filelist=filteredFiles, bulk=True)
+        self.doJob(filelist=filteredFiles, bulk=True, solid=solid)
         
     ###
     
@@ -358,6 +660,22 @@ class Prism_Compression_Functions(object):
         
         return zipLevel
     
+    def getCompressLevel(self):
+        compressLevel = self.core.getConfig("compression", "compressLevel", config="project")
+        
+        if compressLevel == None:
+            return self.default["compressLevel"]
+        
+        return int(compressLevel)
+    
+    def getVerify(self):
+        verify = self.core.getConfig("compression", "verify", config="project")
+        
+        if verify == None:
+            return self.default["verify"]
+        
+        return verify
+    
     def getOpenFile(self):
         openFile = self.core.getConfig("compression", "openFile", config="project")
         
@@ -366,29 +684,294 @@ class Prism_Compression_Functions(object):
         
         return openFile
 
+    def getWorkers(self):
+        workers = self.core.getConfig("compression", "workers", config="project")
+        
+        if workers == None:
+            return self.default["workers"]
+        
+        return max(1, int(workers))
+
+    def getDelta(self):
+        delta = self.core.getConfig("compression", "delta", config="project")
+        
+        if delta == None:
+            return self.default["delta"]
+        
+        return delta
+    
+    def getKeyframeInterval(self):
+        keyframeInterval = self.core.getConfig("compression", "keyframeInterval", config="project")
+        
+        if keyframeInterval == None:
+            return self.default["keyframeInterval"]
+        
+        return max(1, int(keyframeInterval))
+
+    def getUseDictionaries(self):
+        useDictionaries = self.core.getConfig("compression", "useDictionaries", config="project")
+        
+        if useDictionaries == None:
+            return self.default["useDictionaries"]
+        
+        return useDictionaries
+    
+    def getDictionaries(self):
+        dictionaries = self.core.getConfig("compression", "dictionaries", config="project")
+        
+        if dictionaries == None:
+            return {}
+        
+        return dictionaries
+    
+    def getDictionaryDir(self):
+        # Kept next to the project config so every workstation finds the same dictionaries
+        return os.path.join(os.path.dirname(self.core.prismIni), "Compression", "Dictionaries")
+
+    def getStoreDir(self):
+        # Content store of the Store compression type, shared by every asset and shot of the project
+        return os.path.join(os.path.dirname(self.core.prismIni), "Compression", "Store")
+
+    def getJobConcurrency(self):
+        jobConcurrency = self.core.getConfig("compression", "jobConcurrency", config="project")
+        
+        if jobConcurrency == None:
+            return self.default["jobConcurrency"]
+        
+        return max(1, int(jobConcurrency))
+
+    def getSeekable(self):
+        seekable = self.core.getConfig("compression", "seekable", config="project")
+        
+        if seekable == None:
+            return self.default["seekable"]
+        
+        return seekable
+
+    def getAdaptiveBudget(self):
+        adaptiveBudget = self.core.getConfig("compression", "adaptiveBudget", config="project")
+        
+        if adaptiveBudget == None:
+            return self.default["adaptiveBudget"]
+        
+        return max(1, int(adaptiveBudget))
+
+    def getSkipUnchanged(self):
+        skipUnchanged = self.core.getConfig("compression", "skipUnchanged", config="project")
+        
+        if skipUnchanged == None:
+            return self.default["skipUnchanged"]
+        
+        return skipUnchanged
+    
+    def getRecompressOnSettingsChange(self):
+        recompressOnSettingsChange = self.core.getConfig("compression", "recompressOnSettingsChange", config="project")
+        
+        if recompressOnSettingsChange == None:
+            return self.default["recompressOnSettingsChange"]
+        
+        return recompressOnSettingsChange
+
+    def getFastOpen(self):
+        fastOpen = self.core.getConfig("compression", "fastOpen", config="project")
+        
+        if fastOpen == None:
+            return self.default["fastOpen"]
+        
+        return fastOpen
+    
+    def getCacheSize(self):
+        cacheSize = self.core.getConfig("compression", "cacheSize", config="project")
+        
+        if cacheSize == None:
+            return self.default["cacheSize"]
+        
+        return max(1, int(cacheSize))
+
+    def getIoDepth(self):
+        ioDepth = self.core.getConfig("compression", "ioDepth", config="project")
+        
+        if ioDepth == None:
+            return self.default["ioDepth"]
+        
+        return max(0, int(ioDepth))
+
+    def getStageLocally(self):
+        stageLocally = self.core.getConfig("compression", "stageLocally", config="project")
+        
+        if stageLocally == None:
+            return self.default["stageLocally"]
+        
+        return stageLocally
+
+    def getProfileJobs(self):
+        profileJobs = self.core.getConfig("compression", "profileJobs", config="project")
+        
+        if profileJobs == None:
+            return self.default["profileJobs"]
+        
+        return profileJobs
+
+    def getAutoCompress(self):
+        autoCompress = self.core.getConfig("compression", "autoCompress", config="project")
+        
+        if autoCompress == None:
+            return self.default["autoCompress"]
+        
+        return autoCompress
+    
+    def getKeepLatest(self):
+        keepLatest = self.core.getConfig("compression", "keepLatest", config="project")
+        
+        if keepLatest == None:
+            return self.default["keepLatest"]
+        
+        return max(0, int(keepLatest))
+    
+    def getKeepDays(self):
+        keepDays = self.core.getConfig("compression", "keepDays", config="project")
+        
+        if keepDays == None:
+            return self.default["keepDays"]
+        
+        return max(0, int(keepDays))
+    
+    def getRetentionInterval(self):
+        retentionInterval = self.core.getConfig("compression", "retentionInterval", config="project")
+        
+        if retentionInterval == None:
+            return self.default["retentionInterval"]
+        
+        return max(1, int(retentionInterval))
+    
+    def getRetentionBandwidth(self):
+        retentionBandwidth = self.core.getConfig("compression", "retentionBandwidth", config="project")
+        
+        if retentionBandwidth == None:
+            return self.default["retentionBandwidth"]
+        
+        return max(0, int(retentionBandwidth))
+
     def customizeExecutable(self, origin, empty, force = None):
+        # Double clicking an archive
         if force is not None:
-            self.doJob(force)
+            self.doJob(force, cached=self.getFastOpen())
         return True
 
+    def _getTaskSignals(self) -> CompressionTaskSignals:
+        # Signals for task popup
+        if self.taskCompressionSignals is None:
+            self.taskCompressionSignals = CompressionTaskSignals()
+            self.taskCompressionSignals.doAll.connect(self._taskCompressAll)
+            self.taskCompressionSignals.doAllButLatest.connect(self._taskCompressAllButLatest)
+            self.taskCompressionSignals.doCustom.connect(self._taskCompressCustom)
+        return self.taskCompressionSignals
+
     def compressTask(self, path:str):
-        self.popupTask = CompressionTask(self.taskCompressionSignals,path)
+        self.popupTask = CompressionTask(self._getTaskSignals(),path)
         self.popupTask.show()
 
-    def doJob(self,path=None,filelist=None,bulk=False):
-        compType = self.getCompressionType()
-        deleteOld = self.getDeleteOld()
-        CompressionLevel = CompressionZipType[self.getZipCompressionLevel()]
+    def storageReport(self, path:str):
+        if self.reportWorker is not None and self.reportWorker.isRunning():
+            self.core.popup("A storage report is already running", "Compression")
+            return
+        
+        def reportFinished(report:dict):
+            self.reportPanel = ReportPanel(report)
+            self.reportPanel.show()
+        
+        # Codec estimates are kept per scene format next to the file index, they are shared by every project
+        cachePath = os.path.join(os.path.dirname(self.core.userini), "Compression", "savingsEstimates.json")
+        self.reportWorker = reportThread(path, self.programExts, self._getIndex(), cachePath)
+        self.reportWorker.reportFinished.connect(reportFinished)
+        self.reportWorker.errorPopup.connect(self._errorPopup)
+        self.reportWorker.start()
+
+    def retrainDictionaries(self, button:QPushButton = None):
+        if button is not None:
+            button.setEnabled(False)
+        
+        def trainingFinished(dictionaries:dict):
+            # Formats with too few scenes to train on keep their previous dictionary
+            self.core.setConfig("compression", "dictionaries", dict(self.getDictionaries(), **dictionaries), config="project")
+            if button is not None:
+                button.setEnabled(True)
+            self.core.popup(f"Trained dictionaries for {', '.join(dictionaries) or 'no scene formats'}", "Compression")
+        
+        def trainingFailed(message:str):
+            if button is not None:
+                button.setEnabled(True)
+            self._errorPopup(message)
+        
+        self.dictionaryWorker = dictionaryThread(self.core.projectPath, self.programExts, self.getDictionaryDir())
+        self.dictionaryWorker.trainingFinished.connect(trainingFinished)
+        self.dictionaryWorker.errorPopup.connect(trainingFailed)
+        self.dictionaryWorker.start()
+
+    def _jobOptions(self, bulk:bool = False) -> dict:
+        return {
+            "type": self.getCompressionType(),
+            "zipMethod": Core.CompressionZipType[self.getZipCompressionLevel()],
+            "level": self.getCompressLevel(),
+            "verify": self.getVerify(),
+            "threads": -1,
+            "delta": self.getDelta() and bulk,
+            "keyframeInterval": self.getKeyframeInterval(),
+            "dictionaries": self.getDictionaries() if self.getUseDictionaries() else {},
+            "dictionaryDir": self.getDictionaryDir(),
+            "seekable": self.getSeekable(),
+            "adaptiveBudget": self.getAdaptiveBudget() / 1000,
+            "adaptiveCache": self._getAdaptiveCache(),
+            "storeDir": self.getStoreDir(),
+            "profileDir": self._getProfileDir() if self.getProfileJobs() else None,
+            "journalDir": self._getJournalDir() if bulk else None,
+            "skipUnchanged": self.getSkipUnchanged(),
+            "recompressOnSettingsChange": self.getRecompressOnSettingsChange(),
+            "readAhead": self.getIoDepth(),
+            "writeBehind": self.getIoDepth(),
+            "stagingDir": Pipeline.DEFAULT_STAGING_DIR if self.getStageLocally() else None,
+            "deleteOld": self.getDeleteOld()
+        }
+
+    def _getCache(self) -> Cache.ScratchCache:
+        if self.cache is None:
+            self.cache = Cache.ScratchCache(Cache.DEFAULT_CACHE_DIR)
+        self.cache.maxSize = self.getCacheSize() * 1024 * 1024 * 1024
+        return self.cache
+
+    def doJob(self,path=None,filelist=None,bulk=False,cached=False,solid=False):
+        options = self._jobOptions(bulk)
+        options["solid"] = solid
         
         if not bulk:
             openFile = self.getOpenFile()
+            workers = 1
         else:
             openFile = False
+            workers = self.getWorkers()
+        
+        # Opening a file waits on its decompression, it goes ahead of every compression
+        if filelist is not None:
+            label = f"Compress {len(filelist)} files of {os.path.basename(os.path.dirname(filelist[0])) if filelist else ''}"
+            if solid:
+                label += " into a solid archive"
+            priority = Queue.PRIORITY_BULK
+        elif cached:
+            label = f"Open {os.path.basename(path)}"
+            priority = Queue.PRIORITY_INTERACTIVE
+        elif Core.isArchive(path):
+            label = f"Decompress {os.path.basename(path)}"
+            priority = Queue.PRIORITY_INTERACTIVE
+        else:
+            label = f"Compress {os.path.basename(path)}"
+            priority = Queue.PRIORITY_SINGLE
         
-        self.worker = workerThread(self.signals, compType, deleteOld, CompressionLevel, filePath=path, fileList=filelist, openFile=openFile)
-        self.popup.label.setText("Compressing files... Will close when completed.")
-        self.popup.show()
-        self.worker.start()
+        self._getJobQueue().concurrency = self.getJobConcurrency()
+        self._getJobQueue().add(label, priority, options, filePath=path, fileList=filelist, openFile=openFile, workers=workers, cache=self._getCache() if cached else None)
+        panel = self._getJobPanel()
+        panel.show()
+        panel.raise_()
+        self._startJobs()
 
     def openPBAssetTaskContextMenu(self, *args):
         sceneBrowser:SceneBrowser.SceneBrowser = args[0]
@@ -408,6 +991,11 @@ class Prism_Compression_Functions(object):
         compressTask.triggered.connect(lambda: self.compressTask(path))
         compressTask.setIcon(QIcon(self.icon))
         menu.addAction(compressTask)
+        
+        storageReport = QAction("Storage Report", menu)
+        storageReport.triggered.connect(lambda: self.storageReport(path))
+        storageReport.setIcon(QIcon(self.icon))
+        menu.addAction(storageReport)
 
     def openPBFileContextMenu(self, *args):
 
@@ -415,17 +1003,22 @@ class Prism_Compression_Functions(object):
         menu:QMenu = args[1]
         data = args[2]
         
-        if os.path.isfile(data) and (not data.endswith(".zip") and not data.endswith(".tar.gz")):
+        if os.path.isfile(data) and not Core.isArchive(data):
             CompressAction = QAction("Compress file", origin)
             CompressAction.triggered.connect(lambda: self.doJob(path=data))
             CompressAction.setIcon(QIcon(self.icon))
             menu.addAction(CompressAction)
         
-        if os.path.isfile(data) and (data.endswith(".zip") or data.endswith(".tar.gz")):
+        if os.path.isfile(data) and Core.isArchive(data):
             DecompressAction = QAction("Decompress file", origin)
-            DecompressAction.triggered.connect(lambda: self.customizeExecutable(None,None,force=data))
+            DecompressAction.triggered.connect(lambda: self.doJob(path=data))
             DecompressAction.setIcon(QIcon(self.icon))
             menu.addAction(DecompressAction)
+            
+            OpenCachedAction = QAction("Open without decompressing", origin)
+            OpenCachedAction.triggered.connect(lambda: self.doJob(path=data, cached=True))
+            OpenCachedAction.setIcon(QIcon(self.icon))
+            menu.addAction(OpenCachedAction)
     
     def projectSettings_loadUI(self, origin, *args):
         
@@ -436,9 +1029,21 @@ class Prism_Compression_Functions(object):
                 zipCompressionLevel.setVisible(True)
                 origin.cmp_zipCompressionLevel.setVisible(True)
             else:
-                self.core.popup("Tar.gz is Experimental, Prism does not behave as intended. Use at your own risk","Warning")
+                if origin.cmp_compTypeDropdown.currentText() == "Tar.gz":
+                    self.core.popup("Tar.gz is Experimental, Prism does not behave as intended. Use at your own risk","Warning")
                 zipCompressionLevel.setVisible(False)
                 origin.cmp_zipCompressionLevel.setVisible(False)
+            origin.cmp_seekableCheckbox.setEnabled(origin.cmp_compTypeDropdown.currentText() in ("Zstd", "Auto"))
+            origin.cmp_adaptiveBudgetSpinBox.setEnabled(origin.cmp_compTypeDropdown.currentText() == "Auto")
+            changeLevelRange()
+
+        def changeLevelRange():
+            # Level range follows the selected method, e.g. deflate 0-9, bzip2 1-9, lzma presets 0-9, zstd 1-22
+            levelRange = Core.getLevelRange(origin.cmp_compTypeDropdown.currentText(), Core.CompressionZipType[origin.cmp_zipCompressionLevel.currentText()])
+
+            origin.cmp_compressLevelSpinBox.setEnabled(levelRange is not None)
+            if levelRange is not None:
+                origin.cmp_compressLevelSpinBox.setRange(*levelRange)
 
         origin.w_myPlugin = QWidget()
         origin.lo_myPlugin = QVBoxLayout(origin.w_myPlugin)
@@ -452,8 +1057,8 @@ class Prism_Compression_Functions(object):
         compression_type.setAlignment(Qt.AlignRight)
         compTypeLayout.addWidget(compression_type)
         origin.cmp_compTypeDropdown = QComboBox()
-        origin.cmp_compTypeDropdown.addItems(["Zip","Tar.gz"])
-        origin.cmp_compTypeDropdown.setToolTip("Select the compression type to use")
+        origin.cmp_compTypeDropdown.addItems(Core.availableCompressionTypes())
+        origin.cmp_compTypeDropdown.setToolTip("Select the compression type to use, Store keeps every chunk of the project's scenes once in a shared content store, Auto samples each scene format and picks the codec saving the most per CPU second")
         compTypeLayout.addWidget(origin.cmp_compTypeDropdown)
 
         origin.cmp_compTypeDropdown.currentTextChanged.connect(changeVisibility)
@@ -467,15 +1072,66 @@ class Prism_Compression_Functions(object):
         zipCompressionLevelLayout.addWidget(zipCompressionLevel)
         
         origin.cmp_zipCompressionLevel = QComboBox()
-        origin.cmp_zipCompressionLevel.addItems(["ZIP_STORED",
-                                                "ZIP_DEFLATED",
-                                                "ZIP_BZIP2",
-                                                "ZIP_LZMA"])
+        origin.cmp_zipCompressionLevel.addItems(list(Core.CompressionZipType))
         origin.cmp_zipCompressionLevel.setToolTip("Select the compression level to use")
         origin.cmp_zipCompressionLevel.setVisible(origin.cmp_compTypeDropdown.currentText() == "Zip")
         origin.cmp_zipCompressionLevel.setCurrentText(self.default["zipLevel"])
         zipCompressionLevelLayout.addWidget(origin.cmp_zipCompressionLevel)
 
+        compressLevelLayout = QHBoxLayout()
+        origin.lo_myPlugin.addLayout(compressLevelLayout)
+        
+        compressLevel = QLabel("Compression Level: ")
+        compressLevel.setAlignment(Qt.AlignRight)
+        compressLevelLayout.addWidget(compressLevel)
+        
+        origin.cmp_compressLevelSpinBox = QSpinBox()
+        origin.cmp_compressLevelSpinBox.setToolTip("Lower levels are faster, higher levels give smaller files")
+        compressLevelLayout.addWidget(origin.cmp_compressLevelSpinBox)
+        changeLevelRange()
+        origin.cmp_compressLevelSpinBox.setValue(self.default["compressLevel"])
+
+        origin.cmp_zipCompressionLevel.currentTextChanged.connect(changeLevelRange)
+
+        seekableLayout = QHBoxLayout()
+        origin.lo_myPlugin.addLayout(seekableLayout)
+        
+        seekable = QLabel("Seekable Zstd archives: ")
+        seekable.setAlignment(Qt.AlignRight)
+        seekableLayout.addWidget(seekable)
+        
+        origin.cmp_seekableCheckbox = QCheckBox()
+        origin.cmp_seekableCheckbox.setToolTip("Compress Zstd archives in independent frames with a seek table, large scenes decompress on every core and their header can be read without decompressing the rest")
+        origin.cmp_seekableCheckbox.setEnabled(origin.cmp_compTypeDropdown.currentText() in ("Zstd", "Auto"))
+        seekableLayout.addWidget(origin.cmp_seekableCheckbox)
+
+        adaptiveBudgetLayout = QHBoxLayout()
+        origin.lo_myPlugin.addLayout(adaptiveBudgetLayout)
+        
+        adaptiveBudget = QLabel("Auto sampling budget (ms): ")
+        adaptiveBudget.setAlignment(Qt.AlignRight)
+        adaptiveBudgetLayout.addWidget(adaptiveBudget)
+        
+        origin.cmp_adaptiveBudgetSpinBox = QSpinBox()
+        origin.cmp_adaptiveBudgetSpinBox.setRange(1, 10000)
+        origin.cmp_adaptiveBudgetSpinBox.setValue(self.default["adaptiveBudget"])
+        origin.cmp_adaptiveBudgetSpinBox.setToolTip("CPU time spent compressing a sample of the first file of each scene format with the candidate codecs, formats no codec shrinks are stored uncompressed")
+        origin.cmp_adaptiveBudgetSpinBox.setEnabled(origin.cmp_compTypeDropdown.currentText() == "Auto")
+        adaptiveBudgetLayout.addWidget(origin.cmp_adaptiveBudgetSpinBox)
+
+        verifyLayout = QHBoxLayout()
+        origin.lo_myPlugin.addLayout(verifyLayout)
+        
+        verify = QLabel("Verification: ")
+        verify.setAlignment(Qt.AlignRight)
+        verifyLayout.addWidget(verify)
+        
+        origin.cmp_verifyDropdown = QComboBox()
+        origin.cmp_verifyDropdown.addItems(Core.VerifyModes)
+        origin.cmp_verifyDropdown.setToolTip("Fast checks the checksums taken while compressing, Paranoid decompresses the whole archive again")
+        origin.cmp_verifyDropdown.setCurrentText(self.default["verify"])
+        verifyLayout.addWidget(origin.cmp_verifyDropdown)
+
         deleteOldLayout = QHBoxLayout()
         origin.lo_myPlugin.addLayout(deleteOldLayout)
         
@@ -487,6 +1143,28 @@ class Prism_Compression_Functions(object):
         origin.cmp_deleteOldCheckbox.setToolTip("Delete the original file AFTER compression")
         deleteOldLayout.addWidget(origin.cmp_deleteOldCheckbox)
 
+        skipUnchangedLayout = QHBoxLayout()
+        origin.lo_myPlugin.addLayout(skipUnchangedLayout)
+        
+        skipUnchanged = QLabel("Skip unchanged files: ")
+        skipUnchanged.setAlignment(Qt.AlignRight)
+        skipUnchangedLayout.addWidget(skipUnchanged)
+        
+        origin.cmp_skipUnchangedCheckbox = QCheckBox()
+        origin.cmp_skipUnchangedCheckbox.setToolTip(f"Files that did not change since they were compressed keep their archive, archives are listed in {Manifest.MANIFEST_FILE} of their folder")
+        skipUnchangedLayout.addWidget(origin.cmp_skipUnchangedCheckbox)
+
+        recompressOnSettingsChangeLayout = QHBoxLayout()
+        origin.lo_myPlugin.addLayout(recompressOnSettingsChangeLayout)
+        
+        recompressOnSettingsChange = QLabel("Recompress when settings change: ")
+        recompressOnSettingsChange.setAlignment(Qt.AlignRight)
+        recompressOnSettingsChangeLayout.addWidget(recompressOnSettingsChange)
+        
+        origin.cmp_recompressOnSettingsChangeCheckbox = QCheckBox()
+        origin.cmp_recompressOnSettingsChangeCheckbox.setToolTip("Unchanged files are compressed again when their archive was written with another compression type or level")
+        recompressOnSettingsChangeLayout.addWidget(origin.cmp_recompressOnSettingsChangeCheckbox)
+
         OpenFileLayout = QHBoxLayout()
         origin.lo_myPlugin.addLayout(OpenFileLayout)
         
@@ -498,6 +1176,228 @@ class Prism_Compression_Functions(object):
         origin.cmp_OpenFileCheckbox.setToolTip("Open the compressed file after decompression")
         OpenFileLayout.addWidget(origin.cmp_OpenFileCheckbox)
 
+        fastOpenLayout = QHBoxLayout()
+        origin.lo_myPlugin.addLayout(fastOpenLayout)
+        
+        fastOpen = QLabel("Open archives from local cache: ")
+        fastOpen.setAlignment(Qt.AlignRight)
+        fastOpenLayout.addWidget(fastOpen)
+        
+        origin.cmp_fastOpenCheckbox = QCheckBox()
+        origin.cmp_fastOpenCheckbox.setToolTip("Double clicking an archive extracts only the scene to a local cache and opens it from there, the archive is not decompressed in the project.\nScenes opened from the cache are outside the project, decompress the version to save a new version from it")
+        fastOpenLayout.addWidget(origin.cmp_fastOpenCheckbox)
+        
+        cacheSize = QLabel("Cache size (GB): ")
+        cacheSize.setAlignment(Qt.AlignRight)
+        fastOpenLayout.addWidget(cacheSize)
+        
+        origin.cmp_cacheSizeSpinBox = QSpinBox()
+        origin.cmp_cacheSizeSpinBox.setRange(1, 10000)
+        origin.cmp_cacheSizeSpinBox.setValue(self.default["cacheSize"])
+        origin.cmp_cacheSizeSpinBox.setToolTip(f"Least recently opened scenes are removed from {Cache.DEFAULT_CACHE_DIR} above this size")
+        fastOpenLayout.addWidget(origin.cmp_cacheSizeSpinBox)
+
+        workersLayout = QHBoxLayout()
+        origin.lo_myPlugin.addLayout(workersLayout)
+        
+        workers = QLabel("Bulk compression workers: ")
+        workers.setAlignment(Qt.AlignRight)
+        workersLayout.addWidget(workers)
+        
+        origin.cmp_workersSpinBox = QSpinBox()
+        origin.cmp_workersSpinBox.setMinimum(1)
+        origin.cmp_workersSpinBox.setMaximum(max(64, self.default["workers"]))
+        origin.cmp_workersSpinBox.setValue(self.default["workers"])
+        origin.cmp_workersSpinBox.setToolTip("Number of processes used when compressing a task")
+        workersLayout.addWidget(origin.cmp_workersSpinBox)
+
+        jobConcurrencyLayout = QHBoxLayout()
+        origin.lo_myPlugin.addLayout(jobConcurrencyLayout)
+        
+        jobConcurrency = QLabel("Jobs running at once: ")
+        jobConcurrency.setAlignment(Qt.AlignRight)
+        jobConcurrencyLayout.addWidget(jobConcurrency)
+        
+        origin.cmp_jobConcurrencySpinBox = QSpinBox()
+        origin.cmp_jobConcurrencySpinBox.setRange(1, 16)
+        origin.cmp_jobConcurrencySpinBox.setValue(self.default["jobConcurrency"])
+        origin.cmp_jobConcurrencySpinBox.setToolTip("Number of queued jobs that run at the same time, decompressing a file to open it never waits for a compression")
+        jobConcurrencyLayout.addWidget(origin.cmp_jobConcurrencySpinBox)
+
+        ioDepthLayout = QHBoxLayout()
+        origin.lo_myPlugin.addLayout(ioDepthLayout)
+        
+        ioDepth = QLabel("I/O queue depth (chunks): ")
+        ioDepth.setAlignment(Qt.AlignRight)
+        ioDepthLayout.addWidget(ioDepth)
+        
+        origin.cmp_ioDepthSpinBox = QSpinBox()
+        origin.cmp_ioDepthSpinBox.setRange(0, 64)
+        origin.cmp_ioDepthSpinBox.setValue(self.default["ioDepth"])
+        origin.cmp_ioDepthSpinBox.setToolTip("Chunks read ahead of the compressor and writes queued behind it on their own threads, so reads and writes to network shares overlap the compression. 0 reads and writes in the compressing thread")
+        ioDepthLayout.addWidget(origin.cmp_ioDepthSpinBox)
+
+        stageLocallyLayout = QHBoxLayout()
+        origin.lo_myPlugin.addLayout(stageLocallyLayout)
+        
+        stageLocally = QLabel("Stage archives on local disk: ")
+        stageLocally.setAlignment(Qt.AlignRight)
+        stageLocallyLayout.addWidget(stageLocally)
+        
+        origin.cmp_stageLocallyCheckbox = QCheckBox()
+        origin.cmp_stageLocallyCheckbox.setToolTip(f"Write and verify archives in {Pipeline.DEFAULT_STAGING_DIR} and copy them to the project in one pass, faster when the project is on a network share")
+        stageLocallyLayout.addWidget(origin.cmp_stageLocallyCheckbox)
+
+        deltaLayout = QHBoxLayout()
+        origin.lo_myPlugin.addLayout(deltaLayout)
+        
+        delta = QLabel("Delta compress task versions: ")
+        delta.setAlignment(Qt.AlignRight)
+        deltaLayout.addWidget(delta)
+        
+        origin.cmp_deltaCheckbox = QCheckBox()
+        origin.cmp_deltaCheckbox.setToolTip("Store every keyframe version in full and the versions after it as the difference to the previous version")
+        deltaLayout.addWidget(origin.cmp_deltaCheckbox)
+
+        keyframeIntervalLayout = QHBoxLayout()
+        origin.lo_myPlugin.addLayout(keyframeIntervalLayout)
+        
+        keyframeInterval = QLabel("Keyframe interval: ")
+        keyframeInterval.setAlignment(Qt.AlignRight)
+        keyframeIntervalLayout.addWidget(keyframeInterval)
+        
+        origin.cmp_keyframeIntervalSpinBox = QSpinBox()
+        origin.cmp_keyframeIntervalSpinBox.setRange(1, 1000)
+        origin.cmp_keyframeIntervalSpinBox.setValue(self.default["keyframeInterval"])
+        origin.cmp_keyframeIntervalSpinBox.setToolTip("Number of versions in a delta chain, opening a version rebuilds at most this many versions")
+        keyframeIntervalLayout.addWidget(origin.cmp_keyframeIntervalSpinBox)
+
+        dictionaryLayout = QHBoxLayout()
+        origin.lo_myPlugin.addLayout(dictionaryLayout)
+        
+        useDictionaries = QLabel("Use trained Zstd dictionaries: ")
+        useDictionaries.setAlignment(Qt.AlignRight)
+        dictionaryLayout.addWidget(useDictionaries)
+        
+        origin.cmp_useDictionariesCheckbox = QCheckBox()
+        origin.cmp_useDictionariesCheckbox.setChecked(self.default["useDictionaries"])
+        origin.cmp_useDictionariesCheckbox.setToolTip("Compress Zstd archives with a dictionary trained on the project's scenes, helps small scenes the most")
+        dictionaryLayout.addWidget(origin.cmp_useDictionariesCheckbox)
+        
+        origin.cmp_retrainDictionariesBtn = QPushButton("Retrain dictionaries")
+        origin.cmp_retrainDictionariesBtn.setToolTip("Train a new dictionary per scene format on a sample of the project's scenes, older archives keep using the dictionary they were written with")
+        origin.cmp_retrainDictionariesBtn.setEnabled(Dictionary.zstandard is not None)
+        origin.cmp_retrainDictionariesBtn.clicked.connect(lambda: self.retrainDictionaries(origin.cmp_retrainDictionariesBtn))
+        dictionaryLayout.addWidget(origin.cmp_retrainDictionariesBtn)
+
+        autoCompressLayout = QHBoxLayout()
+        origin.lo_myPlugin.addLayout(autoCompressLayout)
+        
+        autoCompress = QLabel("Automatically compress old versions: ")
+        autoCompress.setAlignment(Qt.AlignRight)
+        autoCompressLayout.addWidget(autoCompress)
+        
+        origin.cmp_autoCompressCheckbox = QCheckBox()
+        origin.cmp_autoCompressCheckbox.setToolTip("Compress every version the retention policy no longer keeps in the background")
+        autoCompressLayout.addWidget(origin.cmp_autoCompressCheckbox)
+        
+        origin.cmp_runRetentionBtn = QPushButton("Run now")
+        origin.cmp_runRetentionBtn.setToolTip("Apply the saved retention policy to the whole project now")
+        origin.cmp_runRetentionBtn.clicked.connect(lambda: self.runRetention(manual=True))
+        autoCompressLayout.addWidget(origin.cmp_runRetentionBtn)
+
+        keepLatestLayout = QHBoxLayout()
+        origin.lo_myPlugin.addLayout(keepLatestLayout)
+        
+        keepLatest = QLabel("Keep latest versions: ")
+        keepLatest.setAlignment(Qt.AlignRight)
+        keepLatestLayout.addWidget(keepLatest)
+        
+        origin.cmp_keepLatestSpinBox = QSpinBox()
+        origin.cmp_keepLatestSpinBox.setRange(0, 1000)
+        origin.cmp_keepLatestSpinBox.setValue(self.default["keepLatest"])
+        origin.cmp_keepLatestSpinBox.setToolTip("Number of versions of every task that stay uncompressed")
+        keepLatestLayout.addWidget(origin.cmp_keepLatestSpinBox)
+
+        keepDaysLayout = QHBoxLayout()
+        origin.lo_myPlugin.addLayout(keepDaysLayout)
+        
+        keepDays = QLabel("Keep versions saved in the last days: ")
+        keepDays.setAlignment(Qt.AlignRight)
+        keepDaysLayout.addWidget(keepDays)
+        
+        origin.cmp_keepDaysSpinBox = QSpinBox()
+        origin.cmp_keepDaysSpinBox.setRange(0, 3650)
+        origin.cmp_keepDaysSpinBox.setValue(self.default["keepDays"])
+        origin.cmp_keepDaysSpinBox.setToolTip("Versions modified in this many days stay uncompressed")
+        keepDaysLayout.addWidget(origin.cmp_keepDaysSpinBox)
+
+        retentionIntervalLayout = QHBoxLayout()
+        origin.lo_myPlugin.addLayout(retentionIntervalLayout)
+        
+        retentionInterval = QLabel("Check every (minutes): ")
+        retentionInterval.setAlignment(Qt.AlignRight)
+        retentionIntervalLayout.addWidget(retentionInterval)
+        
+        origin.cmp_retentionIntervalSpinBox = QSpinBox()
+        origin.cmp_retentionIntervalSpinBox.setRange(1, 7 * 24 * 60)
+        origin.cmp_retentionIntervalSpinBox.setValue(self.default["retentionInterval"])
+        origin.cmp_retentionIntervalSpinBox.setToolTip("How often the retention policy is applied while Prism is open")
+        retentionIntervalLayout.addWidget(origin.cmp_retentionIntervalSpinBox)
+
+        retentionBandwidthLayout = QHBoxLayout()
+        origin.lo_myPlugin.addLayout(retentionBandwidthLayout)
+        
+        retentionBandwidth = QLabel("Background read limit (MB/s): ")
+        retentionBandwidth.setAlignment(Qt.AlignRight)
+        retentionBandwidthLayout.addWidget(retentionBandwidth)
+        
+        origin.cmp_retentionBandwidthSpinBox = QSpinBox()
+        origin.cmp_retentionBandwidthSpinBox.setRange(0, 10000)
+        origin.cmp_retentionBandwidthSpinBox.setValue(self.default["retentionBandwidth"])
+        origin.cmp_retentionBandwidthSpinBox.setToolTip("Limits the disk and network load of background compression, 0 disables the limit")
+        retentionBandwidthLayout.addWidget(origin.cmp_retentionBandwidthSpinBox)
+
+        statisticsLayout = QHBoxLayout()
+        origin.lo_myPlugin.addLayout(statisticsLayout)
+        
+        statistics = QLabel("Compression statistics: ")
+        statistics.setAlignment(Qt.AlignRight | Qt.AlignTop)
+        statisticsLayout.addWidget(statistics)
+        
+        origin.cmp_statisticsLabel = QLabel(self._statisticsText())
+        origin.cmp_statisticsLabel.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        statisticsLayout.addWidget(origin.cmp_statisticsLabel)
+        
+        origin.cmp_statisticsPeriodDropdown = QComboBox()
+        origin.cmp_statisticsPeriodDropdown.addItems(["Last 7 days", "Last 30 days", "All"])
+        origin.cmp_statisticsPeriodDropdown.setCurrentText("All")
+        origin.cmp_statisticsPeriodDropdown.setToolTip("Jobs of this workstation included in the statistics")
+        statisticsPeriodDays = {"Last 7 days": 7, "Last 30 days": 30, "All": None}
+        refreshStatistics = lambda: origin.cmp_statisticsLabel.setText(self._statisticsText(statisticsPeriodDays[origin.cmp_statisticsPeriodDropdown.currentText()]))
+        origin.cmp_statisticsPeriodDropdown.currentTextChanged.connect(refreshStatistics)
+        statisticsLayout.addWidget(origin.cmp_statisticsPeriodDropdown, alignment=Qt.AlignTop)
+        
+        origin.cmp_refreshStatisticsBtn = QPushButton("Refresh")
+        origin.cmp_refreshStatisticsBtn.clicked.connect(refreshStatistics)
+        statisticsLayout.addWidget(origin.cmp_refreshStatisticsBtn, alignment=Qt.AlignTop)
+        
+        origin.cmp_storageReportBtn = QPushButton("Storage report")
+        origin.cmp_storageReportBtn.setToolTip("Bytes of every task of the project and the savings each compression type would have, estimated from sampled scenes")
+        origin.cmp_storageReportBtn.clicked.connect(lambda: self.storageReport(self.core.projectPath))
+        statisticsLayout.addWidget(origin.cmp_storageReportBtn, alignment=Qt.AlignTop)
+
+        profileJobsLayout = QHBoxLayout()
+        origin.lo_myPlugin.addLayout(profileJobsLayout)
+        
+        profileJobs = QLabel("Profile jobs: ")
+        profileJobs.setAlignment(Qt.AlignRight)
+        profileJobsLayout.addWidget(profileJobs)
+        
+        origin.cmp_profileJobsCheckbox = QCheckBox()
+        origin.cmp_profileJobsCheckbox.setToolTip(f"Save the cProfile stats of every job into {self._getProfileDir()}, jobs run slower while profiled")
+        profileJobsLayout.addWidget(origin.cmp_profileJobsCheckbox)
+
         origin.lo_myPlugin.addStretch()
 
         origin.addTab(origin.w_myPlugin, "Compression")
@@ -510,8 +1410,29 @@ class Prism_Compression_Functions(object):
             settings["compression"] = {}
             settings["compression"]["type"] = "Zip"
             settings["compression"]["zipLevel"] = "ZIP_DEFLATED"
+            settings["compression"]["compressLevel"] = self.default["compressLevel"]
+            settings["compression"]["seekable"] = self.default["seekable"]
+            settings["compression"]["adaptiveBudget"] = self.default["adaptiveBudget"]
+            settings["compression"]["verify"] = self.default["verify"]
             settings["compression"]["deleteOld"] = True
+            settings["compression"]["skipUnchanged"] = self.default["skipUnchanged"]
+            settings["compression"]["recompressOnSettingsChange"] = self.default["recompressOnSettingsChange"]
             settings["compression"]["openFile"] = False
+            settings["compression"]["fastOpen"] = self.default["fastOpen"]
+            settings["compression"]["cacheSize"] = self.default["cacheSize"]
+            settings["compression"]["workers"] = self.default["workers"]
+            settings["compression"]["jobConcurrency"] = self.default["jobConcurrency"]
+            settings["compression"]["ioDepth"] = self.default["ioDepth"]
+            settings["compression"]["stageLocally"] = self.default["stageLocally"]
+            settings["compression"]["delta"] = self.default["delta"]
+            settings["compression"]["keyframeInterval"] = self.default["keyframeInterval"]
+            settings["compression"]["useDictionaries"] = self.default["useDictionaries"]
+            settings["compression"]["autoCompress"] = self.default["autoCompress"]
+            settings["compression"]["keepLatest"] = self.default["keepLatest"]
+            settings["compression"]["keepDays"] = self.default["keepDays"]
+            settings["compression"]["retentionInterval"] = self.default["retentionInterval"]
+            settings["compression"]["retentionBandwidth"] = self.default["retentionBandwidth"]
+            settings["compression"]["profileJobs"] = self.default["profileJobs"]
             
 
         if "type" in settings["compression"]:
@@ -520,16 +1441,101 @@ class Prism_Compression_Functions(object):
         if "zipLevel" in settings["compression"]:
             origin.cmp_zipCompressionLevel.setCurrentText(settings["compression"]["zipLevel"])
         
+        if "compressLevel" in settings["compression"]:
+            origin.cmp_compressLevelSpinBox.setValue(settings["compression"]["compressLevel"])
+        
+        if "seekable" in settings["compression"]:
+            origin.cmp_seekableCheckbox.setChecked(settings["compression"]["seekable"])
+        
+        if "adaptiveBudget" in settings["compression"]:
+            origin.cmp_adaptiveBudgetSpinBox.setValue(settings["compression"]["adaptiveBudget"])
+        
+        if "verify" in settings["compression"]:
+            origin.cmp_verifyDropdown.setCurrentText(settings["compression"]["verify"])
+        
         if "deleteOld" in settings["compression"]:
             origin.cmp_deleteOldCheckbox.setChecked(settings["compression"]["deleteOld"])
+        
+        if "skipUnchanged" in settings["compression"]:
+            origin.cmp_skipUnchangedCheckbox.setChecked(settings["compression"]["skipUnchanged"])
+        
+        if "recompressOnSettingsChange" in settings["compression"]:
+            origin.cmp_recompressOnSettingsChangeCheckbox.setChecked(settings["compression"]["recompressOnSettingsChange"])
             
         if "openFile" in settings["compression"]:
             origin.cmp_OpenFileCheckbox.setChecked(settings["compression"]["openFile"])
+        
+        if "fastOpen" in settings["compression"]:
+            origin.cmp_fastOpenCheckbox.setChecked(settings["compression"]["fastOpen"])
+        
+        if "cacheSize" in settings["compression"]:
+            origin.cmp_cacheSizeSpinBox.setValue(settings["compression"]["cacheSize"])
+        
+        if "workers" in settings["compression"]:
+            origin.cmp_workersSpinBox.setValue(settings["compression"]["workers"])
+        
+        if "jobConcurrency" in settings["compression"]:
+            origin.cmp_jobConcurrencySpinBox.setValue(settings["compression"]["jobConcurrency"])
+        
+        if "ioDepth" in settings["compression"]:
+            origin.cmp_ioDepthSpinBox.setValue(settings["compression"]["ioDepth"])
+        
+        if "stageLocally" in settings["compression"]:
+            origin.cmp_stageLocallyCheckbox.setChecked(settings["compression"]["stageLocally"])
+        
+        if "delta" in settings["compression"]:
+            origin.cmp_deltaCheckbox.setChecked(settings["compression"]["delta"])
+        
+        if "keyframeInterval" in settings["compression"]:
+            origin.cmp_keyframeIntervalSpinBox.setValue(settings["compression"]["keyframeInterval"])
+        
+        if "useDictionaries" in settings["compression"]:
+            origin.cmp_useDictionariesCheckbox.setChecked(settings["compression"]["useDictionaries"])
+        
+        if "autoCompress" in settings["compression"]:
+            origin.cmp_autoCompressCheckbox.setChecked(settings["compression"]["autoCompress"])
+        
+        if "keepLatest" in settings["compression"]:
+            origin.cmp_keepLatestSpinBox.setValue(settings["compression"]["keepLatest"])
+        
+        if "keepDays" in settings["compression"]:
+            origin.cmp_keepDaysSpinBox.setValue(settings["compression"]["keepDays"])
+        
+        if "retentionInterval" in settings["compression"]:
+            origin.cmp_retentionIntervalSpinBox.setValue(settings["compression"]["retentionInterval"])
+        
+        if "retentionBandwidth" in settings["compression"]:
+            origin.cmp_retentionBandwidthSpinBox.setValue(settings["compression"]["retentionBandwidth"])
+        
+        if "profileJobs" in settings["compression"]:
+            origin.cmp_profileJobsCheckbox.setChecked(settings["compression"]["profileJobs"])
             
     def preProjectSettingsSave(self, origin, settings):
         if "compression" not in settings:
             settings["compression"] = {}
             settings["compression"]["type"] = origin.cmp_compTypeDropdown.currentText()
             settings["compression"]["zipLevel"] = origin.cmp_zipCompressionLevel.currentText()
+            settings["compression"]["compressLevel"] = origin.cmp_compressLevelSpinBox.value()
+            settings["compression"]["seekable"] = origin.cmp_seekableCheckbox.isChecked()
+            settings["compression"]["adaptiveBudget"] = origin.cmp_adaptiveBudgetSpinBox.value()
+            settings["compression"]["verify"] = origin.cmp_verifyDropdown.currentText()
             settings["compression"]["deleteOld"] = origin.cmp_deleteOldCheckbox.isChecked()
-            settings["compression"]["openFile"] = origin.cmp_OpenFileCheckbox.isChecked()
\ No newline at end of file
+            settings["compression"]["skipUnchanged"] = origin.cmp_skipUnchangedCheckbox.isChecked()
+            settings["compression"]["recompressOnSettingsChange"] = origin.cmp_recompressOnSettingsChangeCheckbox.isChecked()
+            settings["compression"]["openFile"] = origin.cmp_OpenFileCheckbox.isChecked()
+            settings["compression"]["fastOpen"] = origin.cmp_fastOpenCheckbox.isChecked()
+            settings["compression"]["cacheSize"] = origin.cmp_cacheSizeSpinBox.value()
+            settings["compression"]["workers"] = origin.cmp_workersSpinBox.value()
+            settings["compression"]["jobConcurrency"] = origin.cmp_jobConcurrencySpinBox.value()
+            settings["compression"]["ioDepth"] = origin.cmp_ioDepthSpinBox.value()
+            settings["compression"]["stageLocally"] = origin.cmp_stageLocallyCheckbox.isChecked()
+            settings["compression"]["delta"] = origin.cmp_deltaCheckbox.isChecked()
+            settings["compression"]["keyframeInterval"] = origin.cmp_keyframeIntervalSpinBox.value()
+            settings["compression"]["useDictionaries"] = origin.cmp_useDictionariesCheckbox.isChecked()
+            settings["compression"]["dictionaries"] = self.getDictionaries()
+            settings["compression"]["autoCompress"] = origin.cmp_autoCompressCheckbox.isChecked()
+            settings["compression"]["keepLatest"] = origin.cmp_keepLatestSpinBox.value()
+            settings["compression"]["keepDays"] = origin.cmp_keepDaysSpinBox.value()
+            settings["compression"]["retentionInterval"] = origin.cmp_retentionIntervalSpinBox.value()
+            settings["compression"]["retentionBandwidth"] = origin.cmp_retentionBandwidthSpinBox.value()
+            settings["compression"]["profileJobs"] = origin.cmp_profileJobsCheckbox.isChecked()
\ No newline at end of file
@@ -0,0 +1,112 @@
+import os, json, time, threading
+
+import Prism_Compression_Core as Core
+
+# Cached listing of task folders, a folder is only listed again once its mtime changes.
+# Adding, removing or renaming a file changes the folder mtime, editing a file in place does not,
+# so size and mtime of an entry can be stale until the next version is saved.
+
+INDEX_VERSION = 1
+
+# Folder mtimes this close to the scan time are not trusted, network shares store them in whole seconds
+MTIME_GRANULARITY = 2.0
+
+def _folderKey(folder:str) -> str:
+    return os.path.normcase(os.path.abspath(folder))
+
+def scanFolder(folder:str, exts:list) -> list:
+    # Entries of the scenes and archives in folder, sorted by version
+    entries = []
+    with os.scandir(folder) as it:
+        for entry in it:
+            if not entry.is_file():
+                continue
+            compressionType = Core.archiveType(entry.name)
+            if compressionType is None and not entry.name.endswith(tuple(exts)):
+                continue
+            stat = entry.stat()
+            entries.append({
+                "name": entry.name,
+                "version": Core.parseVersion(entry.name),
+                "size": stat.st_size,
+                "mtime": stat.st_mtime,
+                "compressed": compressionType is not None,
+                "type": compressionType
+            })
+    entries.sort(key=lambda e: (e["version"] is None, e["version"] or 0, e["name"]))
+    return entries
+
+class FileIndex(object):
+    def __init__(self, path:str = None):
+        self.path = path
+        self.folders = {}
+        self.lock = threading.Lock()
+        self.dirty = False
+        self.load()
+
+    def load(self):
+        if self.path is None or not os.path.isfile(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") == INDEX_VERSION:
+            self.folders = data.get("folders", {})
+
+    def save(self):
+        if self.path is None or not self.dirty:
+            return
+        with self.lock:
+            data = json.dumps({"version": INDEX_VERSION, "folders": self.folders})
+            self.dirty = False
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp, "w") as f:
+            f.write(data)
+        os.replace(temp, self.path)
+
+    def invalidate(self, folder:str):
+        with self.lock:
+            if self.folders.pop(_folderKey(folder), None) is not None:
+                self.dirty = True
+
+    def entries(self, folder:str, exts:list) -> list:
+        key = _folderKey(folder)
+        mtime = os.stat(folder).st_mtime
+        exts = sorted(exts)
+        with self.lock:
+            cached = self.folders.get(key)
+        if cached is not None and cached["mtime"] == mtime and cached["exts"] == exts and cached["scanned"] - mtime > MTIME_GRANULARITY:
+            return cached["entries"]
+
+        scanned = time.time()
+        entries = scanFolder(folder, exts)
+        with self.lock:
+            self.folders[key] = {"mtime": mtime, "scanned": scanned, "exts": exts, "entries": entries}
+            self.dirty = True
+        return entries
+
+    def select(self, folder:str, exts:list, start:int = None, end:int = None, compressed:bool = False, excludeLatest:bool = False) -> list:
+        # Paths of the entries with start <= version <= end, sorted by version
+        entries = self.entries(folder, exts)
+        latest = max((e["version"] for e in entries if e["version"] is not None), default=None)
+
+        files = []
+        for entry in entries:
+            if compressed is not None and entry["compressed"] != compressed:
+                continue
+            version = entry["version"]
+            if start is not None and (version is None or version < start):
+                continue
+            if end is not None and (version is None or version > end):
+                continue
+            if excludeLatest and version is not None and version == latest:
+                continue
+            files.append(os.path.join(folder, entry["name"]))
+
+        # Without version numbers the last file by name is the latest
+        if excludeLatest and latest is None and files:
+            files.pop()
+        return files
@@ -0,0 +1,109 @@
+import os, json, time, hashlib
+
+# Journal of a bulk run, every finished job is appended and synced to disk as soon as it finishes.
+# Running the same jobs again after a crash or a cancel skips the jobs the journal lists as finished
+# and continues with the first unfinished one. The journal is removed once every job finished.
+#
+#   {"version": 1, "jobs": count}
+#   {"key": job key, "result": result}
+
+JOURNAL_VERSION = 1
+
+# Statuses a job is not run again for
+FINISHED = ("done", "current", "skipped")
+
+# Journals of runs that were never resumed are removed after this many seconds
+JOURNAL_TTL = 30 * 24 * 60 * 60
+
+def jobKey(function, files) -> str:
+    # Profiled jobs are the same job as the function they wrap
+    function = getattr(function, "function", function)
+    return f"{function.__module__}.{function.__qualname__}:{json.dumps(files)}"
+
+def journalPath(directory:str, keys:list) -> str:
+    runId = hashlib.blake2b(json.dumps(keys).encode("utf-8"), digest_size=16).hexdigest()
+    return os.path.join(directory, f"{runId}.jsonl")
+
+def pruneJournals(directory:str):
+    now = time.time()
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return
+    for name in names:
+        path = os.path.join(directory, name)
+        try:
+            if name.endswith(".jsonl") and now - os.path.getmtime(path) > JOURNAL_TTL:
+                os.remove(path)
+        except OSError:
+            pass
+
+def _finishedJob(result) -> bool:
+    # Delta chains and solid archives finish when every version did
+    return all(each["status"] in FINISHED for each in (result if isinstance(result, list) else [result]))
+
+class Journal(object):
+    def __init__(self, path:str, keys:list):
+        self.path = path
+        self.keys = keys
+        self.finished = {}
+        end = self._load()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.file = open(path, "r+b" if end else "wb")
+        # A line torn by a crash is cut off, the next entry starts on a line of its own
+        self.file.seek(end)
+        self.file.truncate()
+        if not end:
+            self._append({"version": JOURNAL_VERSION, "jobs": len(keys)})
+
+    def _load(self) -> int:
+        # Offset after the last complete entry, 0 when there is no journal to resume
+        try:
+            with open(self.path, "rb") as f:
+                lines = f.read().split(b"\n")
+        except OSError:
+            return 0
+        try:
+            header = json.loads(lines[0])
+        except ValueError:
+            return 0
+        if header.get("version") != JOURNAL_VERSION or header.get("jobs") != len(self.keys):
+            return 0
+
+        end = len(lines[0]) + 1
+        # The last element follows the last newline, it is empty unless the line was torn
+        for line in lines[1:-1]:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                break
+            self.finished[entry["key"]] = entry["result"]
+            end += len(line) + 1
+        return end
+
+    def _append(self, entry:dict):
+        self.file.write(json.dumps(entry).encode("utf-8") + b"\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def record(self, key:str, result):
+        if _finishedJob(result):
+            self.finished[key] = result
+            self._append({"key": key, "result": result})
+
+    def complete(self) -> bool:
+        return all(key in self.finished for key in self.keys)
+
+    def close(self):
+        self.file.close()
+        if self.complete():
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+def openJournal(directory:str, jobs:list) -> Journal:
+    # Journal of the (function, files, label) jobs, resumed when the same jobs were interrupted before
+    pruneJournals(directory)
+    keys = [jobKey(function, files) for function, files, label in jobs]
+    return Journal(journalPath(directory, keys), keys)
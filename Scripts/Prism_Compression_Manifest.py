@@ -0,0 +1,111 @@
+import os, json, threading
+
+import Prism_Compression_Core as Core
+
+# Archives written in a folder are listed in its manifest with the size, mtime and hash of the source
+# and the settings they were written with. A source that has not changed since its archive was written
+# is not compressed again. Jobs only read the manifest, runJobs records their entries in the calling
+# process so worker processes never write the same file at once.
+
+MANIFEST_FILE = ".compression.json"
+MANIFEST_VERSION = 1
+
+_cache = {}
+_lock = threading.Lock()
+
+def manifestPath(folder:str) -> str:
+    return os.path.join(folder, MANIFEST_FILE)
+
+def loadManifest(folder:str) -> dict:
+    # {source name: entry}, reread once the manifest changes
+    path = manifestPath(folder)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return {}
+    with _lock:
+        cached = _cache.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    entries = data.get("files", {}) if data.get("version") == MANIFEST_VERSION else {}
+    with _lock:
+        _cache[path] = (mtime, entries)
+    return entries
+
+def settings(options:dict, compressionType:str) -> dict:
+    # Options that change the archive of a source
+    result = {"type": compressionType, "level": options["level"]}
+    if compressionType == "Zip":
+        result["zipMethod"] = options["zipMethod"]
+    if compressionType == "Zstd":
+        result["seekable"] = options["seekable"]
+    return result
+
+def manifestEntry(file:str, archive:str, sourceStat, digest:str, options:dict, compressionType:str) -> dict:
+    # sourceStat is taken before the source is read, a change while it streams is caught on the next run
+    archiveStat = os.stat(archive)
+    return {
+        "folder": os.path.dirname(os.path.abspath(file)),
+        "name": os.path.basename(file),
+        "size": sourceStat.st_size,
+        "mtime": sourceStat.st_mtime_ns,
+        "blake2b": digest,
+        "archive": os.path.basename(archive),
+        "archiveSize": archiveStat.st_size,
+        "archiveMtime": archiveStat.st_mtime_ns,
+        "settings": settings(options, compressionType)
+    }
+
+def currentArchive(file:str, options:dict, compressionType:str):
+    # Path of an archive that still holds the content of file, None when it has to be compressed
+    folder = os.path.dirname(os.path.abspath(file))
+    entry = loadManifest(folder).get(os.path.basename(file))
+    if entry is None:
+        return None
+    if options["recompressOnSettingsChange"] and entry["settings"] != settings(options, compressionType):
+        return None
+
+    archive = os.path.join(folder, entry["archive"])
+    try:
+        archiveStat = os.stat(archive)
+        stat = os.stat(file)
+    except OSError:
+        return None
+    if (archiveStat.st_size, archiveStat.st_mtime_ns) != (entry["archiveSize"], entry["archiveMtime"]) or stat.st_size != entry["size"]:
+        return None
+    if stat.st_mtime_ns == entry["mtime"]:
+        return archive
+
+    # Same size with a new mtime, e.g. extracted again from its archive, only the hash tells
+    with open(file, "rb") as f:
+        return archive if Core.readDigest(f).hex() == entry["blake2b"] else None
+
+def record(entries:list):
+    # Writes the entries of finished jobs into the manifests of their folders
+    folders = {}
+    for entry in entries:
+        folders.setdefault(entry["folder"], []).append(entry)
+
+    for folder, folderEntries in folders.items():
+        path = manifestPath(folder)
+        with _lock:
+            _cache.pop(path, None)
+        files = dict(loadManifest(folder))
+        for entry in folderEntries:
+            files[entry["name"]] = {key: value for key, value in entry.items() if key not in ("folder", "name")}
+        # Entries whose archive is gone are of no use any more
+        files = {name: entry for name, entry in files.items() if os.path.exists(os.path.join(folder, entry["archive"]))}
+
+        temp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp, "w") as f:
+                json.dump({"version": MANIFEST_VERSION, "files": files}, f)
+            os.replace(temp, path)
+        except OSError:
+            # A read only folder only loses the skip, the archives are written
+            Core.removePartial(temp)
@@ -0,0 +1,185 @@
+import os, json, time, threading, contextlib, cProfile, traceback
+
+# Metrics of every compression job. Jobs measure themselves and return their metrics with their result,
+# runJobs hands them to the registered hooks in the calling process, e.g. the JSONL log of the plugin.
+#
+#   {"operation": "compress", "file": ..., "status": "done", "bytesIn": ..., "bytesOut": ..., "ratio": ...,
+#    "seconds": ..., "throughput": ..., "phases": {"read": ..., "compress": ..., "write": ..., "verify": ..., "delete": ...}}
+#   {"operation": "batch", "jobs": ..., "workers": ..., "seconds": ..., "busy": ..., "utilization": ...}
+
+# Log is moved to <log>.1 once it grows over this
+LOG_ROTATE_SIZE = 16 * 1024 * 1024
+
+_hooks = []
+_hooksLock = threading.Lock()
+
+def addHook(hook):
+    # hook(record) is called for every job and batch record, in the thread that runs the jobs
+    with _hooksLock:
+        if hook not in _hooks:
+            _hooks.append(hook)
+
+def removeHook(hook):
+    with _hooksLock:
+        if hook in _hooks:
+            _hooks.remove(hook)
+
+def emit(record:dict):
+    with _hooksLock:
+        hooks = list(_hooks)
+    for hook in hooks:
+        # A failing hook never fails the job
+        try:
+            hook(record)
+        except Exception:
+            traceback.print_exc()
+
+class PhaseTimer(object):
+    # Seconds spent in each phase of a job
+    def __init__(self):
+        self.phases = {}
+        self.start = time.perf_counter()
+        self.started = time.time()
+
+    def add(self, phase:str, seconds:float):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def get(self, phase:str) -> float:
+        return self.phases.get(phase, 0.0)
+
+    @contextlib.contextmanager
+    def phase(self, phase:str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(phase, time.perf_counter() - start)
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+class TimedWriter(object):
+    # Archive file that adds the time spent in write to the timer
+    def __init__(self, fileobj, timer:PhaseTimer):
+        self.fileobj = fileobj
+        self.timer = timer
+
+    def write(self, data):
+        start = time.perf_counter()
+        try:
+            return self.fileobj.write(data)
+        finally:
+            self.timer.add("write", time.perf_counter() - start)
+
+    def __getattr__(self, name):
+        return getattr(self.fileobj, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.fileobj.close()
+
+def jobMetrics(operation:str, timer:PhaseTimer, bytesIn:int, bytesOut:int, **fields) -> dict:
+    seconds = timer.elapsed()
+    return dict({
+        "operation": operation,
+        "date": timer.started,
+        "pid": os.getpid(),
+        "bytesIn": bytesIn,
+        "bytesOut": bytesOut,
+        "ratio": bytesIn / bytesOut if bytesOut else None,
+        "seconds": seconds,
+        "throughput": bytesIn / seconds if seconds > 0 else None,
+        "phases": dict(timer.phases)
+    }, **fields)
+
+def resultRecord(result:dict) -> dict:
+    return dict(result.get("metrics") or {}, file=result["file"], archive=result["archive"], status=result["status"])
+
+def batchRecord(records:list, workers:int, seconds:float) -> dict:
+    # Utilization is the share of the workers' time spent inside jobs
+    busy = sum(record.get("seconds") or 0.0 for record in records)
+    return {
+        "operation": "batch",
+        "date": time.time() - seconds,
+        "jobs": len(records),
+        "workers": workers,
+        "seconds": seconds,
+        "busy": busy,
+        "utilization": min(1.0, busy / (seconds * workers)) if seconds > 0 and workers else None,
+        "bytesIn": sum(record.get("bytesIn") or 0 for record in records),
+        "bytesOut": sum(record.get("bytesOut") or 0 for record in records)
+    }
+
+class ProfiledJob(object):
+    # Job function wrapper that saves the cProfile stats of every call into directory, picklable for the process pool
+    def __init__(self, function, directory:str):
+        self.function = function
+        self.directory = directory
+
+    def __call__(self, item, options:dict, progress=None, cancel=None):
+        profile = cProfile.Profile()
+        result = profile.runcall(self.function, item, options, progress, cancel)
+        name = os.path.basename(item if isinstance(item, str) else item[0])
+        path = os.path.join(self.directory, f"{time.strftime('%Y%m%d-%H%M%S')}_{os.getpid()}_{name}.prof")
+        os.makedirs(self.directory, exist_ok=True)
+        profile.dump_stats(path)
+        for each in result if isinstance(result, list) else [result]:
+            each["metrics"] = dict(each.get("metrics") or {}, profile=path)
+        return result
+
+class MetricsLog(object):
+    # Hook appending every record as one json line
+    def __init__(self, path:str):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def __call__(self, record:dict):
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        with self.lock:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            if os.path.isfile(self.path) and os.path.getsize(self.path) > LOG_ROTATE_SIZE:
+                os.replace(self.path, self.path + ".1")
+            with open(self.path, "a") as f:
+                f.write(line)
+
+    def read(self, since:float = None) -> list:
+        records = []
+        with self.lock:
+            for path in (self.path + ".1", self.path):
+                if not os.path.isfile(path):
+                    continue
+                with open(path) as f:
+                    for line in f:
+                        try:
+                            record = json.loads(line)
+                        except ValueError:
+                            continue
+                        if since is None or record.get("date", 0) >= since:
+                            records.append(record)
+        return records
+
+def summarize(records:list) -> dict:
+    compressed = [r for r in records if r.get("operation") == "compress" and r.get("status") == "done"]
+    batches = [r for r in records if r.get("operation") == "batch" and r.get("utilization") is not None]
+    bytesIn = sum(r["bytesIn"] for r in compressed)
+    bytesOut = sum(r["bytesOut"] for r in compressed)
+    seconds = sum(r["seconds"] for r in compressed)
+    phases = {}
+    for record in compressed:
+        for phase, phaseSeconds in record.get("phases", {}).items():
+            phases[phase] = phases.get(phase, 0.0) + phaseSeconds
+    return {
+        "compressed": len(compressed),
+        "decompressed": sum(r.get("operation") == "decompress" and r.get("status") == "done" for r in records),
+        "errors": sum(r.get("status") == "error" for r in records),
+        "bytesIn": bytesIn,
+        "bytesOut": bytesOut,
+        "reclaimed": bytesIn - bytesOut,
+        "ratio": bytesIn / bytesOut if bytesOut else None,
+        "seconds": seconds,
+        "throughput": bytesIn / seconds if seconds > 0 else None,
+        "phases": phases,
+        "utilization": sum(r["utilization"] for r in batches) / len(batches) if batches else None
+    }
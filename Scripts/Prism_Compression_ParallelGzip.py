@@ -0,0 +1,247 @@
+import os, io, struct, tarfile, zlib, collections
+from concurrent.futures import ThreadPoolExecutor
+
+import Prism_Compression_Core as Core
+
+# Block parallel tar.gz archives in the style of pigz. The tar stream is cut into blocks deflated on
+# their own on every core, each block ends with a full flush so it starts without history and on a byte
+# boundary. The blocks make one regular gzip member. An empty gzip member after it holds the compressed
+# size of every block in its extra field, with it the blocks inflate in parallel too. gunzip, tar and
+# every other gzip reader see one member with the tar followed by an empty member.
+#
+#   gzip header | deflate blocks | final empty block | crc32 | size | index member
+#   index member: gzip header with extra field "PZ" | empty deflate block | crc32 | size
+#   index: block size, block count | compressed size of every block | index member size, magic
+
+INDEX_SUBFIELD = b"PZ"
+INDEX_HEAD = struct.Struct("<QI")
+INDEX_ENTRY = struct.Struct("<I")
+INDEX_TAIL = struct.Struct("<I4s")
+INDEX_MAGIC = b"PGZI"
+
+GZIP_HEADER = struct.Struct("<BBBBIBB")
+GZIP_TRAILER = struct.Struct("<II")
+FEXTRA = 4
+# Deflate block with the final bit set and nothing in it
+FINAL_BLOCK = b"\x03\x00"
+# Empty member: its extra field, the final block and the trailer follow the 10 byte header and xlen
+EMPTY_MEMBER_TAIL = FINAL_BLOCK + GZIP_TRAILER.pack(0, 0)
+
+# The index has to fit the 64 KiB extra field of one gzip header
+MAX_BLOCKS = (0xFFFF - 4 - INDEX_HEAD.size - INDEX_TAIL.size) // INDEX_ENTRY.size
+
+def _gzipHeader(flags:int = 0, mtime:int = 0) -> bytes:
+    # deflate, no name, unknown OS
+    return GZIP_HEADER.pack(0x1F, 0x8B, 8, flags, mtime & 0xFFFFFFFF, 0, 255)
+
+def indexMember(blockSize:int, sizes:list) -> bytes:
+    payload = INDEX_HEAD.pack(blockSize, len(sizes)) + b"".join(INDEX_ENTRY.pack(size) for size in sizes)
+    memberSize = GZIP_HEADER.size + 2 + 4 + len(payload) + INDEX_TAIL.size + len(EMPTY_MEMBER_TAIL)
+    payload += INDEX_TAIL.pack(memberSize, INDEX_MAGIC)
+    extra = INDEX_SUBFIELD + struct.pack("<H", len(payload)) + payload
+    return _gzipHeader(FEXTRA) + struct.pack("<H", len(extra)) + extra + EMPTY_MEMBER_TAIL
+
+def readIndex(fileobj) -> tuple:
+    # (block size, compressed block sizes, end of the data member), ValueError without an index
+    fileobj.seek(0, os.SEEK_END)
+    fileSize = fileobj.tell()
+    tailSize = INDEX_TAIL.size + len(EMPTY_MEMBER_TAIL)
+    if fileSize < tailSize:
+        raise ValueError("Archive has no block index")
+    fileobj.seek(-tailSize, os.SEEK_END)
+    tail = fileobj.read(tailSize)
+    memberSize, magic = INDEX_TAIL.unpack_from(tail)
+    if magic != INDEX_MAGIC or tail[INDEX_TAIL.size:] != EMPTY_MEMBER_TAIL or memberSize > fileSize:
+        raise ValueError("Archive has no block index")
+
+    fileobj.seek(-memberSize, os.SEEK_END)
+    member = fileobj.read(memberSize)
+    offset = GZIP_HEADER.size + 2
+    if member[:3] != b"\x1f\x8b\x08" or member[offset:offset + 2] != INDEX_SUBFIELD:
+        raise ValueError("Archive has no block index")
+    offset += 4
+    blockSize, count = INDEX_HEAD.unpack_from(member, offset)
+    offset += INDEX_HEAD.size
+    sizes = [INDEX_ENTRY.unpack_from(member, offset + i * INDEX_ENTRY.size)[0] for i in range(count)]
+    return blockSize, sizes, fileSize - memberSize
+
+def isIndexed(archive:str) -> bool:
+    try:
+        with open(archive, "rb") as f:
+            readIndex(f)
+        return True
+    except (OSError, ValueError, struct.error):
+        return False
+
+def gzipTrailer(archive:str) -> tuple:
+    # crc32 and size of the tar stream as stored by gzip, before the index member when there is one
+    with open(archive, "rb") as f:
+        try:
+            end = readIndex(f)[2]
+        except (ValueError, struct.error):
+            f.seek(0, os.SEEK_END)
+            end = f.tell()
+        if end < GZIP_TRAILER.size:
+            raise ValueError("Archive is truncated")
+        f.seek(end - GZIP_TRAILER.size)
+        return GZIP_TRAILER.unpack(f.read(GZIP_TRAILER.size))
+
+def _deflateBlock(data:bytes, level:int) -> bytes:
+    # zlib releases the GIL while it deflates, blocks compress on every core
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush(zlib.Z_FULL_FLUSH)
+
+def _tarPadding(size:int) -> bytes:
+    # Member padding, the two end of archive blocks and the record padding tarfile writes
+    padding = -size % tarfile.BLOCKSIZE
+    end = size + padding + 2 * tarfile.BLOCKSIZE
+    return tarfile.NUL * (padding + 2 * tarfile.BLOCKSIZE + (-end % tarfile.RECORDSIZE))
+
+def writeParallelTar(file:str, archive:str, level, threads:int, reader, blockSize:int) -> tuple:
+    # Writes file as a tar.gz deflated on every core, returns the crc32 and size of the tar stream
+    level = Core.clampCompressLevel(Core.TarCompressionLevelRange, 9 if level is None else level)
+    workers = Core.threadWorkers(threads)
+    # Large scenes get larger blocks so the index fits its gzip header
+    blockSize = max(int(blockSize), 64 * 1024, -(-(reader.total + 64 * 1024) // MAX_BLOCKS))
+
+    with tarfile.open(fileobj=io.BytesIO(), mode="w") as tar_ref:
+        tarinfo = tar_ref.gettarinfo(file, os.path.basename(file))
+    header = tarinfo.tobuf(tarfile.DEFAULT_FORMAT, tarfile.ENCODING, "surrogateescape")
+
+    with Core.openOutput(archive, reader) as out, ThreadPoolExecutor(max_workers=workers) as executor:
+        out.write(_gzipHeader(mtime=int(tarinfo.mtime)))
+        crc, size = 0, 0
+        sizes = []
+        # At most two blocks per worker in flight, memory stays bounded by the block size
+        pending = collections.deque()
+
+        def writeBlock():
+            data = pending.popleft().result()
+            out.write(data)
+            sizes.append(len(data))
+
+        def submit(data:bytes):
+            nonlocal crc, size
+            crc = zlib.crc32(data, crc)
+            size += len(data)
+            pending.append(executor.submit(_deflateBlock, data, level))
+            if len(pending) >= workers * 2:
+                writeBlock()
+
+        buffer = bytearray(header)
+        while chunk := reader.read(reader.chunkSize):
+            buffer += chunk
+            while len(buffer) >= blockSize:
+                submit(bytes(buffer[:blockSize]))
+                del buffer[:blockSize]
+        if reader.size != tarinfo.size:
+            raise OSError(f"{reader.name} changed while it was compressed")
+
+        buffer += _tarPadding(reader.size)
+        for start in range(0, len(buffer), blockSize):
+            submit(bytes(buffer[start:start + blockSize]))
+        while pending:
+            writeBlock()
+
+        out.write(FINAL_BLOCK)
+        out.write(GZIP_TRAILER.pack(crc & 0xFFFFFFFF, size & 0xFFFFFFFF))
+        out.write(indexMember(blockSize, sizes))
+    return (crc & 0xFFFFFFFF, size & 0xFFFFFFFF)
+
+def _inflateBlock(data:bytes) -> bytes:
+    return zlib.decompressobj(-zlib.MAX_WBITS).decompress(data)
+
+class BlockReader(object):
+    # The tar stream of an indexed archive, blocks inflate ahead of the reads on every core.
+    # The gzip checksum is checked once the stream was read to its end.
+    def __init__(self, archive:str, threads:int = -1):
+        self.file = open(archive, "rb")
+        self.blockSize, sizes, dataEnd = readIndex(self.file)
+        self.file.seek(dataEnd - GZIP_TRAILER.size)
+        self.expected = GZIP_TRAILER.unpack(self.file.read(GZIP_TRAILER.size))
+        # Every block but the last inflates to blockSize bytes
+        self.total = self.blockSize * len(sizes)
+        self.blocks = collections.deque()
+        offset = GZIP_HEADER.size
+        for size in sizes:
+            self.blocks.append((offset, size))
+            offset += size
+        self.workers = Core.threadWorkers(threads)
+        self.executor = ThreadPoolExecutor(max_workers=self.workers)
+        self.pending = collections.deque()
+        self.buffer = b""
+        self.crc = 0
+        self.size = 0
+        self.checked = False
+
+    def _fill(self):
+        while self.blocks and len(self.pending) < self.workers * 2:
+            offset, size = self.blocks.popleft()
+            self.file.seek(offset)
+            self.pending.append(self.executor.submit(_inflateBlock, self.file.read(size)))
+
+    def _next(self) -> bytes:
+        self._fill()
+        if not self.pending:
+            if not self.checked:
+                self.checked = True
+                if (self.crc & 0xFFFFFFFF, self.size & 0xFFFFFFFF) != self.expected:
+                    raise ValueError(f"{os.path.basename(self.file.name)} does not match its gzip checksum")
+            return b""
+        data = self.pending.popleft().result()
+        self.crc = zlib.crc32(data, self.crc)
+        self.size += len(data)
+        return data
+
+    def read(self, size=-1):
+        parts, length = [self.buffer], len(self.buffer)
+        while size is None or size < 0 or length < size:
+            data = self._next()
+            if not data:
+                break
+            parts.append(data)
+            length += len(data)
+        data = b"".join(parts)
+        if size is None or size < 0:
+            self.buffer = b""
+            return data
+        self.buffer = data[size:]
+        return data[:size]
+
+    def close(self):
+        for future in self.pending:
+            future.cancel()
+        self.executor.shutdown(wait=True)
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+def extractArchive(archive:str, directory:str, options:dict = None, progress=None, cancel=None) -> list:
+    # Inflates on every core and extracts the tar into directory, returns the names extracted
+    options = Core.getOptions(options)
+    with BlockReader(archive, options["threads"]) as blocks:
+        reader = Core.SourceReader(blocks, os.path.basename(archive), blocks.total, options["chunkSize"], progress, cancel, checksums=False)
+        names = []
+        with tarfile.open(fileobj=reader, mode="r|") as tar_ref:
+            for tarinfo in tar_ref:
+                tar_ref.extract(tarinfo, directory)
+                names.append(tarinfo.name)
+        # The rest of the stream is padding, read so the gzip checksum is checked
+        while blocks.read(Core.COPY_BUFFER):
+            pass
+        reader.report(True)
+    return names
+
+def verifyArchive(archive:str, options:dict = None, progress=None, cancel=None) -> tuple:
+    # Inflates the whole archive on every core against its gzip checksum, returns the first name and the tar size
+    options = Core.getOptions(options)
+    with BlockReader(archive, options["threads"]) as blocks:
+        reader = Core.SourceReader(blocks, os.path.basename(archive), blocks.total, options["chunkSize"], progress, cancel, checksums=False)
+        header = reader.read(tarfile.BLOCKSIZE)
+        while reader.read(reader.chunkSize):
+            pass
+    return tarfile.TarInfo.frombuf(header, tarfile.ENCODING, "surrogateescape").name, reader.size
@@ -0,0 +1,166 @@
+import os, queue, threading, hashlib, tempfile
+
+# Overlapped I/O for projects on network shares. A reader thread reads the next chunks of the source while
+# the current one compresses and a writer thread writes the compressed data while the next chunk compresses,
+# the stages are connected by bounded queues so memory stays bounded by depth times the chunk size.
+# Archives can also be staged on a local scratch folder, written and verified there and copied to the share
+# in one sequential pass instead of the small writes and seeks of the archive formats.
+
+# Local scratch folder archives are staged in
+DEFAULT_STAGING_DIR = os.path.join(tempfile.gettempdir(), "PrismCompressionStaging")
+
+# Seconds a stage waits on its queue before it checks whether the other side stopped
+POLL_INTERVAL = 0.1
+
+_END = object()
+
+class PrefetchReader(object):
+    # File object reading up to depth chunks ahead of the caller on a thread
+    def __init__(self, fileobj, chunkSize:int, depth:int):
+        self.fileobj = fileobj
+        self.chunkSize = chunkSize
+        self.queue = queue.Queue(maxsize=max(1, depth))
+        self.stopped = threading.Event()
+        self.buffer = b""
+        self.eof = False
+        self.thread = threading.Thread(target=self._run, name="CompressionPrefetch", daemon=True)
+        self.thread.start()
+
+    def _put(self, item) -> bool:
+        while not self.stopped.is_set():
+            try:
+                self.queue.put(item, timeout=POLL_INTERVAL)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _run(self):
+        try:
+            while not self.stopped.is_set():
+                data = self.fileobj.read(self.chunkSize)
+                if not data:
+                    break
+                if not self._put(data):
+                    return
+        except Exception as e:
+            self._put(e)
+            return
+        self._put(_END)
+
+    def _next(self) -> bytes:
+        if self.eof:
+            return b""
+        item = self.queue.get()
+        if item is _END:
+            self.eof = True
+            return b""
+        if isinstance(item, Exception):
+            self.eof = True
+            raise item
+        return item
+
+    def read(self, size=-1):
+        # Like a file, size bytes unless the source ends first
+        parts, length = [self.buffer], len(self.buffer)
+        while size is None or size < 0 or length < size:
+            data = self._next()
+            if not data:
+                break
+            parts.append(data)
+            length += len(data)
+        data = b"".join(parts)
+        if size is None or size < 0:
+            self.buffer = b""
+            return data
+        self.buffer = data[size:]
+        return data[:size]
+
+    def close(self):
+        self.stopped.set()
+        self.thread.join()
+
+class WriteBehind(object):
+    # Archive file whose writes are queued to a writer thread, at most depth writes wait in the queue.
+    # Seeking waits for the queued writes so formats that go back to patch a header still work.
+    def __init__(self, fileobj, depth:int):
+        self.fileobj = fileobj
+        self.queue = queue.Queue(maxsize=max(1, depth))
+        self.error = None
+        self.position = fileobj.tell()
+        self.thread = threading.Thread(target=self._run, name="CompressionWriteBehind", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            data = self.queue.get()
+            try:
+                if data is _END:
+                    return
+                if self.error is None:
+                    self.fileobj.write(data)
+            except Exception as e:
+                # Raised in the compressing thread by its next write
+                self.error = e
+            finally:
+                self.queue.task_done()
+
+    def _check(self):
+        if self.error is not None:
+            raise self.error
+
+    def write(self, data):
+        self._check()
+        # Callers may reuse their buffer, the queue keeps a copy
+        data = bytes(data)
+        self.queue.put(data)
+        self.position += len(data)
+        return len(data)
+
+    def drain(self):
+        self.queue.join()
+        self._check()
+
+    def tell(self) -> int:
+        return self.position
+
+    def seekable(self) -> bool:
+        return True
+
+    def seek(self, offset:int, whence:int = os.SEEK_SET) -> int:
+        self.drain()
+        self.position = self.fileobj.seek(offset, whence)
+        return self.position
+
+    def truncate(self, size:int = None) -> int:
+        self.drain()
+        return self.fileobj.truncate(size)
+
+    def flush(self):
+        self.drain()
+        self.fileobj.flush()
+
+    def close(self):
+        if self.thread.is_alive():
+            self.queue.put(_END)
+            self.thread.join()
+        try:
+            self._check()
+        finally:
+            self.fileobj.close()
+
+    @property
+    def closed(self) -> bool:
+        return self.fileobj.closed
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+def stagedPath(archive:str, stagingDir:str) -> str:
+    # Partial archive on local scratch, named after the full path so archives of the same name don't collide
+    key = hashlib.blake2b(os.path.abspath(archive).encode("utf-8"), digest_size=8).hexdigest()
+    os.makedirs(stagingDir, exist_ok=True)
+    return os.path.join(stagingDir, f"{key}_{os.path.basename(archive)}.partial")
@@ -0,0 +1,98 @@
+import os, heapq, itertools, threading
+
+# Jobs of the plugin wait here until a slot is free, lower priorities run first and jobs of the
+# same priority run in the order they were added. A job waits while another running job writes to
+# one of its folders, two jobs on one task would race on its sources, manifest and solid archive.
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_SINGLE = 1
+PRIORITY_BULK = 2
+
+# Finished jobs kept for the job panel
+HISTORY = 100
+
+class Job(object):
+    def __init__(self, jobId:int, label:str, priority:int, options:dict, filePath:str = None, fileList:list = None, openFile:bool = False, workers:int = 1, cache = None):
+        self.jobId = jobId
+        self.label = label
+        self.priority = priority
+        self.options = options
+        self.filePath = filePath
+        self.fileList = fileList
+        self.openFile = openFile
+        self.workers = workers
+        self.cache = cache
+        self.status = "queued"
+        self.message = ""
+        self.progress = (None, 0, 0, 0.0, 0.0)
+        self.cancelEvent = threading.Event()
+
+    def folders(self) -> set:
+        # Folders the job writes to, opening from the local cache only reads the archive
+        if self.cache is not None:
+            return set()
+        files = self.fileList if self.fileList is not None else [self.filePath]
+        return {os.path.dirname(os.path.abspath(file)) for file in files if file}
+
+    def isFinished(self) -> bool:
+        return self.status in ("done", "error", "cancelled")
+
+class JobQueue(object):
+    def __init__(self, concurrency:int = 1):
+        self.concurrency = max(1, concurrency)
+        self.lock = threading.Lock()
+        self.counter = itertools.count(1)
+        self.heap = []
+        self.jobs = []
+
+    def add(self, label:str, priority:int, options:dict, **kwargs) -> Job:
+        with self.lock:
+            job = Job(next(self.counter), label, priority, options, **kwargs)
+            heapq.heappush(self.heap, (priority, job.jobId, job))
+            self.jobs.append(job)
+            return job
+
+    def running(self) -> list:
+        return [job for job in self.jobs if job.status == "running"]
+
+    def next(self):
+        # The next job allowed to start, interactive jobs get a slot of their own
+        # so opening a file never waits behind a bulk compression
+        with self.lock:
+            while self.heap and self.heap[0][2].status != "queued":
+                heapq.heappop(self.heap)
+
+            running = self.running()
+            interactive = [j for j in running if j.priority == PRIORITY_INTERACTIVE]
+            busy = set().union(*(j.folders() for j in running))
+            for entry in sorted(self.heap):
+                job = entry[2]
+                if job.status != "queued" or job.folders() & busy:
+                    continue
+                if len(running) - len(interactive) >= self.concurrency and not (job.priority == PRIORITY_INTERACTIVE and not interactive):
+                    return None
+
+                self.heap.remove(entry)
+                heapq.heapify(self.heap)
+                job.status = "running"
+                return job
+            return None
+
+    def cancel(self, job:Job):
+        with self.lock:
+            if job.status == "queued":
+                job.status = "cancelled"
+            elif job.status == "running":
+                job.message = "Cancelling"
+                job.cancelEvent.set()
+
+    def finish(self, job:Job, status:str):
+        with self.lock:
+            job.status = status
+            finished = [j for j in self.jobs if j.isFinished()]
+            for old in finished[:max(0, len(finished) - HISTORY)]:
+                self.jobs.remove(old)
+
+    def clearFinished(self):
+        with self.lock:
+            self.jobs = [job for job in self.jobs if not job.isFinished()]
@@ -0,0 +1,201 @@
+import os, bz2, json, lzma, time, zlib, threading
+from concurrent.futures import ThreadPoolExecutor
+
+import Prism_Compression_Core as Core
+import Prism_Compression_Index as Index
+import Prism_Compression_Retention as Retention
+import Prism_Compression_Adaptive as Adaptive
+from Prism_Compression_Core import zstandard, lz4
+
+# Storage report of a task, an asset or shot, or a whole project. Task folders are listed through the file
+# index so folders that did not change are not listed again. The savings of every codec are estimated per
+# scene format from sampled blocks of a few scenes, the estimates are cached per extension.
+# Delta, Store and Solid save the redundancy between versions, sampled blocks can't estimate them.
+
+# Scenes of one extension sampled for its estimate
+SAMPLE_FILES = 8
+
+# Estimates are sampled again after this many seconds
+ESTIMATE_TTL = 7 * 24 * 60 * 60
+
+_estimateLock = threading.Lock()
+
+def estimateCodecs() -> dict:
+    # {label: compress function} of the codecs a compressFile type uses, at their default levels
+    codecs = {
+        "Zip deflate": lambda data: zlib.compress(data, 6),
+        "Zip bzip2": lambda data: bz2.compress(data, 9),
+        "Zip lzma": lambda data: lzma.compress(data, lzma.FORMAT_RAW, filters=[{"id": lzma.FILTER_LZMA1, "preset": 6}]),
+        "Tar.gz": lambda data: zlib.compress(data, 9)
+    }
+    if zstandard is not None:
+        # A compressor per call, zstd compressors can't be shared between threads
+        codecs["Zstd"] = lambda data: zstandard.ZstdCompressor(level=Core.FrameDefaultLevel["Zstd"]).compress(data)
+    if lz4 is not None:
+        codecs["LZ4"] = lambda data: lz4.frame.compress(data, compression_level=Core.FrameDefaultLevel["LZ4"])
+    return codecs
+
+def taskFolders(path:str) -> list:
+    # path is a Scenefiles/<department>/<task> folder, an asset or shot, or the project
+    if os.path.basename(os.path.dirname(os.path.dirname(os.path.abspath(path)))) == "Scenefiles":
+        return [path]
+    return Retention.findTaskFolders(path)
+
+def describeTask(task:str) -> dict:
+    task = os.path.abspath(task)
+    department = os.path.dirname(task)
+    return {"task": task, "name": os.path.basename(task), "department": os.path.basename(department), "entity": os.path.dirname(os.path.dirname(department))}
+
+def scanTask(task:str, exts:list, index:Index.FileIndex) -> dict:
+    # Bytes of the scenes and archives of the task, the scenes by extension for the estimate
+    report = dict(describeTask(task), versions=0, archives=0, uncompressed=0, compressed=0, byExt={}, scenes=[])
+    for entry in index.entries(task, exts):
+        if entry["compressed"]:
+            report["archives"] += 1
+            report["compressed"] += entry["size"]
+            continue
+        ext = os.path.splitext(entry["name"])[1].lower()
+        report["versions"] += 1
+        report["uncompressed"] += entry["size"]
+        report["byExt"][ext] = report["byExt"].get(ext, 0) + entry["size"]
+        report["scenes"].append(os.path.join(task, entry["name"]))
+    return report
+
+def _sampleFile(file:str, codecs:dict) -> tuple:
+    # Sample bytes and their compressed size with every codec, zlib, lzma and zstd release the GIL
+    try:
+        sample = Adaptive.readSample(file)
+    except OSError:
+        return 0, {}
+    return len(sample), {label: len(compress(sample)) for label, compress in codecs.items()}
+
+def _loadEstimates(path:str) -> dict:
+    if path is None or not os.path.isfile(path):
+        return {}
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _saveEstimates(path:str, estimates:dict):
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp, "w") as f:
+            json.dump(estimates, f)
+        os.replace(temp, path)
+    except OSError:
+        pass
+
+def estimateRatios(scenes:dict, executor, cachePath:str = None, cancel=None) -> dict:
+    # {ext: {codec: compressed / uncompressed}} from SAMPLE_FILES scenes spread over the versions of each extension
+    codecs = estimateCodecs()
+    with _estimateLock:
+        cached = _loadEstimates(cachePath)
+    now = time.time()
+
+    estimates, futures = {}, {}
+    for ext, files in scenes.items():
+        entry = cached.get(ext)
+        if entry is not None and now - entry["date"] < ESTIMATE_TTL and set(codecs) <= set(entry["ratios"]):
+            estimates[ext] = entry
+            continue
+        step = max(1, len(files) // SAMPLE_FILES)
+        futures[ext] = [executor.submit(_sampleFile, file, codecs) for file in files[::step][:SAMPLE_FILES]]
+
+    for ext, extFutures in futures.items():
+        if cancel is not None and cancel.is_set():
+            raise Core.CompressionCancelled(ext)
+        sampled, compressed = 0, dict.fromkeys(codecs, 0)
+        for future in extFutures:
+            size, sizes = future.result()
+            sampled += size
+            for label, value in sizes.items():
+                compressed[label] += value
+        if sampled:
+            estimates[ext] = {"ratios": {label: value / sampled for label, value in compressed.items()}, "samples": len(extFutures), "bytes": sampled, "date": now}
+
+    if cachePath is not None and futures:
+        with _estimateLock:
+            _saveEstimates(cachePath, dict(_loadEstimates(cachePath), **{ext: estimates[ext] for ext in futures if ext in estimates}))
+    return {ext: entry["ratios"] for ext, entry in estimates.items()}
+
+def _savings(byExt:dict, ratios:dict) -> dict:
+    # Bytes every codec would save on the scenes, extensions without an estimate save nothing
+    savings = {}
+    for ext, size in byExt.items():
+        for label, ratio in ratios.get(ext, {}).items():
+            savings[label] = savings.get(label, 0) + max(0, int(size * (1 - ratio)))
+    return savings
+
+def _total(reports:list) -> dict:
+    total = {"versions": 0, "archives": 0, "uncompressed": 0, "compressed": 0, "savings": {}}
+    for report in reports:
+        for key in ("versions", "archives", "uncompressed", "compressed"):
+            total[key] += report[key]
+        for label, saved in report["savings"].items():
+            total["savings"][label] = total["savings"].get(label, 0) + saved
+    return total
+
+def storageReport(path:str, exts:list, index:Index.FileIndex = None, workers:int = None, cachePath:str = None, progress=None, cancel=None) -> dict:
+    # Bytes and estimated savings per task and department of path, tasks with the largest savings first.
+    # progress is called with (name, tasksDone, tasksTotal, 0, 0) while the task folders are listed.
+    index = index or Index.FileIndex()
+    tasks = taskFolders(path)
+    # Listing is bound by the file server, more threads than cores keep more requests in flight
+    workers = workers or min(32, (os.cpu_count() or 1) * 4)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        reports = []
+        for done, report in enumerate(executor.map(lambda task: scanTask(task, exts, index), tasks), 1):
+            if cancel is not None and cancel.is_set():
+                raise Core.CompressionCancelled(os.path.basename(path))
+            reports.append(report)
+            if progress is not None:
+                progress(report["name"], done, len(tasks), 0.0, 0.0)
+
+        scenes = {}
+        for report in reports:
+            for file in report.pop("scenes"):
+                scenes.setdefault(os.path.splitext(file)[1].lower(), []).append(file)
+        ratios = estimateRatios(scenes, executor, cachePath, cancel)
+
+    departments = {}
+    for report in reports:
+        report["savings"] = _savings(report.pop("byExt"), ratios)
+        departments.setdefault(report["department"], []).append(report)
+
+    reports.sort(key=lambda report: max(report["savings"].values(), default=0), reverse=True)
+    return {
+        "path": os.path.abspath(path),
+        "date": time.time(),
+        "codecs": list(estimateCodecs()),
+        "ratios": ratios,
+        "tasks": reports,
+        "departments": {department: _total(departmentReports) for department, departmentReports in sorted(departments.items())},
+        "total": _total(reports)
+    }
+
+def formatSize(size:int) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(size) < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+def reportText(report:dict, limit:int = 20) -> str:
+    # Plain text summary, the departments and the tasks with the largest savings
+    codecs = report["codecs"]
+    lines = [f"{'':<40}{'scenes':>12}{'archives':>12}" + "".join(f"{codec:>14}" for codec in codecs)]
+
+    def row(label:str, totals:dict) -> str:
+        return f"{label[:39]:<40}{formatSize(totals['uncompressed']):>12}{formatSize(totals['compressed']):>12}" + "".join(f"{formatSize(totals['savings'].get(codec, 0)):>14}" for codec in codecs)
+
+    lines.append(row("Total", report["total"]))
+    for department, totals in report["departments"].items():
+        lines.append(row(department, totals))
+    lines.append("")
+    for task in report["tasks"][:limit]:
+        lines.append(row(os.path.join(os.path.basename(task["entity"]), task["department"], task["name"]), task))
+    return "\n".join(lines)
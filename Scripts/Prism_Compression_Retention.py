@@ -0,0 +1,113 @@
+import os, time
+
+import Prism_Compression_Core as Core
+import Prism_Compression_Index as Index
+
+# Retention policy, the latest versions of a task and everything saved recently stay uncompressed,
+# every older version is compressed in the background.
+
+DefaultPolicy = {
+    "keepLatest" : 3,
+    "keepDays" : 14,
+    # Read rate of the compression in bytes per second, 0 disables the limit
+    "bandwidth" : 20 * 1024 * 1024,
+    # Seconds to wait between two jobs
+    "pause" : 1.0
+}
+
+# A lock older than this was left by a session that crashed
+LOCK_FILE = ".compression.lock"
+LOCK_TIMEOUT = 6 * 60 * 60
+
+def getPolicy(policy:dict = None) -> dict:
+    return dict(DefaultPolicy, **(policy or {}))
+
+def findTaskFolders(projectPath:str) -> list:
+    # Every Scenefiles/<department>/<task> folder of the assets and shots in the project
+    tasks = []
+    for root, dirs, files in os.walk(projectPath):
+        if os.path.basename(root) != "Scenefiles":
+            continue
+        for department in dirs:
+            departmentPath = os.path.join(root, department)
+            with os.scandir(departmentPath) as it:
+                tasks.extend(entry.path for entry in it if entry.is_dir())
+        # Nothing to find below the task folders
+        dirs[:] = []
+    return sorted(tasks)
+
+def selectVersions(entries:list, policy:dict, now:float = None) -> list:
+    # Names of the uncompressed entries the policy no longer keeps
+    policy = getPolicy(policy)
+    now = time.time() if now is None else now
+
+    versions = sorted({e["version"] for e in entries if e["version"] is not None}, reverse=True)
+    kept = set(versions[:max(0, int(policy["keepLatest"]))])
+    cutoff = now - policy["keepDays"] * 24 * 60 * 60
+
+    return [
+        e["name"] for e in entries
+        if not e["compressed"] and e["version"] is not None and e["version"] not in kept and e["mtime"] < cutoff
+    ]
+
+def evaluateProject(projectPath:str, exts:list, policy:dict = None, index:Index.FileIndex = None) -> dict:
+    # {task folder: [files to compress]} of the whole project
+    index = index or Index.FileIndex()
+    selected = {}
+    for task in findTaskFolders(projectPath):
+        names = selectVersions(index.entries(task, exts), policy)
+        if names:
+            selected[task] = [os.path.join(task, name) for name in names]
+    return selected
+
+class Throttle(object):
+    # Progress callback that sleeps while the job reads faster than the bandwidth limit
+    def __init__(self, bandwidth:int, progress=None, cancel=None):
+        self.bandwidth = bandwidth
+        self.progress = progress
+        self.cancel = cancel
+
+    def __call__(self, name:str, done:int, total:int, throughput:float, eta:float):
+        if self.bandwidth and throughput > self.bandwidth:
+            # Time the bytes done so far should have taken minus the time they took
+            delay = done / self.bandwidth - done / throughput
+            if self.cancel is not None:
+                self.cancel.wait(delay)
+            else:
+                time.sleep(delay)
+        if self.progress is not None:
+            self.progress(name, done, total, throughput, eta)
+
+def acquireLock(task:str) -> str:
+    # Keeps two workstations from compressing the same task at once
+    return Core.acquireFileLock(os.path.join(task, LOCK_FILE), LOCK_TIMEOUT)
+
+def releaseLock(lock:str):
+    Core.releaseFileLock(lock)
+
+def runRetention(projectPath:str, exts:list, policy:dict = None, options:dict = None, index:Index.FileIndex = None, progress=None, cancel=None) -> list:
+    # Compresses every version the policy no longer keeps, one job at a time
+    policy = getPolicy(policy)
+    # A single thread, the artist's session gets the rest of the machine
+    options = dict(Core.getOptions(options), threads=0)
+    throttle = Throttle(policy["bandwidth"], progress, cancel)
+
+    results = []
+    for task, files in evaluateProject(projectPath, exts, policy, index).items():
+        if cancel is not None and cancel.is_set():
+            break
+        lock = acquireLock(task)
+        if lock is None:
+            continue
+        try:
+            for function, job, label in Core.bulkJobs(files, options):
+                if cancel is not None and cancel.is_set():
+                    break
+                results.extend(Core.flattenResults(Core.runJobs([(function, job, label)], options, 1, throttle, cancel)))
+                if cancel is not None:
+                    cancel.wait(policy["pause"])
+                else:
+                    time.sleep(policy["pause"])
+        finally:
+            releaseLock(lock)
+    return results
@@ -0,0 +1,158 @@
+import os, struct, collections
+from concurrent.futures import ThreadPoolExecutor
+
+import Prism_Compression_Core as Core
+import Prism_Compression_Dictionary as Dictionary
+from Prism_Compression_Core import zstandard
+
+# Seekable zstd archives, the content is cut into frames compressed on their own and a seek table
+# at the end of the file lists the size of every frame. Frames decompress in parallel and a byte
+# range only needs the frames it falls in. The seek table follows the zstd seekable format so the
+# archive is still a plain .zst to every other decoder.
+#
+#   metadata frame | data frames | checksum frame | seek table frame
+
+SEEK_TABLE_MAGIC = 0x184D2A5E
+SEEKABLE_MAGIC = 0x8F92EAB1
+SEEK_FOOTER = struct.Struct("<IBI")
+SEEK_ENTRY = struct.Struct("<II")
+
+# Frames larger than this lose little ratio and keep enough of them in flight to use every core
+DEFAULT_FRAME_SIZE = 4 * 1024 * 1024
+
+# Frame as (compressed offset, compressed size, decompressed offset, decompressed size)
+Frame = collections.namedtuple("Frame", ["offset", "size", "dataOffset", "dataSize"])
+
+def seekTableFrame(frames:list) -> bytes:
+    # frames as (compressed size, decompressed size), checksums are left out
+    entries = b"".join(SEEK_ENTRY.pack(size, dataSize) for size, dataSize in frames)
+    footer = SEEK_FOOTER.pack(len(frames), 0, SEEKABLE_MAGIC)
+    return struct.pack("<II", SEEK_TABLE_MAGIC, len(entries) + len(footer)) + entries + footer
+
+def seekTableSize(fileobj) -> int:
+    # Size of the seek table frame at the end of fileobj, 0 when there is none
+    fileobj.seek(0, os.SEEK_END)
+    if fileobj.tell() < SEEK_FOOTER.size + 8:
+        return 0
+    fileobj.seek(-SEEK_FOOTER.size, os.SEEK_END)
+    count, descriptor, magic = SEEK_FOOTER.unpack(fileobj.read(SEEK_FOOTER.size))
+    if magic != SEEKABLE_MAGIC:
+        return 0
+    entrySize = SEEK_ENTRY.size + (4 if descriptor & 0x80 else 0)
+    return 8 + count * entrySize + SEEK_FOOTER.size
+
+def readSeekTable(fileobj) -> list:
+    # Frames holding data, the metadata and checksum frames decompress to nothing and are skipped
+    tableSize = seekTableSize(fileobj)
+    if not tableSize:
+        raise ValueError("Archive has no seek table")
+    fileobj.seek(-SEEK_FOOTER.size, os.SEEK_END)
+    count, descriptor, _ = SEEK_FOOTER.unpack(fileobj.read(SEEK_FOOTER.size))
+    entrySize = SEEK_ENTRY.size + (4 if descriptor & 0x80 else 0)
+
+    fileobj.seek(-tableSize + 8, os.SEEK_END)
+    table = fileobj.read(count * entrySize)
+    frames = []
+    offset, dataOffset = 0, 0
+    for i in range(count):
+        size, dataSize = SEEK_ENTRY.unpack_from(table, i * entrySize)
+        if dataSize:
+            frames.append(Frame(offset, size, dataOffset, dataSize))
+        offset += size
+        dataOffset += dataSize
+    return frames
+
+def writeSeekableArchive(archive:str, level, threads:int, reader, dictionary = None, frameSize:int = DEFAULT_FRAME_SIZE):
+    Core.requireCodec("Zstd")
+    if level is None:
+        level = Core.FrameDefaultLevel["Zstd"]
+    level = Core.clampCompressLevel(Core.FrameCompressionLevelRange["Zstd"], level)
+    frameSize = max(int(frameSize), 64 * 1024)
+    workers = Core.threadWorkers(threads)
+
+    def compressFrame(data:bytes) -> bytes:
+        # A compressor per call, zstd releases the GIL so frames compress on every core
+        return zstandard.ZstdCompressor(level=level, write_checksum=True, dict_data=dictionary).compress(data)
+
+    with Core.openOutput(archive, reader) as out, ThreadPoolExecutor(max_workers=workers) as executor:
+        header = Core.metadataFrame({
+            "name": reader.name,
+            "codec": "Zstd",
+            "dictionary": dictionary.dict_id() if dictionary is not None else None,
+            "seekable": True
+        })
+        out.write(header)
+        frames = [(len(header), 0)]
+
+        # At most two frames per worker in flight, memory stays bounded by the frame size
+        pending = collections.deque()
+        def writeFrame():
+            data, dataSize = pending.popleft()
+            compressed = data.result()
+            out.write(compressed)
+            frames.append((len(compressed), dataSize))
+
+        # An empty file still gets one empty frame
+        chunk = reader.read(frameSize)
+        while True:
+            pending.append((executor.submit(compressFrame, chunk), len(chunk)))
+            if len(pending) >= workers * 2:
+                writeFrame()
+            chunk = reader.read(frameSize)
+            if not chunk:
+                break
+        while pending:
+            writeFrame()
+
+        trailer = Core.checksumFrame(reader)
+        out.write(trailer)
+        frames.append((len(trailer), 0))
+        out.write(seekTableFrame(frames))
+
+def _decompressor(metadata:dict, dictionaryDir:str = None):
+    dictId = metadata.get("dictionary")
+    if dictId and not dictionaryDir:
+        raise RuntimeError(f"Archive needs compression dictionary {dictId}, no dictionary folder is configured")
+    dictionary = Dictionary.loadDictionary(dictionaryDir, dictId) if dictId else None
+    return lambda data, dataSize: zstandard.ZstdDecompressor(dict_data=dictionary).decompress(data, max_output_size=dataSize)
+
+def decompressArchive(archive:str, output:str, options:dict = None, progress=None, cancel=None) -> str:
+    # Decompresses the frames on every core and writes them in order, returns the scene name
+    options = Core.getOptions(options)
+    workers = Core.threadWorkers(options["threads"])
+    with open(archive, "rb") as f:
+        metadata = Core.readMetadata(f)
+        frames = readSeekTable(f)
+        decompress = _decompressor(metadata, options["dictionaryDir"])
+        name = os.path.basename(metadata["name"])
+
+        with open(output, "wb") as out, ThreadPoolExecutor(max_workers=workers) as executor:
+            # Every frame checks its own zstd checksum, hashing the output again would serialise the workers
+            reader = Core.SourceReader(None, name, metadata["size"], progress=progress, cancel=cancel, checksums=False)
+            pending = collections.deque()
+            for frame in frames:
+                f.seek(frame.offset)
+                pending.append(executor.submit(decompress, f.read(frame.size), frame.dataSize))
+                if len(pending) >= workers * 2:
+                    out.write(reader.feed(pending.popleft().result()))
+            while pending:
+                out.write(reader.feed(pending.popleft().result()))
+            reader.report(True)
+
+    if reader.size != metadata["size"]:
+        raise ValueError(f"{name} is truncated in {os.path.basename(archive)}")
+    return name
+
+def readRange(archive:str, offset:int, length:int, dictionaryDir:str = None) -> bytes:
+    # Bytes offset to offset + length of the content, only the frames holding them are decompressed
+    with open(archive, "rb") as f:
+        metadata = Core.readMetadata(f)
+        frames = [frame for frame in readSeekTable(f) if frame.dataOffset < offset + length and frame.dataOffset + frame.dataSize > offset]
+        decompress = _decompressor(metadata, dictionaryDir)
+
+        data = b""
+        for frame in frames:
+            f.seek(frame.offset)
+            data += decompress(f.read(frame.size), frame.dataSize)
+    start = offset - frames[0].dataOffset if frames else 0
+    return data[start:start + length]
@@ -0,0 +1,355 @@
+import os, re, json, lzma, struct, zlib, time, contextlib, traceback
+
+import Prism_Compression_Core as Core
+import Prism_Compression_Metrics as Metrics
+from Prism_Compression_Core import zstandard
+
+# Solid task archives pack many versions of a task into one archive. Versions added together are
+# compressed as one stream, so a version is mostly matches against the one before it. Versions added
+# later go into a new block after the existing ones, followed by a new index, nothing already written is
+# rewritten. The index at the end names the block and offset of every version so one version is extracted
+# without the others, only the versions before it in its block are decompressed and skipped.
+#
+#   header | block | block | ... | index | trailer
+#   header   magic, format version
+#   block    zstd stream of the versions added together, lzma without the zstandard module
+#   index    zlib compressed json of the blocks and members
+#   trailer  offset, length and crc32 of the index, magic
+#
+# An index and trailer left behind by an earlier append stay in the file as a few unused bytes.
+
+HEADER = struct.Struct("<4sI")
+HEADER_MAGIC = b"PCSA"
+FORMAT_VERSION = 1
+TRAILER = struct.Struct("<QII4s")
+TRAILER_MAGIC = b"PCSE"
+
+# One job appends to an archive at a time, a lock older than this was left by a crash
+LOCK_SUFFIX = ".lock"
+LOCK_TIMEOUT = 6 * 60 * 60
+
+# Windows are sized to the largest version of the block so every version reaches the one before it
+WINDOW_LOG_MIN = 20
+WINDOW_LOG_MAX = 30
+# lzma needs about ten times its dictionary to compress
+LZMA_DICT_MAX = 256 * 1024 * 1024
+
+def solidArchivePath(file:str) -> str:
+    # Named after the versions without their version, e.g. sh010_Anim_v0003.ma to sh010_Anim.pcs
+    folder, name = os.path.split(file)
+    match = re.search(r"[vV]\d+", name)
+    prefix = name[:match.start()].rstrip("_-. ") if match else os.path.splitext(name)[0]
+    return os.path.join(folder, (prefix or os.path.basename(folder)) + Core.CompressionTypes["Solid"])
+
+def emptyIndex() -> dict:
+    return {"blocks": [], "members": []}
+
+def readIndex(f) -> tuple:
+    # (index, end of the trailer), an append interrupted by a crash leaves bytes after the last valid trailer
+    f.seek(0, os.SEEK_END)
+    size = f.tell()
+    f.seek(0)
+    magic, version = HEADER.unpack(f.read(HEADER.size))
+    if magic != HEADER_MAGIC or version > FORMAT_VERSION:
+        raise ValueError("Not a solid task archive")
+
+    end = size
+    while end >= HEADER.size + TRAILER.size:
+        f.seek(end - TRAILER.size)
+        offset, length, crc, magic = TRAILER.unpack(f.read(TRAILER.size))
+        if magic == TRAILER_MAGIC and offset + length + TRAILER.size == end:
+            f.seek(offset)
+            data = f.read(length)
+            if zlib.crc32(data) == crc:
+                return json.loads(zlib.decompress(data)), end
+        end = _previousTrailer(f, end - 1)
+    raise ValueError("Solid task archive has no valid index")
+
+def _previousTrailer(f, before:int) -> int:
+    # End of the last trailer magic that ends before `before`, 0 when there is none
+    end = before
+    while end > HEADER.size:
+        start = max(HEADER.size, end - Core.COPY_BUFFER)
+        f.seek(start)
+        found = f.read(end - start).rfind(TRAILER_MAGIC)
+        if found >= 0:
+            return start + found + len(TRAILER_MAGIC)
+        if start == HEADER.size:
+            break
+        # Overlap the next read so a magic across the boundary is found
+        end = start + len(TRAILER_MAGIC) - 1
+    return 0
+
+def loadIndex(archive:str) -> dict:
+    with open(archive, "rb") as f:
+        return readIndex(f)[0]
+
+def _indexTrailer(index:dict, offset:int) -> bytes:
+    data = zlib.compress(json.dumps(index).encode("utf-8"))
+    return data + TRAILER.pack(offset, len(data), zlib.crc32(data), TRAILER_MAGIC)
+
+def _blockCompressor(options:dict, largest:int) -> tuple:
+    windowLog = min(max(largest.bit_length(), WINDOW_LOG_MIN), WINDOW_LOG_MAX)
+    if zstandard is not None:
+        level = Core.clampCompressLevel(Core.FrameCompressionLevelRange["Zstd"], Core.FrameDefaultLevel["Zstd"] if options["level"] is None else options["level"])
+        params = zstandard.ZstdCompressionParameters.from_level(level, window_log=windowLog, enable_ldm=True, threads=options["threads"], write_checksum=True)
+        return {"codec": "Zstd", "level": level, "windowLog": windowLog}, zstandard.ZstdCompressor(compression_params=params).compressobj()
+    level = Core.clampCompressLevel(Core.TarCompressionLevelRange, 6 if options["level"] is None else options["level"])
+    filters = [{"id": lzma.FILTER_LZMA2, "preset": level, "dict_size": min(1 << windowLog, LZMA_DICT_MAX)}]
+    return {"codec": "LZMA", "level": level, "windowLog": windowLog}, lzma.LZMACompressor(format=lzma.FORMAT_XZ, filters=filters)
+
+def _blockStream(f, block:dict):
+    f.seek(block["offset"])
+    data = Core.BoundedReader(f, block["offset"] + block["compressedSize"])
+    if block["codec"] == "Zstd":
+        Core.requireCodec("Zstd")
+        return zstandard.ZstdDecompressor(max_window_size=1 << block["windowLog"]).stream_reader(data, read_across_frames=True, closefd=False)
+    return lzma.LZMAFile(data, "rb")
+
+def _writeBlock(out, files:list, blockNumber:int, options:dict, timer, progress, cancel) -> tuple:
+    # Streams files through one compressor, returns the block and the members of the files
+    header, compressor = _blockCompressor(options, max(os.path.getsize(file) for file in files))
+    start = out.tell()
+    members = []
+    size = 0
+    for file in files:
+        stat = os.stat(file)
+        with Core.openSource(file, options) as (src, total):
+            reader = Core.SourceReader(src, os.path.basename(file), total, options["chunkSize"], progress, cancel)
+            reader.timer = timer
+            while chunk := reader.read(reader.chunkSize):
+                out.write(compressor.compress(chunk))
+            reader.report(True)
+        members.append({
+            "name": reader.name,
+            "block": blockNumber,
+            "offset": size,
+            "size": reader.size,
+            "crc32": reader.crc,
+            "blake2b": reader.digest.hexdigest(),
+            "mtime": stat.st_mtime_ns,
+            "added": time.time()
+        })
+        size += reader.size
+    out.write(compressor.flush())
+    return dict(header, offset=start, compressedSize=out.tell() - start, size=size), members
+
+def _memberState(index:dict) -> dict:
+    return {member["name"]: member for member in index["members"]}
+
+def addToArchive(files:list, options:dict = None, progress=None, cancel=None) -> list:
+    # Appends the files to the solid archive of their task as one new block, one result per file.
+    # Files already in the archive with the same size and mtime are current and not added again.
+    options = Core.getOptions(options)
+    archive = solidArchivePath(files[0])
+    # Two jobs appending at the same end would overwrite each other's block, the lock is held from
+    # reading the index until the sources are deleted. The files are skipped while another job appends.
+    lock = Core.acquireFileLock(archive + LOCK_SUFFIX, LOCK_TIMEOUT)
+    if lock is None:
+        return [Core.jobResult(file, archive, "skipped") for file in files]
+    try:
+        return _appendFiles(files, archive, options, progress, cancel)
+    finally:
+        Core.releaseFileLock(lock)
+
+def _appendFiles(files:list, archive:str, options:dict, progress, cancel) -> list:
+    timer = Metrics.PhaseTimer()
+    results = {}
+    try:
+        if os.path.exists(archive):
+            with open(archive, "rb") as f:
+                index, end = readIndex(f)
+        else:
+            index, end = emptyIndex(), None
+    except Exception as e:
+        return [Core.jobResult(file, archive, "error", f"Error reading solid archive \n {traceback.format_exception(e)}") for file in files]
+
+    members = _memberState(index)
+    pending = []
+    for file in files:
+        member = members.get(os.path.basename(file))
+        if not os.path.exists(file):
+            results[file] = Core.jobResult(file, archive, "skipped")
+        elif options["skipUnchanged"] and member is not None and (member["size"], member["mtime"]) == (os.path.getsize(file), os.stat(file).st_mtime_ns):
+            results[file] = Core.jobResult(file, archive, "current")
+        else:
+            pending.append(file)
+
+    bytesOut = 0
+    if pending:
+        created = end is None
+        out = None
+        try:
+            out = open(archive, "r+b" if end is not None else "wb", buffering=Core.WRITE_BUFFER)
+            if end is None:
+                out.write(HEADER.pack(HEADER_MAGIC, FORMAT_VERSION))
+                end = HEADER.size
+            # Bytes of an interrupted append are overwritten, the previous index stays where it is
+            out.seek(end)
+            out.truncate()
+            block, added = _writeBlock(Metrics.TimedWriter(out, timer), pending, len(index["blocks"]), options, timer, progress, cancel)
+            index["blocks"].append(block)
+            # A version added again replaces the earlier copy in the index, its bytes stay unused in the archive
+            names = {member["name"] for member in added}
+            index["members"] = [member for member in index["members"] if member["name"] not in names] + added
+            out.write(_indexTrailer(index, out.tell()))
+            bytesOut = out.tell() - end
+            out.close()
+            out = None
+            timer.add("compress", timer.elapsed() - timer.get("read") - timer.get("write"))
+
+            with timer.phase("verify"):
+                valid = _verifyAppend(archive, end, block, added, options, cancel)
+            if not valid:
+                _restoreArchive(archive, end, created)
+                return [results.get(file) or Core.jobResult(file, archive, "error", "Error compressing file") for file in files]
+        except Exception as e:
+            if out is not None:
+                out.close()
+            _restoreArchive(archive, end, created)
+            status = "cancelled" if isinstance(e, Core.CompressionCancelled) else "error"
+            error = None if status == "cancelled" else f"Error compressing file \n {traceback.format_exception(e)}"
+            return [results.get(file) or Core.jobResult(file, archive, status, error) for file in files]
+
+        bytesIn = sum(member["size"] for member in added)
+        metrics = Metrics.jobMetrics("compress", timer, bytesIn, bytesOut, type="Solid", level=block["level"], files=len(added))
+        for number, file in enumerate(pending):
+            # The block is one record, metrics go with its first file
+            results[file] = Core.jobResult(file, archive, "done", metrics=metrics if number == 0 else None)
+
+    if options["deleteOld"]:
+        # The appended block is on disk before the sources it holds are deleted
+        if pending and options["fsync"]:
+            Core.syncFile(archive)
+            if created:
+                Core.syncFolder(os.path.dirname(archive))
+        for file in files:
+            if results[file]["status"] in ("done", "current"):
+                os.remove(file)
+    return [results[file] for file in files]
+
+def _restoreArchive(archive:str, end:int, created:bool):
+    # Back to the archive as it was before the append, the previous index is the last one again
+    if created:
+        Core.removePartial(archive)
+        return
+    with open(archive, "r+b") as f:
+        f.seek(end)
+        f.truncate()
+
+def _verifyAppend(archive:str, end:int, block:dict, added:list, options:dict, cancel) -> bool:
+    # Fast reads the index back and decompresses the new block against the checksums of its versions,
+    # Paranoid also checks every block written before it
+    if options["verify"] == "None":
+        return True
+    with open(archive, "rb") as f:
+        index = readIndex(f)[0]
+        members = _memberState(index)
+        if block["offset"] != end or index["blocks"][-1] != block or any(members.get(member["name"]) != member for member in added):
+            return False
+        if not _checkBlock(f, block, added, None, cancel):
+            return False
+    if options["verify"] == "Paranoid":
+        try:
+            verifySolid(archive, cancel=cancel)
+        except ValueError:
+            return False
+    return True
+
+def _checkBlock(f, block:dict, members:list, progress, cancel) -> bool:
+    # Decompresses the block and compares every member against its checksums
+    with _blockStream(f, block) as stream:
+        position = 0
+        for member in sorted(members, key=lambda m: m["offset"]):
+            _skip(stream, member["offset"] - position)
+            reader = Core.SourceReader(_LimitedReader(stream, member["size"]), member["name"], member["size"], progress=progress, cancel=cancel)
+            while reader.read(reader.chunkSize):
+                pass
+            position = member["offset"] + member["size"]
+            if (reader.size, reader.crc, reader.digest.hexdigest()) != (member["size"], member["crc32"], member["blake2b"]):
+                return False
+    return True
+
+def _skip(stream, size:int):
+    while size > 0:
+        data = stream.read(min(size, Core.COPY_BUFFER))
+        if not data:
+            raise ValueError("Solid archive block is truncated")
+        size -= len(data)
+
+class _LimitedReader(object):
+    # The next `size` bytes of a decompressed block
+    def __init__(self, stream, size:int):
+        self.stream = stream
+        self.remaining = size
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b""
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.stream.read(size)
+        self.remaining -= len(data)
+        return data
+
+def latestMember(index:dict) -> dict:
+    # Highest version, the last one added among versions without a number
+    if not index["members"]:
+        raise ValueError("Solid task archive is empty")
+    return max(index["members"], key=lambda m: (Core.parseVersion(m["name"]) or 0, m["added"]))
+
+@contextlib.contextmanager
+def openMember(archive:str, name:str = None):
+    # Yields the name, a file object and the size of one version, the latest without a name
+    with open(archive, "rb") as f:
+        index = readIndex(f)[0]
+        member = _memberState(index).get(name) if name else latestMember(index)
+        if member is None:
+            raise KeyError(f"{name} is not in {os.path.basename(archive)}")
+        with _blockStream(f, index["blocks"][member["block"]]) as stream:
+            _skip(stream, member["offset"])
+            yield member["name"], _LimitedReader(stream, member["size"]), member["size"]
+
+def extractMembers(archive:str, directory:str, names:list = None, options:dict = None, progress=None, cancel=None) -> list:
+    # Writes the versions into directory, every version without names. Returns the names written.
+    options = Core.getOptions(options)
+    written = []
+    with open(archive, "rb") as f:
+        index = readIndex(f)[0]
+        members = _memberState(index)
+        selected = list(members.values()) if names is None else [members[name] for name in names if name in members]
+        missing = set(names or []) - set(members)
+        if missing:
+            raise KeyError(f"{', '.join(sorted(missing))} not in {os.path.basename(archive)}")
+
+        # One pass over each block, versions between the selected ones are skipped
+        for blockNumber in sorted({member["block"] for member in selected}):
+            with _blockStream(f, index["blocks"][blockNumber]) as stream:
+                position = 0
+                for member in sorted((m for m in selected if m["block"] == blockNumber), key=lambda m: m["offset"]):
+                    _skip(stream, member["offset"] - position)
+                    reader = Core.SourceReader(_LimitedReader(stream, member["size"]), member["name"], member["size"], options["chunkSize"], progress, cancel)
+                    path = os.path.join(directory, member["name"])
+                    try:
+                        with open(path, "wb", buffering=Core.WRITE_BUFFER) as out:
+                            while chunk := reader.read(reader.chunkSize):
+                                out.write(chunk)
+                        if (reader.size, reader.crc, reader.digest.hexdigest()) != (member["size"], member["crc32"], member["blake2b"]):
+                            raise ValueError(f"{member['name']} does not match its checksums")
+                    except BaseException:
+                        Core.removePartial(path)
+                        raise
+                    reader.report(True)
+                    position = member["offset"] + member["size"]
+                    written.append(member["name"])
+    return written
+
+def verifySolid(archive:str, progress=None, cancel=None) -> int:
+    # Checks every version against its checksums, returns their total size
+    with open(archive, "rb") as f:
+        index = readIndex(f)[0]
+        members = list(_memberState(index).values())
+        for blockNumber, block in enumerate(index["blocks"]):
+            if not _checkBlock(f, block, [m for m in members if m["block"] == blockNumber], progress, cancel):
+                raise ValueError(f"{os.path.basename(archive)} does not match its checksums")
+    return sum(member["size"] for member in members)
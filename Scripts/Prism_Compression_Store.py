@@ -0,0 +1,251 @@
+import os, json, struct, uuid, zlib, threading
+
+import Prism_Compression_Core as Core
+import Prism_Compression_Delta as Delta
+import Prism_Compression_Dictionary as Dictionary
+from Prism_Compression_Core import zstandard
+
+# Content addressed store shared by the whole project. Scenes are cut into content defined chunks and
+# every chunk is compressed once into a pack of the store, the .cas archive left in place of the scene
+# only lists its chunks. Unchanged versions and caches imported into several assets cost a manifest,
+# chunks already in the store are not compressed again.
+#
+#   Store/anchors/<ext>.json   chunk anchors of a scene format, trained once so every version is cut alike
+#   Store/packs/<id>.pack      compressed chunks written by one compression
+#   Store/packs/<id>.idx       key, offset and sizes of every chunk of the pack, written once the pack is complete
+#
+#   .cas: metadata frame | compressed manifest | checksum frame
+
+# Larger chunks than delta compression, the store keeps an index entry for every chunk of the project
+CHUNK_AVERAGE = 16 * 1024
+CHUNK_MIN = 4 * 1024
+CHUNK_MAX = 64 * 1024
+ANCHOR_SAMPLE = 1024 * 1024
+
+INDEX_MAGIC = b"PCSI"
+INDEX_HEADER = struct.Struct("<4sI")
+# key, offset in the pack, compressed size, size
+INDEX_ENTRY = struct.Struct("<16sQII")
+# pack number in the manifest, offset in the pack, compressed size, size
+MANIFEST_ENTRY = struct.Struct("<IQII")
+
+_stores = {}
+_storesLock = threading.Lock()
+
+def _temporary(path:str) -> str:
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+def _extKey(file:str) -> str:
+    return os.path.splitext(file)[1].lstrip(".").lower() or "_"
+
+class ChunkStore(object):
+    def __init__(self, directory:str):
+        self.directory = directory
+        self.packDir = os.path.join(directory, "packs")
+        self.anchorDir = os.path.join(directory, "anchors")
+        self.lock = threading.Lock()
+        # key: (pack id, offset, compressed size, size)
+        self.chunks = {}
+        self.packs = {}
+        self.patterns = {}
+
+    def refresh(self):
+        # Loads the indexes of packs written since the last call, other sessions add packs at any time
+        with self.lock:
+            if not os.path.isdir(self.packDir):
+                return
+            for name in os.listdir(self.packDir):
+                packId, ext = os.path.splitext(name)
+                if ext != ".idx" or packId in self.packs:
+                    continue
+                with open(os.path.join(self.packDir, name), "rb") as f:
+                    data = f.read()
+                magic, headerSize = INDEX_HEADER.unpack_from(data)
+                if magic != INDEX_MAGIC:
+                    continue
+                self.packs[packId] = json.loads(data[INDEX_HEADER.size:INDEX_HEADER.size + headerSize])
+                for offset in range(INDEX_HEADER.size + headerSize, len(data), INDEX_ENTRY.size):
+                    key, chunkOffset, compressedSize, size = INDEX_ENTRY.unpack_from(data, offset)
+                    self.chunks.setdefault(key, (packId, chunkOffset, compressedSize, size))
+
+    def anchorPattern(self, file:str):
+        # Anchors of the scene format, trained on the first scene large enough to find any.
+        # Changing them would cut the same content differently, they are never retrained.
+        ext = _extKey(file)
+        with self.lock:
+            if ext in self.patterns:
+                return self.patterns[ext]
+
+        path = os.path.join(self.anchorDir, f"{ext}.json")
+        if not os.path.isfile(path):
+            anchors = Delta.trainAnchors(Delta.sampleFile(file, ANCHOR_SAMPLE), CHUNK_AVERAGE)
+            if not anchors:
+                return None
+            os.makedirs(self.anchorDir, exist_ok=True)
+            temp = _temporary(path)
+            with open(temp, "w") as f:
+                json.dump([anchor.hex() for anchor in anchors], f)
+            # Two sessions training at once both read back the anchors that were written last
+            os.replace(temp, path)
+
+        with open(path) as f:
+            pattern = Delta.anchorPattern([bytes.fromhex(anchor) for anchor in json.load(f)])
+        with self.lock:
+            self.patterns[ext] = pattern
+        return pattern
+
+def openStore(directory:str) -> ChunkStore:
+    # One store per folder and process, its chunk index is reused by the next job
+    if not directory:
+        raise RuntimeError("No content store folder is configured")
+    directory = os.path.abspath(directory)
+    with _storesLock:
+        if directory not in _stores:
+            _stores[directory] = ChunkStore(directory)
+    store = _stores[directory]
+    store.refresh()
+    return store
+
+def _chunkCompressor(level, dictionary = None) -> tuple:
+    if zstandard is not None:
+        level = Core.clampCompressLevel(Core.FrameCompressionLevelRange["Zstd"], Core.FrameDefaultLevel["Zstd"] if level is None else level)
+        compressor = zstandard.ZstdCompressor(level=level, dict_data=dictionary)
+        return {"codec": "Zstd", "dictionary": dictionary.dict_id() if dictionary is not None else None}, compressor.compress
+    level = Core.clampCompressLevel(Core.TarCompressionLevelRange, 6 if level is None else level)
+    return {"codec": "Zlib", "dictionary": None}, lambda data: zlib.compress(data, level)
+
+def _storeReference(storeDir:str, archive:str) -> str:
+    # Relative to the archive so the project can move, absolute when they are on different drives
+    try:
+        return os.path.relpath(storeDir, os.path.dirname(os.path.abspath(archive)))
+    except ValueError:
+        return os.path.abspath(storeDir)
+
+def storeDirectory(archive:str, metadata:dict) -> str:
+    return os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(archive)), metadata["store"]))
+
+def writeStoreArchive(archive:str, file:str, reader, options:dict, dictionary = None) -> int:
+    # Writes the chunks the store does not have yet into a new pack and the manifest of file into archive,
+    # returns the bytes added to the store
+    store = openStore(options["storeDir"])
+    pattern = store.anchorPattern(file)
+    header, compress = _chunkCompressor(options["level"], dictionary)
+
+    packId = uuid.uuid4().hex
+    packPath = os.path.join(store.packDir, f"{packId}.pack")
+    pack = None
+    packSize = 0
+    added = {}
+    packs = {}
+    manifest = bytearray()
+    try:
+        for chunk in Delta.iterChunks(reader, pattern, minimum=CHUNK_MIN, maximum=CHUNK_MAX):
+            key = Delta.chunkKey(chunk)
+            location = added.get(key) or store.chunks.get(key)
+            if location is None:
+                if pack is None:
+                    os.makedirs(store.packDir, exist_ok=True)
+                    pack = Core.openOutput(packPath, reader)
+                data = compress(chunk)
+                location = (packId, pack.tell(), len(data), len(chunk))
+                pack.write(data)
+                added[key] = location
+
+            chunkPackId, offset, compressedSize, size = location
+            if chunkPackId not in packs:
+                packs[chunkPackId] = len(packs)
+            manifest += MANIFEST_ENTRY.pack(packs[chunkPackId], offset, compressedSize, size)
+
+        if pack is not None:
+            packSize = pack.tell()
+            pack.close()
+            pack = None
+            if options["fsync"]:
+                Core.syncFile(packPath)
+            # The index makes the pack visible to other jobs, written last so they never see a partial pack
+            indexPath = os.path.join(store.packDir, f"{packId}.idx")
+            temp = _temporary(indexPath)
+            headerData = json.dumps(header).encode("utf-8")
+            with open(temp, "wb") as f:
+                f.write(INDEX_HEADER.pack(INDEX_MAGIC, len(headerData)) + headerData)
+                f.write(b"".join(INDEX_ENTRY.pack(key, *location[1:]) for key, location in added.items()))
+                if options["fsync"]:
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.replace(temp, indexPath)
+    except BaseException:
+        if pack is not None:
+            pack.close()
+        Core.removePartial(packPath)
+        raise
+
+    with Core.openOutput(archive, reader) as out:
+        out.write(Core.metadataFrame({
+            "name": reader.name,
+            "codec": "Store",
+            "store": _storeReference(store.directory, archive),
+            "packs": [dict(store.packs.get(chunkPackId, header), id=chunkPackId) for chunkPackId in packs]
+        }))
+        out.write(zlib.compress(bytes(manifest)))
+        out.write(Core.checksumFrame(reader))
+    return packSize
+
+class StoreReader(object):
+    # Content of a .cas archive, read chunk by chunk from the packs of the store
+    def __init__(self, archive:str, metadata:dict, data, dictionaryDir:str = None):
+        self.directory = os.path.join(storeDirectory(archive, metadata), "packs")
+        self.packs = metadata["packs"]
+        self.dictionaryDir = dictionaryDir
+        self.manifest = zlib.decompress(data.read())
+        self.count = len(self.manifest) // MANIFEST_ENTRY.size
+        self.index = 0
+        self.files = {}
+        self.decompressors = {}
+        self.buffer = b""
+
+    def _decompressor(self, packNumber:int):
+        if packNumber not in self.decompressors:
+            pack = self.packs[packNumber]
+            if pack["codec"] == "Zstd":
+                Core.requireCodec("Zstd")
+                dictId = pack.get("dictionary")
+                if dictId and not self.dictionaryDir:
+                    raise RuntimeError(f"Archive needs compression dictionary {dictId}, no dictionary folder is configured")
+                decompressor = zstandard.ZstdDecompressor(dict_data=Dictionary.loadDictionary(self.dictionaryDir, dictId) if dictId else None)
+                self.decompressors[packNumber] = lambda data, size: decompressor.decompress(data, max_output_size=size)
+            else:
+                self.decompressors[packNumber] = lambda data, size: zlib.decompress(data)
+        return self.decompressors[packNumber]
+
+    def _chunk(self) -> bytes:
+        packNumber, offset, compressedSize, size = MANIFEST_ENTRY.unpack_from(self.manifest, self.index * MANIFEST_ENTRY.size)
+        self.index += 1
+        if packNumber not in self.files:
+            path = os.path.join(self.directory, f"{self.packs[packNumber]['id']}.pack")
+            if not os.path.isfile(path):
+                raise FileNotFoundError(f"Pack {self.packs[packNumber]['id']} of the content store is missing")
+            self.files[packNumber] = open(path, "rb")
+        f = self.files[packNumber]
+        f.seek(offset)
+        chunk = self._decompressor(packNumber)(f.read(compressedSize), size)
+        if len(chunk) != size:
+            raise ValueError("Content store chunk is corrupted")
+        return chunk
+
+    def read(self, size=-1):
+        parts, length = [self.buffer], len(self.buffer)
+        while (size is None or size < 0 or length < size) and self.index < self.count:
+            chunk = self._chunk()
+            parts.append(chunk)
+            length += len(chunk)
+        data = b"".join(parts)
+        if size is None or size < 0:
+            self.buffer = b""
+            return data
+        self.buffer = data[size:]
+        return data[:size]
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+        self.files = {}
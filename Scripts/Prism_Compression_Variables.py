@@ -43,7 +43,7 @@ class Prism_Compression_Variables(object):
         self.appType = "3d"
         self.hasQtParent = True
         self.hasIntegration = False
-        self.sceneFormats = [".zip",".gz"]
+        self.sceneFormats = [".zip",".gz",".zst",".lz4",".delta",".cas",".pcs"]
         self.appSpecificFormats = self.sceneFormats
         self.platforms = ["Windows", "Linux", "Darwin"]
         self.pluginDirectory = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))